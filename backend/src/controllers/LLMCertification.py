@@ -5,7 +5,8 @@ End‑to‑end certification pipeline for green‑asset projects.
 Key features
 ------------
 * Look up a project in ``pipeline.csv`` (matching by **Name** or **Proponent**) to
-  retrieve ``Estimated Annual Emission Reductions``.
+  retrieve ``Estimated Annual Emission Reductions`` (served from an in‑memory
+  index that reloads when the CSV changes).
 * Perform Brave Search API queries to gather fresh evidence for SDG claims.
 * Call an LLM (OpenAI Chat Completions) with tool‑calling enabled so it can invoke
   the Brave search helper.
@@ -23,6 +24,8 @@ Environment variables
 ``OPENAI_KEY``      – OpenAI API key (required).
 ``PIPELINE_CSV``    – Path to *pipeline.csv* (default: project root).
 ``MODEL_NAME``      – Chat Completion model (default: ``gpt-4o-mini``).
+``EVIDENCE_TOKEN_BUDGET`` – Tokens of search evidence fed back per LLM pass
+                      (default: 3000).
 """
 from __future__ import annotations
 
@@ -31,13 +34,13 @@ import math
 import os
 import re
 import textwrap
-from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
-import pandas as pd
 import requests
 
 from controllers.MCP_BraveSearch import mcp_brave_search
+from services.llm.evidence_packer import EvidencePacker
+from services.registry.project_registry import PIPELINE_CSV, get_registry
 
 ###############################################################################
 # Configuration & helpers
@@ -50,7 +53,7 @@ HEADERS_OPENAI = {
     "Content-Type": "application/json",
     "Authorization": f"Bearer {os.getenv('OPENAI_KEY')}",
 }
-PIPELINE_CSV = Path(os.getenv("PIPELINE_CSV", "pipeline.csv"))
+EVIDENCE_PACKER = EvidencePacker()
 
 ###############################################################################
 # Step 1 – project lookup
@@ -63,32 +66,12 @@ def lookup_project(
     """Return (emission_reduction, industry) from *pipeline.csv* if we find it.
 
     We try to match either the *Name* column (exact, case‑insensitive) or the
-    *Proponent* column.  Returns ``(None, None)`` when no row matches.
+    *Proponent* column, falling back to a close fuzzy match (punctuation,
+    "Ltd"/"Limited", …).  Returns ``(None, None)`` when no row matches.  The
+    CSV is indexed once by :mod:`services.registry.project_registry` and
+    reloaded only when its mtime changes.
     """
-    if not PIPELINE_CSV.exists():
-        return None, None
-
-    df = pd.read_csv(PIPELINE_CSV, dtype=str)
-    df.columns = [c.strip() for c in df.columns]
-
-    mask = pd.Series(False, index=df.index)
-    if name:
-        mask |= df["Name"].str.lower() == name.lower()
-    if proponent:
-        mask |= df["Proponent"].str.lower() == proponent.lower()
-
-    if not mask.any():
-        return None, None
-
-    row = df[mask].iloc[0]
-    raw_val: str = str(row.get("Estimated Annual Emission Reductions", "")).replace(",", "")
-    try:
-        reduction = float(raw_val)
-    except ValueError:
-        reduction = None
-
-    industry = row.get("Project Type") or row.get("Industry")
-    return reduction, industry
+    return get_registry(PIPELINE_CSV).lookup(name, proponent)
 
 ###############################################################################
 # Step 2 – Brave Search (tool function)
@@ -153,35 +136,127 @@ TOOLS = [
     }
 ]
 
-def _call_llm(messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+# Search rounds the model may request before it has to answer
+MAX_TOOL_ROUNDS = 1
+
+def _call_llm(messages: List[Dict[str, Any]], tools: bool = True) -> Dict[str, Any]:
     payload = {
         "model": MODEL_NAME,
         "messages": messages,
-        "tools": TOOLS,
-        "tool_choice": "auto",
         "temperature": 0.2,
     }
+    if tools:
+        payload.update(tools=TOOLS, tool_choice="auto")
     r = requests.post(OPENAI_ENDPOINT, json=payload, headers=HEADERS_OPENAI, timeout=60)
     r.raise_for_status()
     return r.json()
 
+def _stream_llm(messages: List[Dict[str, Any]], tools: bool = True) -> Iterator[Dict[str, Any]]:
+    """Streaming variant of :func:`_call_llm` – yields each ``delta`` chunk."""
+    payload = {
+        "model": MODEL_NAME,
+        "messages": messages,
+        "temperature": 0.2,
+        "stream": True,
+    }
+    if tools:
+        payload.update(tools=TOOLS, tool_choice="auto")
+    with requests.post(
+        OPENAI_ENDPOINT, json=payload, headers=HEADERS_OPENAI, timeout=60, stream=True
+    ) as r:
+        r.raise_for_status()
+        for line in r.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            if chunk.get("choices"):
+                yield chunk["choices"][0].get("delta", {})
+
+class SDGScoreStreamParser:
+    """Incrementally extract ``sdg_scores`` objects from streamed JSON text.
+
+    Text is fed as it arrives; every element of the ``sdg_scores`` array is
+    returned as soon as its closing brace is seen, without waiting for the
+    rest of the document.
+    """
+
+    def __init__(self) -> None:
+        self.buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._start: Optional[int] = None
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Append *text* and return any SDG score objects completed by it."""
+        self.buffer += text
+        found: List[Dict[str, Any]] = []
+        if self._done:
+            return found
+
+        if not self._in_array:
+            match = re.search(r'"sdg_scores"\s*:\s*\[', self.buffer)
+            if not match:
+                return found
+            self._in_array = True
+            self._pos = match.end()
+
+        buf = self.buffer
+        while self._pos < len(buf):
+            ch = buf[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._start = self._pos
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._start is not None:
+                    try:
+                        found.append(json.loads(buf[self._start:self._pos + 1]))
+                    except ValueError:
+                        pass
+                    self._start = None
+            elif ch == "]" and self._depth == 0:
+                self._done = True
+                self._pos += 1
+                break
+            self._pos += 1
+        return found
+
 ###############################################################################
 # Step 5 – main entry
 ###############################################################################
 
-def certify_project(form_data: Dict[str, Any]) -> Dict[str, Any]:
-    """Public entry point – returns a JSON certification report or failure msg."""
-    company_name: str = form_data.get("company_name", "").strip()
-    proponent: str = form_data.get("proponent", "").strip()
+FAILURE = {
+    "success": False,
+    "message": "Certification failed, I didn't get credible sources to verify the project.",
+}
 
-    # ---------------------------------------------------------------------
-    # 1. Pipeline CSV lookup
-    # ---------------------------------------------------------------------
-    emission_reductions, industry = lookup_project(company_name, proponent)
+def _claim_text(form_data: Dict[str, Any]) -> str:
+    """Flatten the description and SDG justifications for evidence ranking."""
+    parts = [str(form_data.get("description", ""))]
+    for claim in form_data.get("sdg_claims", []) or []:
+        if isinstance(claim, dict):
+            parts.append(str(claim.get("justification", "")))
+    return " ".join(p for p in parts if p)
 
-    # ---------------------------------------------------------------------
-    # 2. Initial LLM prompt
-    # ---------------------------------------------------------------------
+def _initial_messages(form_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Build the system + user prompt for the first LLM pass."""
     system_msg = (
         "You are a research assistant specialising in verifying sustainability "
         "claims for green‑asset projects.  Use the `search_web` function when "
@@ -197,59 +272,69 @@ def certify_project(form_data: Dict[str, Any]) -> Dict[str, Any]:
         "\nVerify the claims and score each SDG."  # Let the model decide which SDGs.
     )
 
-    messages = [
+    return [
         {"role": "system", "content": system_msg},
         {"role": "user", "content": user_msg},
     ]
 
-    # First LLM pass – may trigger tool calls
-    response = _call_llm(messages)
-    choice = response["choices"][0]["message"]
-
-    # ---------------------------------------------------------------------
-    # 3. Process tool calls (Brave Search)
-    # ---------------------------------------------------------------------
-    if choice.get("tool_calls"):
-        for tool_call in choice["tool_calls"]:
-            name = tool_call["function"]["name"]
-            args = json.loads(tool_call["function"].get("arguments", "{}"))
-            if name == "search_web":
-                query = args["query"]
-                num = args.get("num_results", 6)
-                results = brave_search(query, num_results=num)
-                # Feed results back
-                tool_msg = {
-                    "role": "tool",
-                    "tool_call_id": tool_call["id"],
-                    "content": json.dumps(results),
-                }
-                messages.append(tool_msg)
-        # Add the assistant tool‑call message and re‑ask
-        messages.append(choice)
-        messages.append({"role": "user", "content": "Now provide your SDG scores."})
-        response2 = _call_llm(messages)
-        final_msg = response2["choices"][0]["message"]["content"]
-    else:
-        final_msg = choice.get("content", "")
-
+def _answer_tool_calls(
+    choice: Dict[str, Any],
+    messages: List[Dict[str, Any]],
+    form_data: Dict[str, Any],
+) -> None:
+    """Run the requested Brave searches and append the follow‑up messages."""
+    # Tool messages must follow the assistant message that requested them
+    messages.append(choice)
+    # The evidence budget is shared by every search in this pass
+    claim_text = _claim_text(form_data)
+    call_budget = EVIDENCE_PACKER.token_budget // len(choice["tool_calls"])
+    for tool_call in choice["tool_calls"]:
+        name = tool_call["function"]["name"]
+        args = json.loads(tool_call["function"].get("arguments") or "{}")
+        if name == "search_web":
+            query = args["query"]
+            num = args.get("num_results", 6)
+            results = brave_search(query, num_results=num)
+            packed = EVIDENCE_PACKER.pack(
+                f"{query} {claim_text}",
+                results,
+                text_fields=("title", "description"),
+                token_budget=call_budget,
+            )
+            content = json.dumps(packed["snippets"])
+        else:
+            # Every tool call needs an answer, or the API rejects the next request
+            content = json.dumps({"error": f"Unknown tool: {name}"})
+        # Feed results back
+        tool_msg = {
+            "role": "tool",
+            "tool_call_id": tool_call["id"],
+            "content": content,
+        }
+        messages.append(tool_msg)
+    # Re‑ask for the scores
+    messages.append({"role": "user", "content": "Now provide your SDG scores."})
+
+def _build_report(
+    final_msg: str,
+    company_name: str,
+    proponent: str,
+    emission_reductions: Optional[float],
+    industry: Optional[str],
+) -> Dict[str, Any]:
+    """Parse the model's final answer and compute the token allocation."""
     # ---------------------------------------------------------------------
     # 4. Parse LLM JSON output (robust vs hallucinations)
     # ---------------------------------------------------------------------
     match = re.search(r"{.*}", final_msg, re.S)
     if not match:
-        return {
-            "success": False,
-            "message": "Certification failed, I didn't get credible sources to verify the project.",
-        }
+        return dict(FAILURE)
 
     try:
         llm_json = json.loads(match.group(0))
         sdg_items: list[dict[str, Any]] = llm_json["sdg_scores"]
     except Exception:
-        return {
-            "success": False,
-            "message": "Certification failed, I didn't get credible sources to verify the project.",
-        }
+        return dict(FAILURE)
 
     # ---------------------------------------------------------------------
     # 5. Compute geometric mean & tokens
@@ -258,10 +343,7 @@ def certify_project(form_data: Dict[str, Any]) -> Dict[str, Any]:
     gm_score = geometric_mean(scores)
 
     if emission_reductions is None or gm_score == 0:
-        return {
-            "success": False,
-            "message": "Certification failed, I didn't get credible sources to verify the project.",
-        }
+        return dict(FAILURE)
 
     tokens = round(emission_reductions * (gm_score / 10))
 
@@ -282,6 +364,89 @@ def certify_project(form_data: Dict[str, Any]) -> Dict[str, Any]:
         },
     }
 
+def certify_project(form_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Public entry point – returns a JSON certification report or failure msg."""
+    company_name: str = form_data.get("company_name", "").strip()
+    proponent: str = form_data.get("proponent", "").strip()
+
+    # ---------------------------------------------------------------------
+    # 1. Pipeline CSV lookup
+    # ---------------------------------------------------------------------
+    emission_reductions, industry = lookup_project(company_name, proponent)
+
+    # ---------------------------------------------------------------------
+    # 2. Initial LLM prompt
+    # ---------------------------------------------------------------------
+    messages = _initial_messages(form_data)
+
+    # First LLM pass – may trigger tool calls
+    response = _call_llm(messages)
+    choice = response["choices"][0]["message"]
+
+    # ---------------------------------------------------------------------
+    # 3. Process tool calls (Brave Search)
+    # ---------------------------------------------------------------------
+    if choice.get("tool_calls"):
+        _answer_tool_calls(choice, messages, form_data)
+        # One search round only: the model must answer now
+        response2 = _call_llm(messages, tools=False)
+        final_msg = response2["choices"][0]["message"].get("content") or ""
+    else:
+        final_msg = choice.get("content", "")
+
+    return _build_report(final_msg, company_name, proponent, emission_reductions, industry)
+
+def certify_project_stream(form_data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Streaming variant of :func:`certify_project`.
+
+    Yields events as the model produces them:
+
+    * ``{"event": "delta", "data": str}`` – raw content deltas,
+    * ``{"event": "sdg_score", "data": dict}`` – each SDG score as soon as
+      its JSON object closes,
+    * ``{"event": "result", "data": dict}`` – the final report, identical to
+      what :func:`certify_project` returns.
+    """
+    company_name: str = form_data.get("company_name", "").strip()
+    proponent: str = form_data.get("proponent", "").strip()
+    emission_reductions, industry = lookup_project(company_name, proponent)
+
+    messages = _initial_messages(form_data)
+    for round_ in range(MAX_TOOL_ROUNDS + 1):
+        parser = SDGScoreStreamParser()
+        tool_calls: Dict[int, Dict[str, Any]] = {}
+        # Past the tool-round cap the model is asked without tools, so it answers
+        for delta in _stream_llm(messages, tools=round_ < MAX_TOOL_ROUNDS):
+            content = delta.get("content")
+            if content:
+                yield {"event": "delta", "data": content}
+                for item in parser.feed(content):
+                    yield {"event": "sdg_score", "data": item}
+            # Tool‑call names/arguments arrive in fragments keyed by index
+            for fragment in delta.get("tool_calls") or []:
+                call = tool_calls.setdefault(
+                    fragment["index"],
+                    {"id": "", "type": "function", "function": {"name": "", "arguments": ""}},
+                )
+                call["id"] = fragment.get("id") or call["id"]
+                function = fragment.get("function") or {}
+                call["function"]["name"] += function.get("name") or ""
+                call["function"]["arguments"] += function.get("arguments") or ""
+
+        if not tool_calls:
+            break
+        choice = {
+            "role": "assistant",
+            "content": parser.buffer or None,
+            "tool_calls": [tool_calls[i] for i in sorted(tool_calls)],
+        }
+        _answer_tool_calls(choice, messages, form_data)
+
+    yield {
+        "event": "result",
+        "data": _build_report(parser.buffer, company_name, proponent, emission_reductions, industry),
+    }
+
 async def scrape_brave_and_condense(
     query: str,
     num_results: int = 5,
@@ -0,0 +1,283 @@
+"""
+Offline bulk certification of registry exports (e.g. ``pipeline.csv``).
+
+Rows are fanned out across a process pool, with a global rate limit on how
+fast new certifications start, and every finished row is appended to a
+JSONL checkpoint file.  Re-running the same command skips rows already in
+the checkpoint, so a crashed or interrupted run resumes where it stopped.
+Successful certifications are written through ``ProjectStorageService`` as
+``reg_<ID>`` projects.
+
+Usage (from ``backend/src``)::
+
+    python -m controllers.batch_certification --csv ../pipeline.csv \
+        --workers 4 --rate 20 --checkpoint ../data/batch_checkpoint.jsonl
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from dotenv import load_dotenv
+
+from controllers.LLMCertification import PIPELINE_CSV, certify_project
+from models.project import (
+    Project, SDGClaim, VerificationResult, ProjectVerification, ProjectStatus
+)
+from services.storage.project_storage import ProjectStorageService
+
+logger = logging.getLogger(__name__)
+
+###############################################################################
+# Input & checkpoint helpers
+###############################################################################
+
+def read_rows(csv_path: Path) -> Iterator[Dict[str, str]]:
+    """Yield registry rows with stripped column names."""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield {k.strip(): (v or "").strip() for k, v in row.items() if k}
+
+def load_checkpoint(path: Path, retry_failed: bool = False) -> Set[str]:
+    """Return the registry IDs already processed according to *path*.
+
+    A truncated last line (crash mid‑write) is ignored.
+    """
+    done: Set[str] = set()
+    if not path.exists():
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if retry_failed and not record.get("success"):
+                done.discard(record["id"])
+            else:
+                done.add(record["id"])
+    return done
+
+def append_checkpoint(path: Path, record: Dict[str, Any]) -> None:
+    """Durably append one result record to the checkpoint file."""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+class RateLimiter:
+    """Token bucket limiting how many certifications start per minute."""
+
+    def __init__(self, per_minute: float, burst: int = 1):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            time.sleep((1 - self.tokens) * self.interval)
+
+###############################################################################
+# Worker
+###############################################################################
+
+def certify_row(row: Dict[str, str]) -> Dict[str, Any]:
+    """Certify one registry row (runs inside a pool worker)."""
+    description = "; ".join(
+        f"{col}: {row[col]}"
+        for col in ("Project Type", "Methodology", "Country/Area", "Region")
+        if row.get(col)
+    )
+    form_data = {
+        "company_name": row.get("Name", ""),
+        "proponent": row.get("Proponent", ""),
+        "description": description,
+        "sdg_claims": [],
+    }
+    try:
+        return certify_project(form_data)
+    except Exception as e:
+        return {"success": False, "message": f"Certification failed: {e}"}
+
+###############################################################################
+# Storage
+###############################################################################
+
+def save_certification(
+    storage: ProjectStorageService,
+    row: Dict[str, str],
+    data: Dict[str, Any],
+) -> str:
+    """Store a successful certification as project ``reg_<ID>``."""
+    project_id = f"reg_{row['ID']}"
+    sources = data.get("Credible_Sources", [])
+
+    results = []
+    for item in data.get("SDG_Verifications", []):
+        digits = "".join(filter(str.isdigit, str(item.get("sdg", ""))))
+        score = float(item.get("score", 0)) * 10  # Scale 0-10 to 0-100
+        results.append(VerificationResult(
+            sdg_id=int(digits) if digits else 0,
+            verification_score=score,
+            confidence_level="high" if score >= 80 else "medium" if score >= 50 else "low",
+            evidence_found=score > 30,
+            evidence_summary=item.get("justification", ""),
+            sources=sources,
+        ))
+
+    total_score = sum(r.verification_score for r in results) / len(results) if results else 0
+    project = Project(
+        id=project_id,
+        company_name=row.get("Proponent") or row.get("Name", ""),
+        project_name=row.get("Name", ""),
+        description=row.get("Project Type", ""),
+        status=ProjectStatus.VERIFICATION_COMPLETE,
+        sdg_claims=[
+            SDGClaim(sdg_id=r.sdg_id, justification=r.evidence_summary) for r in results
+        ],
+        verification=ProjectVerification(
+            verification_id=f"ver_{uuid.uuid4().hex[:8]}",
+            company_name=row.get("Proponent") or row.get("Name", ""),
+            project_id=project_id,
+            total_score=total_score,
+            verification_date=datetime.now(),
+            results=results,
+        ),
+    )
+    return storage.save_project(project)
+
+###############################################################################
+# Driver
+###############################################################################
+
+def run_batch(
+    csv_path: Path,
+    checkpoint_path: Path,
+    workers: int = 4,
+    rate_per_minute: float = 20.0,
+    limit: Optional[int] = None,
+    retry_failed: bool = False,
+    storage: Optional[ProjectStorageService] = None,
+) -> Dict[str, int]:
+    """Certify every row of *csv_path* not yet recorded in the checkpoint.
+
+    At most ``2 × workers`` rows are in flight; new rows are only dispatched
+    once the global rate limiter allows it.  Returns summary counters.
+    """
+    storage = storage or ProjectStorageService()
+    checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+    done = load_checkpoint(checkpoint_path, retry_failed=retry_failed)
+    limiter = RateLimiter(rate_per_minute, burst=workers)
+    stats = {"skipped": 0, "succeeded": 0, "failed": 0}
+
+    pending: Dict[Future, Dict[str, str]] = {}
+    max_in_flight = max(1, workers * 2)
+
+    def drain(block_until: int) -> None:
+        while len(pending) > block_until:
+            finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for fut in finished:
+                row = pending.pop(fut)
+                _record(fut, row)
+
+    def _record(fut: Future, row: Dict[str, str]) -> None:
+        try:
+            result = fut.result()
+        except Exception as e:  # worker crashed
+            result = {"success": False, "message": f"Worker error: {e}"}
+
+        record: Dict[str, Any] = {
+            "id": row["ID"],
+            "name": row.get("Name", ""),
+            "success": bool(result.get("success")),
+            "finished_at": datetime.now().isoformat(),
+        }
+        if result.get("success"):
+            try:
+                record["project_id"] = save_certification(storage, row, result["data"])
+            except Exception as e:  # disk / serialization error: checkpoint the row as failed
+                logger.error(f"[batch] saving {row['ID']} failed: {e}")
+                result = {"success": False, "message": f"Save failed: {e}"}
+                record["success"] = False
+        if result.get("success"):
+            record["tokens"] = result["data"].get("Tokens to Mint")
+            stats["succeeded"] += 1
+        else:
+            record["message"] = result.get("message", "")
+            stats["failed"] += 1
+        append_checkpoint(checkpoint_path, record)
+        logger.info(
+            f"[batch] {row['ID']} {'ok' if record['success'] else 'failed'} "
+            f"({stats['succeeded']} ok / {stats['failed']} failed)"
+        )
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        submitted = 0
+        for row in read_rows(csv_path):
+            if not row.get("ID") or row["ID"] in done:
+                stats["skipped"] += 1
+                continue
+            if limit is not None and submitted >= limit:
+                break
+            drain(max_in_flight - 1)
+            limiter.acquire()
+            pending[pool.submit(certify_row, row)] = row
+            submitted += 1
+        drain(0)
+
+    return stats
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Bulk-certify registry projects")
+    parser.add_argument("--csv", type=Path, default=PIPELINE_CSV, help="Registry CSV export")
+    parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        default=Path("data/batch_checkpoint.jsonl"),
+        help="JSONL progress file used to resume interrupted runs",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes")
+    parser.add_argument(
+        "--rate", type=float, default=20.0, help="Max certifications started per minute (0 = unlimited)"
+    )
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many new rows")
+    parser.add_argument("--retry-failed", action="store_true", help="Re-run rows that failed before")
+    parser.add_argument("--data-dir", default=None, help="Project storage directory")
+    args = parser.parse_args(argv)
+
+    stats = run_batch(
+        args.csv,
+        args.checkpoint,
+        workers=args.workers,
+        rate_per_minute=args.rate,
+        limit=args.limit,
+        retry_failed=args.retry_failed,
+        storage=ProjectStorageService(args.data_dir),
+    )
+    print(json.dumps(stats))
+
+if __name__ == "__main__":
+    load_dotenv()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    main()
@@ -7,6 +7,7 @@ from dotenv import load_dotenv
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any, Union
 import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime
 import json
 import logging
@@ -20,10 +21,21 @@ from models.project import (
 # Import storage service
 from services.storage.project_storage import ProjectStorageService
 
+# Import metrics registry
+from utils.metrics import metrics
+
 # Import API routers
 from services.api.certification_api import router as certification_router
-from services.api.token_api import router as token_router
-from services.api.oracle_api import router as oracle_router
+from services.api.token_api import (
+    router as token_router, start_ledger_stream, stop_ledger_stream
+)
+from services.api.py_node_bridge import close_js_bridge
+from services.api.oracle_api import (
+    router as oracle_router, start_price_refresher, stop_price_refresher,
+    start_oracle_publisher, stop_oracle_publisher
+)
+from services.api.registry_api import router as registry_router
+from services.xrpl.connection import xrpl_connection
 
 # Set up logging
 logging.basicConfig(
@@ -47,10 +59,27 @@ from controllers.scrape_and_verify import scrape_brave_and_condense_mcp
 # Initialize services
 project_storage = ProjectStorageService()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep the oracle price cache warm so requests never wait on upstream APIs
+    start_price_refresher()
+    # One supervised XRPL websocket shared by the oracle and ledger reads; the
+    # ledger stream registers first so it subscribes on the first connect
+    start_ledger_stream()
+    await xrpl_connection.start()
+    start_oracle_publisher()
+    yield
+    await stop_oracle_publisher()
+    await stop_price_refresher()
+    stop_ledger_stream()
+    await xrpl_connection.stop()
+    await close_js_bridge()
+
 app = FastAPI(
     title="Green Asset API",
     description="API for Green Asset Platform with SDG claim verification and MP Token issuance",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # Service dependency
@@ -70,6 +99,7 @@ app.add_middleware(
 app.include_router(certification_router)
 app.include_router(token_router)
 app.include_router(oracle_router)
+app.include_router(registry_router)
 
 # API Request/Response Models
 class SDGClaimRequest(BaseModel):
@@ -113,6 +143,7 @@ class ProjectResponse(BaseModel):
     updatedAt: str
     sdgClaims: List[Dict[str, Any]]
     verification: Optional[Dict[str, Any]] = None
+    certificationStale: bool = False
     
 class ProjectListResponse(BaseModel):
     projects: List[ProjectResponse]
@@ -122,6 +153,13 @@ class ProjectListResponse(BaseModel):
 def read_root():
     return {"status": "online", "service": "Green Asset API"}
 
+@app.get("/api/metrics")
+def read_metrics():
+    """
+    Get in-process service metrics (counters and summaries)
+    """
+    return {"success": True, "metrics": metrics.snapshot()}
+
 # Project management endpoints
 @app.post("/api/projects", response_model=ProjectResponse)
 async def create_project(
@@ -218,7 +256,8 @@ async def list_projects(
                     "checked": claim.checked,
                     "justification": claim.justification
                 } for claim in project.sdg_claims],
-                verification=project.verification.dict() if project.verification else None
+                verification=project.verification.dict() if project.verification else None,
+                certificationStale=project.certification_stale
             ))
         
         return ProjectListResponse(
@@ -256,7 +295,8 @@ async def get_project(
                 "checked": claim.checked,
                 "justification": claim.justification
             } for claim in project.sdg_claims],
-            verification=project.verification.dict() if project.verification else None
+            verification=project.verification.dict() if project.verification else None,
+            certificationStale=project.certification_stale
         )
     except HTTPException:
         raise  # Re-raise HTTP exceptions
@@ -46,6 +46,7 @@ class Project(BaseModel):
     status: ProjectStatus = ProjectStatus.DRAFT
     sdg_claims: List[SDGClaim]
     verification: Optional[ProjectVerification] = None
+    certification_stale: bool = False  # Registry entry changed since certification
     
     class Config:
         json_encoders = {
@@ -54,6 +55,10 @@ class Project(BaseModel):
 
 def project_to_dict(project: Project) -> Dict[str, Any]:
     """Convert a project model to a dictionary for storage"""
+    verification = project.verification.dict() if project.verification else None
+    if verification and isinstance(verification.get("verification_date"), datetime):
+        verification["verification_date"] = verification["verification_date"].isoformat()
+        
     return {
         "id": project.id,
         "company_name": project.company_name,
@@ -63,7 +68,8 @@ def project_to_dict(project: Project) -> Dict[str, Any]:
         "updated_at": project.updated_at.isoformat(),
         "status": project.status,
         "sdg_claims": [claim.dict() for claim in project.sdg_claims],
-        "verification": project.verification.dict() if project.verification else None
+        "verification": verification,
+        "certification_stale": project.certification_stale
     }
 
 def dict_to_project(data: Dict[str, Any]) -> Project:
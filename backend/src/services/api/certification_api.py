@@ -3,6 +3,7 @@ FastAPI endpoints for project certification using LLM
 """
 
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import sys
@@ -14,7 +15,7 @@ from datetime import datetime
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 # Import the certification functions
-from controllers.LLMCertification import certify_project
+from controllers.LLMCertification import certify_project, certify_project_stream
 
 # Create router
 router = APIRouter(
@@ -56,82 +57,96 @@ class CertificationResponse(BaseModel):
     credibleSources: Optional[List[str]] = None
     message: Optional[str] = None
 
+def _certification_data(request: CertificationRequest) -> Dict[str, Any]:
+    """Map the API request onto the certification pipeline input"""
+    return {
+        "company_name": request.company_name,
+        "proponent": request.company_name,
+        "description": request.description,
+        "sdg_claims": [
+            {
+                "sdg_id": claim.sdg_id,
+                "justification": claim.justification
+            }
+            for claim in request.sdg_claims
+        ]
+    }
+
+def _to_verification_result(item: Dict[str, Any], sources: List[str]) -> VerificationResult:
+    """Convert one LLM SDG score (0-10) to an API verification result (0-100)"""
+    # Extract SDG ID from format like "SDG 1"
+    try:
+        sdg_text = item.get("sdg", "")
+        sdg_id = int(''.join(filter(str.isdigit, str(sdg_text))))
+    except:
+        sdg_id = 0
+        
+    score = item.get("score", 0) * 10  # Scale 0-10 to 0-100
+    
+    return VerificationResult(
+        sdgId=sdg_id,
+        verificationScore=score,
+        confidenceLevel="high" if score >= 80 else "medium" if score >= 50 else "low",
+        evidenceFound=score > 30,
+        evidenceSummary=item.get("justification", ""),
+        sources=sources
+    )
+
+def _to_certification_response(request: CertificationRequest, result: Dict[str, Any]) -> CertificationResponse:
+    """Build the API response from a certify_project result"""
+    if not result["success"]:
+        return CertificationResponse(
+            success=False,
+            message=result.get("message", "Certification failed")
+        )
+    
+    # Extract verification data
+    data = result["data"]
+    
+    # Transform SDG verification data
+    verification_results = [
+        _to_verification_result(item, data.get("Credible_Sources", []))
+        for item in data.get("SDG_Verifications", [])
+    ]
+    
+    # Generate project ID
+    import uuid
+    project_id = f"cert_{uuid.uuid4().hex[:8]}"
+    
+    # Calculate total score
+    total_score = (
+        sum(r.verificationScore for r in verification_results) / 
+        len(verification_results)
+    ) if verification_results else 0
+    
+    return CertificationResponse(
+        success=True,
+        projectId=project_id,
+        companyName=request.company_name,
+        totalScore=total_score,
+        verificationDate=datetime.now().isoformat(),
+        results=verification_results,
+        tokenAmount=data.get("Tokens to Mint", 0),
+        geometricMeanScore=data.get("Geometric Mean Score", 0),
+        emissionReductions=data.get("Estimated Annual Emission Reductions", 0),
+        industry=data.get("Industry", ""),
+        credibleSources=data.get("Credible_Sources", [])
+    )
+
+def _sse(event: str, data: Any) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @router.post("", response_model=CertificationResponse)
 async def certify_project_endpoint(request: CertificationRequest):
     """
     Certify a project's SDG claims using LLM with web search capability
     """
     try:
-        # Prepare certification data
-        certification_data = {
-            "company_name": request.company_name,
-            "proponent": request.company_name,
-            "description": request.description,
-            "sdg_claims": [
-                {
-                    "sdg_id": claim.sdg_id,
-                    "justification": claim.justification
-                }
-                for claim in request.sdg_claims
-            ]
-        }
-        
         # Call the certification function
-        result = certify_project(certification_data)
+        result = certify_project(_certification_data(request))
         
-        if not result["success"]:
-            return CertificationResponse(
-                success=False,
-                message=result.get("message", "Certification failed")
-            )
-        
-        # Extract verification data
-        data = result["data"]
-        
-        # Transform SDG verification data
-        verification_results = []
-        for item in data.get("SDG_Verifications", []):
-            # Extract SDG ID from format like "SDG 1"
-            try:
-                sdg_text = item.get("sdg", "")
-                sdg_id = int(''.join(filter(str.isdigit, sdg_text)))
-            except:
-                sdg_id = 0
-                
-            score = item.get("score", 0) * 10  # Scale 0-10 to 0-100
-            
-            verification_results.append(VerificationResult(
-                sdgId=sdg_id,
-                verificationScore=score,
-                confidenceLevel="high" if score >= 80 else "medium" if score >= 50 else "low",
-                evidenceFound=score > 30,
-                evidenceSummary=item.get("justification", ""),
-                sources=data.get("Credible_Sources", [])
-            ))
-        
-        # Generate project ID
-        import uuid
-        project_id = f"cert_{uuid.uuid4().hex[:8]}"
-        
-        # Calculate total score
-        total_score = (
-            sum(r.verificationScore for r in verification_results) / 
-            len(verification_results)
-        ) if verification_results else 0
-        
-        return CertificationResponse(
-            success=True,
-            projectId=project_id,
-            companyName=request.company_name,
-            totalScore=total_score,
-            verificationDate=datetime.now().isoformat(),
-            results=verification_results,
-            tokenAmount=data.get("Tokens to Mint", 0),
-            geometricMeanScore=data.get("Geometric Mean Score", 0),
-            emissionReductions=data.get("Estimated Annual Emission Reductions", 0),
-            industry=data.get("Industry", ""),
-            credibleSources=data.get("Credible_Sources", [])
-        )
+        return _to_certification_response(request, result)
     
     except Exception as e:
         import traceback
@@ -139,4 +154,41 @@ async def certify_project_endpoint(request: CertificationRequest):
         return CertificationResponse(
             success=False,
             message=f"Certification failed: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.post("/stream")
+def certify_project_stream_endpoint(request: CertificationRequest):
+    """
+    Certify a project's SDG claims, streaming progress as server-sent events
+
+    Events:
+        delta: raw model output as it is generated
+        sdg_score: one VerificationResult as soon as the model finishes it
+        result: the final CertificationResponse
+    """
+    def events():
+        try:
+            for event in certify_project_stream(_certification_data(request)):
+                if event["event"] == "delta":
+                    yield _sse("delta", event["data"])
+                elif event["event"] == "sdg_score":
+                    yield _sse("sdg_score", _to_verification_result(event["data"], []).dict())
+                else:
+                    response = _to_certification_response(request, event["data"])
+                    yield _sse("result", response.dict())
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            response = CertificationResponse(
+                success=False,
+                message=f"Certification failed: {str(e)}"
+            )
+            yield _sse("result", response.dict())
+
+    # A sync generator is iterated in the threadpool, so the blocking LLM
+    # stream never holds up the event loop
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -2,14 +2,17 @@
 FastAPI endpoints for XRPL oracle price data
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Dict, Any, List, Optional
 import asyncio
 import sys
 from pathlib import Path
 import json
+import logging
 import os
+import random
 import time
 from datetime import datetime, timedelta
 
@@ -18,11 +21,18 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 
 # Import oracle service
 from services.xrpl.oracle_service import (
-    get_carbon_price_usd,
-    get_xrp_usd,
+    get_prices,
+    update_loop,
     TOKEN_CODE,
+    UPDATE_INTERVAL,
     WSS
 )
+from services.xrpl.connection import xrpl_connection
+
+logger = logging.getLogger(__name__)
+
+from services.storage.price_store import PriceStore, RESOLUTIONS, FIELDS as PRICE_FIELDS
+from utils.broadcaster import Broadcaster
 
 # Create router
 router = APIRouter(
@@ -39,6 +49,10 @@ class PriceResponse(BaseModel):
     price_usd: Optional[float] = None
     xrp_usd_rate: Optional[float] = None
     timestamp: str
+    last_update: Optional[str] = None
+    age_seconds: Optional[float] = None
+    stale: bool = False  # Served past the cache TTL while a refresh runs
+    sources: Optional[Dict[str, Any]] = None  # Contributing/rejected/failed feeds per price
     message: Optional[str] = None
 
 class HistoricalPrice(BaseModel):
@@ -53,88 +67,233 @@ class PriceHistoryResponse(BaseModel):
     prices: List[HistoricalPrice] = []
     message: Optional[str] = None
 
-# In-memory price cache with 30-minute TTL
+class Candle(BaseModel):
+    timestamp: str  # Bucket start
+    open: float
+    high: float
+    low: float
+    close: float
+    samples: int
+
+class CandleResponse(BaseModel):
+    success: bool
+    token_code: str = TOKEN_CODE
+    resolution: str
+    field: str
+    candles: List[Candle] = []
+    message: Optional[str] = None
+
+# In-memory price cache; entries older than the TTL are served stale while
+# a single background refresh runs
+PRICE_CACHE_TTL = timedelta(seconds=int(os.getenv("PRICE_CACHE_TTL_SEC", "1800")))
+# Minimum delay before retrying after a failed refresh
+PRICE_REFRESH_RETRY = timedelta(seconds=int(os.getenv("PRICE_REFRESH_RETRY_SEC", "30")))
+
 price_cache = {
     "last_update": None,
     "price_xrp": None,
     "price_usd": None,
-    "xrp_usd_rate": None
+    "xrp_usd_rate": None,
+    "sources": None
 }
 
-# Historical prices (in-memory for simplicity; in production use a database)
-PRICE_HISTORY_MAX_ITEMS = 100
-price_history = []
+# Persistent price history with pre-aggregated OHLC candles
+price_store = PriceStore(os.getenv("PRICE_STORE_DIR"))
+
+# Live price push channel (SSE and WebSocket subscribers)
+price_broadcaster = Broadcaster("price_stream")
+PRICE_STREAM_KEEPALIVE_SEC = 15
+
+# force_refresh is ignored while the cached price is younger than this
+PRICE_FORCE_REFRESH_MIN = timedelta(seconds=int(os.getenv("PRICE_FORCE_REFRESH_MIN_SEC", "60")))
+
+# Background refresher: +/- fraction of UPDATE_INTERVAL added to each sleep so
+# workers started together drift apart instead of polling in lockstep
+PRICE_REFRESH_JITTER = float(os.getenv("PRICE_REFRESH_JITTER", "0.1"))
+PRICE_REFRESHER_ENABLED = os.getenv("PRICE_REFRESHER_ENABLED", "true").lower() != "false"
+# Run the on-ledger oracle publisher inside the API process, sharing its XRPL connection
+ORACLE_PUBLISHER_ENABLED = os.getenv("ORACLE_PUBLISHER_ENABLED", "false").lower() == "true"
+
+# Single-flight state: at most one upstream fetch runs at a time
+_refresh_task: Optional[asyncio.Task] = None
+_last_refresh_attempt: Optional[datetime] = None
+_last_refresh_error: Optional[str] = None
+
+async def _fetch_prices():
+    """Fetch prices from upstream and update the cache and history"""
+    global price_cache, _last_refresh_error
+    
+    import aiohttp
+    async with aiohttp.ClientSession() as session:
+        # Carbon USD and XRP/USD sources are queried concurrently
+        prices = await get_prices(session)
+    
+    carbon_usd = prices["carbon_usd"]
+    xrp_usd_rate = prices["xrp_usd"]
+    price_xrp = prices["price_xrp"]
+    
+    # Swap in a new dict so readers never see a half-updated cache
+    price_cache = {
+        "last_update": datetime.now(),
+        "price_xrp": price_xrp,
+        "price_usd": carbon_usd,
+        "xrp_usd_rate": xrp_usd_rate,
+        "sources": prices["sources"]
+    }
+    _last_refresh_error = None
+    
+    # Add to history and push to live subscribers
+    add_price_to_history(price_xrp, carbon_usd, xrp_usd_rate)
+    price_broadcaster.publish(_price_event(price_cache))
+
+def _price_event(cache):
+    return {
+        "token_code": TOKEN_CODE,
+        "price_xrp": cache["price_xrp"],
+        "price_usd": cache["price_usd"],
+        "xrp_usd_rate": cache["xrp_usd_rate"],
+        "timestamp": cache["last_update"].isoformat()
+    }
+
+def _on_refresh_done(task: asyncio.Task):
+    global _last_refresh_error
+    
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        _last_refresh_error = str(error)
+        logger.warning(f"Price refresh failed: {error}")
+
+def refresh_prices() -> asyncio.Task:
+    """
+    Start a price refresh, or join the one already in flight
+    
+    Returns:
+        The refresh task (await it with asyncio.shield to wait for fresh prices)
+    """
+    global _refresh_task, _last_refresh_attempt
+    
+    if _refresh_task is None or _refresh_task.done():
+        _last_refresh_attempt = datetime.now()
+        _refresh_task = asyncio.ensure_future(_fetch_prices())
+        _refresh_task.add_done_callback(_on_refresh_done)
+    return _refresh_task
+
+def _cached_prices(stale: bool):
+    last_update = price_cache["last_update"]
+    return {
+        "price_xrp": price_cache["price_xrp"],
+        "price_usd": price_cache["price_usd"],
+        "xrp_usd_rate": price_cache["xrp_usd_rate"],
+        "sources": price_cache["sources"],
+        "last_update": last_update,
+        "age_seconds": (datetime.now() - last_update).total_seconds(),
+        "stale": stale
+    }
 
 async def get_current_prices(force_refresh=False):
-    """Get current token prices from oracle or cache"""
-    global price_cache
-    
-    # Check if cache is valid (less than 30 minutes old)
-    cache_valid = (
-        price_cache["last_update"] is not None and
-        (datetime.now() - price_cache["last_update"]) < timedelta(minutes=30) and
-        not force_refresh
-    )
+    """
+    Get current token prices from the cache
     
-    if cache_valid:
-        return {
-            "price_xrp": price_cache["price_xrp"],
-            "price_usd": price_cache["price_usd"],
-            "xrp_usd_rate": price_cache["xrp_usd_rate"]
-        }
+    An expired entry is returned immediately (marked stale) while one
+    background refresh runs; only an empty cache or *force_refresh* waits
+    for upstream, and concurrent callers share the same fetch.
+    """
+    # Clients cannot force upstream fetches more often than PRICE_FORCE_REFRESH_MIN
+    if force_refresh and price_cache["last_update"] is not None and (
+        datetime.now() - price_cache["last_update"] < PRICE_FORCE_REFRESH_MIN
+    ):
+        force_refresh = False
     
-    # Fetch fresh prices
-    try:
-        import aiohttp
-        async with aiohttp.ClientSession() as session:
-            # Get carbon credit price in USD and XRP/USD rate
-            carbon_usd = await get_carbon_price_usd(session)
-            xrp_usd_rate = await get_xrp_usd(session)
-            
-            # Calculate GRASS/XRP price
-            price_xrp = carbon_usd / xrp_usd_rate
-            
-            # Update cache
-            price_cache = {
-                "last_update": datetime.now(),
-                "price_xrp": price_xrp,
-                "price_usd": carbon_usd,
-                "xrp_usd_rate": xrp_usd_rate
-            }
-            
-            # Add to history
-            add_price_to_history(price_xrp, carbon_usd, xrp_usd_rate)
-            
-            return {
-                "price_xrp": price_xrp,
-                "price_usd": carbon_usd,
-                "xrp_usd_rate": xrp_usd_rate
-            }
-    except Exception as e:
-        # If fetching fails, return cached values if available
-        if price_cache["last_update"] is not None:
-            return {
-                "price_xrp": price_cache["price_xrp"],
-                "price_usd": price_cache["price_usd"],
-                "xrp_usd_rate": price_cache["xrp_usd_rate"]
-            }
-        raise e
+    if price_cache["last_update"] is None or force_refresh:
+        try:
+            await asyncio.shield(refresh_prices())
+        except Exception:
+            # If fetching fails, return cached values if available
+            if price_cache["last_update"] is None:
+                raise
+            return _cached_prices(stale=True)
+        return _cached_prices(stale=False)
+    
+    now = datetime.now()
+    if now - price_cache["last_update"] < PRICE_CACHE_TTL:
+        return _cached_prices(stale=False)
+    
+    # Stale: revalidate in the background (backing off after failures)
+    if _last_refresh_error is None or now - _last_refresh_attempt >= PRICE_REFRESH_RETRY:
+        refresh_prices()
+    return _cached_prices(stale=True)
 
-def add_price_to_history(price_xrp, price_usd, xrp_usd_rate):
-    """Add current price to history"""
-    global price_history
+async def run_price_refresher(interval: float = UPDATE_INTERVAL):
+    """
+    Refresh prices every *interval* seconds (jittered) until cancelled
     
-    # Add new price point
-    price_history.append({
-        "timestamp": datetime.now().isoformat(),
-        "price_xrp": price_xrp,
-        "price_usd": price_usd,
-        "xrp_usd_rate": xrp_usd_rate
-    })
+    Args:
+        interval: Seconds between refreshes
+    """
+    # Random start offset so several workers do not hit upstream together
+    await asyncio.sleep(random.uniform(0, min(interval * PRICE_REFRESH_JITTER, 5)))
+    while True:
+        try:
+            await asyncio.shield(refresh_prices())
+        except Exception:
+            pass  # Logged by _on_refresh_done; the cache keeps its last value
+        jitter = random.uniform(-PRICE_REFRESH_JITTER, PRICE_REFRESH_JITTER) * interval
+        await asyncio.sleep(max(1.0, interval + jitter))
+
+_refresher_task: Optional[asyncio.Task] = None
+
+def start_price_refresher():
+    """Start the background price refresher (called from the app lifespan)"""
+    global _refresher_task
+    
+    price_broadcaster.start()
+    if not PRICE_REFRESHER_ENABLED or (_refresher_task and not _refresher_task.done()):
+        return
+    _refresher_task = asyncio.ensure_future(run_price_refresher())
+    logger.info(f"Price refresher started (every {UPDATE_INTERVAL}s, jitter {PRICE_REFRESH_JITTER:.0%})")
+
+async def stop_price_refresher():
+    """Cancel the background price refresher and any refresh in flight"""
+    global _refresher_task
+    
+    await price_broadcaster.stop()
+    for task in (_refresher_task, _refresh_task):
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+    _refresher_task = None
+
+_publisher_task: Optional[asyncio.Task] = None
+
+def start_oracle_publisher():
+    """Start the oracle offer publisher if ORACLE_PUBLISHER_ENABLED (called from the app lifespan)"""
+    global _publisher_task
     
-    # Trim history if too large
-    if len(price_history) > PRICE_HISTORY_MAX_ITEMS:
-        price_history = price_history[-PRICE_HISTORY_MAX_ITEMS:]
+    if not ORACLE_PUBLISHER_ENABLED or (_publisher_task and not _publisher_task.done()):
+        return
+    _publisher_task = asyncio.ensure_future(update_loop(xrpl_connection))
+    logger.info("Oracle publisher started")
+
+async def stop_oracle_publisher():
+    """Cancel the oracle offer publisher"""
+    global _publisher_task
+    
+    if _publisher_task and not _publisher_task.done():
+        _publisher_task.cancel()
+        try:
+            await _publisher_task
+        except (asyncio.CancelledError, Exception):
+            pass
+    _publisher_task = None
+
+def add_price_to_history(price_xrp, price_usd, xrp_usd_rate):
+    """Append the current price to the persistent history"""
+    price_store.append(price_xrp, price_usd, xrp_usd_rate)
 
 @router.get("/price", response_model=PriceResponse)
 async def get_token_price(force_refresh: bool = False):
@@ -150,7 +309,11 @@ async def get_token_price(force_refresh: bool = False):
             price_xrp=prices["price_xrp"],
             price_usd=prices["price_usd"],
             xrp_usd_rate=prices["xrp_usd_rate"],
-            timestamp=datetime.now().isoformat()
+            timestamp=datetime.now().isoformat(),
+            last_update=prices["last_update"].isoformat(),
+            age_seconds=round(prices["age_seconds"], 3),
+            stale=prices["stale"],
+            sources=prices["sources"]
         )
     except Exception as e:
         return PriceResponse(
@@ -166,15 +329,15 @@ async def get_price_history(days: int = 7):
     """
     try:
         # Ensure we have some price data
-        if not price_history:
+        if not len(price_store):
             # Get current price to populate history
             await get_current_prices(force_refresh=True)
         
-        # Filter history by date if needed
-        cutoff_date = datetime.now() - timedelta(days=days)
+        # Binary search on the stored timestamps
+        cutoff = (datetime.now() - timedelta(days=days)).timestamp()
         filtered_history = [
-            price for price in price_history
-            if datetime.fromisoformat(price["timestamp"]) >= cutoff_date
+            {**point, "timestamp": datetime.fromtimestamp(point["timestamp"]).isoformat()}
+            for point in price_store.points(start=cutoff)
         ]
         
         return PriceHistoryResponse(
@@ -188,13 +351,116 @@ async def get_price_history(days: int = 7):
             message=f"Failed to get price history: {str(e)}"
         )
 
+@router.get("/candles", response_model=CandleResponse)
+async def get_price_candles(
+    resolution: str = Query("1h", description=f"One of {list(RESOLUTIONS)}"),
+    field: str = Query("price_xrp", description=f"One of {list(PRICE_FIELDS)}"),
+    start: Optional[datetime] = Query(None, description="Earliest candle start"),
+    end: Optional[datetime] = Query(None, description="Latest candle start"),
+    limit: int = Query(500, ge=1, le=5000, description="Most recent candles to return")
+):
+    """
+    Get pre-aggregated OHLC candles of token prices
+    """
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"Invalid resolution: {resolution}. Valid values: {list(RESOLUTIONS)}")
+    if field not in PRICE_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Invalid field: {field}. Valid values: {list(PRICE_FIELDS)}")
+    
+    try:
+        candles = price_store.candles(
+            resolution,
+            field=field,
+            start=start.timestamp() if start else None,
+            end=end.timestamp() if end else None,
+            limit=limit
+        )
+        return CandleResponse(
+            success=True,
+            resolution=resolution,
+            field=field,
+            candles=[
+                Candle(**{**c, "timestamp": datetime.fromtimestamp(c["timestamp"]).isoformat()})
+                for c in candles
+            ]
+        )
+    except Exception as e:
+        return CandleResponse(
+            success=False,
+            resolution=resolution,
+            field=field,
+            message=f"Failed to get price candles: {str(e)}"
+        )
+
+@router.get("/stream")
+async def stream_token_price(request: Request):
+    """
+    Push each new token price as a server-sent ``price`` event
+    
+    The latest known price is sent on connect; comment lines keep idle
+    connections open.
+    """
+    async def events():
+        async with price_broadcaster.subscribe() as queue:
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), PRICE_STREAM_KEEPALIVE_SEC)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield f"event: price\ndata: {json.dumps(message)}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/ws")
+async def price_websocket(websocket: WebSocket):
+    """
+    Push each new token price as a JSON message over a WebSocket
+    """
+    await websocket.accept()
+
+    async def client_gone():
+        # Client messages are ignored; reading notices a disconnect right away
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        except Exception:
+            pass  # Receiving on a closed socket: gone as well
+
+    async with price_broadcaster.subscribe() as queue:
+        gone = asyncio.ensure_future(client_gone())
+        try:
+            while True:
+                next_message = asyncio.ensure_future(queue.get())
+                await asyncio.wait({next_message, gone}, return_when=asyncio.FIRST_COMPLETED)
+                if gone.done():
+                    next_message.cancel()
+                    return
+                message = next_message.result()
+                if message is None:
+                    break
+                await websocket.send_json(message)
+            await websocket.close()
+        except (WebSocketDisconnect, RuntimeError, ConnectionError) as e:
+            # Closed while sending
+            logger.debug(f"Price WebSocket closed: {e}")
+        finally:
+            gone.cancel()
+
 @router.get("/xrpl-connection")
 async def get_xrpl_connection_info():
     """
-    Get information about the XRPL connection
+    Get information about the XRPL connection and its health
     """
     return {
         "success": True,
-        "network": WSS,
+        "network": xrpl_connection.url or WSS,
+        "connection": xrpl_connection.health(),
         "timestamp": datetime.now().isoformat()
     }
\ No newline at end of file
@@ -1,97 +1,324 @@
 """
 Bridge between Python FastAPI and Node.js XRPL client
+
+Calls go to a pool of long-lived Node processes (services/xrpl/bridgeWorker.js)
+speaking line-delimited JSON-RPC over stdio.  Each worker keeps its ledger
+connection open across calls and serves several of them concurrently.  The
+pool sends each call to the least-loaded worker, queues calls (up to a
+bound) when every worker is at its concurrency limit, and kills workers that
+stop answering; workers are (re)spawned on demand.
 """
 
 import asyncio
+import itertools
 import json
-import subprocess
+import logging
 import os
+import time
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+BRIDGE_WORKER = Path(__file__).parent.parent / "xrpl" / "bridgeWorker.js"
+NODE_BINARY = os.getenv("NODE_BINARY", "node")
+BRIDGE_WORKERS = int(os.getenv("BRIDGE_WORKERS", "2"))
+# Requests in flight per worker; further calls wait in the pool queue
+BRIDGE_WORKER_CONCURRENCY = int(os.getenv("BRIDGE_WORKER_CONCURRENCY", "8"))
+# Calls allowed to wait for a free worker before new ones are refused
+BRIDGE_QUEUE_SIZE = int(os.getenv("BRIDGE_QUEUE_SIZE", "256"))
+# Per-request deadline.  Submissions wait for validation until their
+# LastLedgerSequence (xrpl.js autofill: current ledger + 20, about 80 s), so the
+# default outlasts that window: a timed-out submission has an unknown outcome
+BRIDGE_TIMEOUT = float(os.getenv("BRIDGE_TIMEOUT_SEC", "120"))
+# A worker that cannot answer a ping within this after a timeout is killed
+BRIDGE_PING_TIMEOUT = 2.0
+# Responses (e.g. full transaction results) can exceed asyncio's 64 KiB line default
+_LINE_LIMIT = 16 * 1024 * 1024
+
+class BridgeBusyError(Exception):
+    """Raised when the pool queue is full"""
+
+class BridgeTimeoutError(Exception):
+    """Raised when a bridge request misses its deadline"""
+
+class BridgeWorker:
+    """One Node bridge process and the requests in flight on it"""
+
+    def __init__(self, index: int = 0, script: Path = BRIDGE_WORKER):
+        self.index = index
+        self.script = script
+        self.stats = {"requests": 0, "errors": 0, "timeouts": 0, "starts": 0}
+        self._assigned = 0  # Calls dispatched here and not finished (incl. while spawning)
+        self._process: Optional[asyncio.subprocess.Process] = None
+        # Requests in flight on the current process (each process has its own map)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._reader: Optional[asyncio.Task] = None
+        self._stderr: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    @property
+    def in_flight(self) -> int:
+        return self._assigned
+
+    async def start(self) -> None:
+        """Spawn the Node process unless it is already running"""
+        async with self._start_lock:
+            if self.running:
+                return
+            self._process = await asyncio.create_subprocess_exec(
+                NODE_BINARY, str(self.script),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                limit=_LINE_LIMIT
+            )
+            self.stats["starts"] += 1
+            self._pending = {}
+            self._reader = asyncio.ensure_future(self._read_responses(self._process, self._pending))
+            self._stderr = asyncio.ensure_future(self._log_stderr(self._process))
+            logger.info(f"Started Node bridge worker {self.index} (pid {self._process.pid})")
+
+    async def _read_responses(self, process: asyncio.subprocess.Process, pending: Dict[int, asyncio.Future]) -> None:
+        try:
+            while True:
+                line = await process.stdout.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Ignoring malformed bridge output: {line[:200]!r}")
+                    continue
+                future = pending.pop(message.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if "error" in message:
+                    future.set_result({"success": False, "error": message["error"]})
+                else:
+                    future.set_result(message.get("result"))
+        finally:
+            # The worker exited: fail whatever it was still working on
+            await process.wait()
+            log = logger.info if process.returncode == 0 else logger.warning
+            log(f"Node bridge worker {self.index} exited with code {process.returncode}")
+            for future in pending.values():
+                if not future.done():
+                    future.set_result({"success": False, "error": "Node bridge worker exited"})
+            pending.clear()
+
+    async def _log_stderr(self, process: asyncio.subprocess.Process) -> None:
+        while True:
+            line = await process.stderr.readline()
+            if not line:
+                break
+            logger.info(f"[bridge {self.index}] {line.decode(errors='replace').rstrip()}")
+
+    def _send(self, method: str, params: Dict[str, Any]) -> Tuple[Dict[int, asyncio.Future], int, asyncio.Future]:
+        """Write one request; returns the process's pending map, the request id and its future"""
+        pending = self._pending
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        pending[request_id] = future
+        self._process.stdin.write(
+            (json.dumps({"id": request_id, "method": method, "params": params}) + "\n").encode()
+        )
+        return pending, request_id, future
+
+    async def _responsive(self) -> bool:
+        """Whether the worker's event loop still answers a ping"""
+        pending, request_id, future = self._send("ping", {})
+        try:
+            await asyncio.wait_for(future, BRIDGE_PING_TIMEOUT)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            pending.pop(request_id, None)
+
+    async def call(self, method: str, params: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        """
+        Send one request and wait for its response
+
+        When a request times out the worker is pinged; if it does not answer
+        either it is considered hung and killed (failing its other requests)
+        and the next call respawns it.
+
+        Args:
+            method: Bridge method name
+            params: Method parameters
+            timeout: Seconds to wait for the response (None waits forever)
+
+        Returns:
+            The method's result, or {"success": False, "error": ...}
+
+        Raises:
+            BridgeTimeoutError: If the response does not arrive in time
+        """
+        self._assigned += 1
+        try:
+            if not self.running:
+                await self.start()
+            started = time.monotonic()
+            self.stats["requests"] += 1
+            process = self._process
+            pending, request_id, future = self._send(method, params)
+            try:
+                await process.stdin.drain()
+                result = await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                metrics.incr("bridge.timeouts")
+                if self._process is process and self.running and not await self._responsive():
+                    logger.warning(f"Node bridge worker {self.index} is not responding; killing it")
+                    metrics.incr("bridge.worker_kills")
+                    process.kill()
+                    # Not running from now on: the next call respawns instead of
+                    # reaching the dying process (its reader fails its requests)
+                    if self._process is process:
+                        self._process = None
+                raise BridgeTimeoutError(
+                    f"Bridge call {method} timed out after {timeout}s; outcome unknown, "
+                    f"a submitted transaction may still validate"
+                )
+            finally:
+                pending.pop(request_id, None)
+        finally:
+            self._assigned -= 1
+
+        metrics.observe(f"bridge.worker{self.index}.latency_ms", (time.monotonic() - started) * 1000)
+        if isinstance(result, dict) and result.get("success") is False:
+            self.stats["errors"] += 1
+        return result
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "pid": self._process.pid if self.running else None,
+            "running": self.running,
+            "in_flight": self.in_flight,
+            **self.stats,
+        }
+
+    async def stop(self) -> None:
+        """Close the worker's stdin so it disconnects and exits"""
+        process = self._process
+        if process is None:
+            return
+        if process.returncode is None:
+            process.stdin.close()
+            try:
+                await asyncio.wait_for(process.wait(), 5)
+            except asyncio.TimeoutError:
+                process.kill()
+        for task in (self._reader, self._stderr):
+            if task is not None:
+                try:
+                    await task
+                except Exception:
+                    pass
+        self._process = None
+
+class BridgePool:
+    """Fixed set of bridge workers with least-loaded dispatch and a bounded queue"""
+
+    def __init__(
+        self,
+        size: int = BRIDGE_WORKERS,
+        concurrency: int = BRIDGE_WORKER_CONCURRENCY,
+        queue_size: int = BRIDGE_QUEUE_SIZE,
+        timeout: float = BRIDGE_TIMEOUT
+    ):
+        """
+        Initialize the pool (workers spawn on first use)
+
+        Args:
+            size: Number of Node workers
+            concurrency: Requests in flight per worker
+            queue_size: Calls allowed to wait for capacity before BridgeBusyError
+            timeout: Per-request deadline in seconds
+        """
+        self.workers: List[BridgeWorker] = [BridgeWorker(i) for i in range(max(1, size))]
+        self.concurrency = max(1, concurrency)
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._capacity = asyncio.Semaphore(len(self.workers) * self.concurrency)
+        self._waiting = 0
+
+    def _pick(self) -> BridgeWorker:
+        # Least in-flight first; among equals prefer a worker that is already running
+        return min(self.workers, key=lambda w: (w.in_flight, not w.running))
+
+    async def call(self, method: str, params: Dict[str, Any]) -> Any:
+        """
+        Run one bridge call on the least-loaded worker
+
+        Raises:
+            BridgeBusyError: If queue_size calls are already waiting
+            BridgeTimeoutError: If the call misses the pool timeout
+        """
+        if self._capacity.locked():
+            if self._waiting >= self.queue_size:
+                metrics.incr("bridge.rejected")
+                raise BridgeBusyError(f"Bridge busy: {self._waiting} calls queued, retry later")
+            metrics.incr("bridge.queued")
+        self._waiting += 1
+        queued = time.monotonic()
+        try:
+            await self._capacity.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            metrics.observe("bridge.queue_wait_ms", (time.monotonic() - queued) * 1000)
+            return await self._pick().call(method, params, self.timeout)
+        finally:
+            self._capacity.release()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "workers": [w.describe() for w in self.workers],
+            "queued": self._waiting,
+            "queue_size": self.queue_size,
+            "concurrency": self.concurrency,
+            "timeout_seconds": self.timeout,
+        }
+
+    async def stop(self) -> None:
+        await asyncio.gather(*(w.stop() for w in self.workers))
+
+_pool: Optional[BridgePool] = None
+
+def get_bridge_pool() -> BridgePool:
+    """Process-wide bridge pool (workers spawn on first call)"""
+    global _pool
+    if _pool is None:
+        _pool = BridgePool()
+    return _pool
+
+async def close_js_bridge() -> None:
+    """Stop every bridge worker (called from the app lifespan)"""
+    if _pool is not None:
+        await _pool.stop()
 
 async def execute_js_bridge(method: str, params: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Call Node.js code from Python using a bridge script
-    
+    Call Node.js code from Python through the bridge worker pool
+
     Args:
         method: The method to call
         params: Parameters to pass to the method
-        
+
     Returns:
         Result of the Node.js function call
     """
     try:
-        # Create a temporary bridge file
-        bridge_dir = Path(__file__).parent.parent.parent / "temp"
-        bridge_dir.mkdir(exist_ok=True)
-        
-        bridge_file = bridge_dir / "xrpl_bridge.js"
-        
-        # Write the bridge code
-        bridge_code = f"""
-const TokenizationService = require('../services/xrpl/tokenizationService');
-const xrpl = require('xrpl');
-
-async function runBridge() {{
-    try {{
-        const service = new TokenizationService();
-        const params = {json.dumps(params)};
-        
-        // Handle method-specific logic
-        let result;
-        
-        if ('{method}' === 'createGreenAssetToken') {{
-            // Create wallet from seed
-            const issuerWallet = xrpl.Wallet.fromSeed(params.walletSeed);
-            
-            // Call the method
-            result = await service.createGreenAssetToken(params.tokenData, issuerWallet);
-        }} else if ('{method}' === 'authorizeHolder') {{
-            const issuerWallet = xrpl.Wallet.fromSeed(params.issuerSeed);
-            result = await service.authorizeHolder(issuerWallet, params.holderAddress, params.issuanceID);
-        }} else if ('{method}' === 'mintToHolder') {{
-            const issuerWallet = xrpl.Wallet.fromSeed(params.issuerSeed);
-            result = await service.mintToHolder(issuerWallet, params.holderAddress, params.issuanceID, params.amount);
-        }} else if ('{method}' === 'getHoldings') {{
-            result = await service.getHoldings(params.account, params.issuanceID);
-        }} else {{
-            throw new Error(`Unsupported method: {method}`);
-        }}
-        
-        // Disconnect and return result
-        await service.disconnect();
-        console.log(JSON.stringify(result));
-    }} catch (error) {{
-        console.error(JSON.stringify({{ success: false, error: error.message }}));
-        process.exit(1);
-    }}
-}}
-
-runBridge();
-"""
-        
-        # Write the bridge file
-        with open(bridge_file, 'w') as f:
-            f.write(bridge_code)
-        
-        # Execute the bridge
-        process = await asyncio.create_subprocess_exec(
-            'node', str(bridge_file),
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
-        stdout, stderr = await process.communicate()
-        
-        # Parse the result
-        if process.returncode != 0:
-            try:
-                error_data = json.loads(stderr.decode())
-                return error_data
-            except:
-                return {"success": False, "error": stderr.decode()}
-        
-        return json.loads(stdout.decode())
-    
+        return await get_bridge_pool().call(method, params)
     except Exception as e:
-        return {"success": False, "error": str(e)}
\ No newline at end of file
+        return {"success": False, "error": str(e)}
@@ -0,0 +1,235 @@
+"""
+FastAPI endpoints for querying the project registry (pipeline.csv)
+"""
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from typing import List, Optional, Dict, Any
+from datetime import date
+import hmac
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add the parent directory to sys.path to import from other modules
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from services.registry.ingest import ingest_export
+from services.registry.project_registry import get_registry
+from services.registry.projection import GROUP_COLUMNS, StoredScores, project_portfolio
+from services.storage.project_storage import ProjectStorageService
+from services.registry.query import InvalidCursor, SORT_ORDERS
+
+# Create router
+router = APIRouter(
+    prefix="/api/registry",
+    tags=["registry"],
+    responses={404: {"description": "Not found"}},
+)
+
+# Shared secret required (X-Registry-Token header) by POST /ingest; unset disables the endpoint
+REGISTRY_INGEST_TOKEN = os.getenv("REGISTRY_INGEST_TOKEN")
+
+# Stored certification scores, re-read only when project files change
+_stored_scores: Optional[StoredScores] = None
+
+def get_stored_scores() -> StoredScores:
+    global _stored_scores
+    if _stored_scores is None:
+        _stored_scores = StoredScores(ProjectStorageService().projects_dir)
+    return _stored_scores
+
+# Models
+class MatchCandidate(BaseModel):
+    id: str
+    name: str
+    proponent: str
+    matched_field: str
+    score: float
+    similarity: float
+
+class RegistryMatchResponse(BaseModel):
+    success: bool
+    query: str
+    candidates: List[MatchCandidate] = []
+    message: Optional[str] = None
+
+class RegistryQueryResponse(BaseModel):
+    success: bool
+    items: List[Dict[str, Any]] = []
+    total: int = 0
+    next_cursor: Optional[str] = None
+    message: Optional[str] = None
+
+class ChangedProject(BaseModel):
+    id: str
+    name: str
+    proponent: str
+    change: str  # inserted, updated or deleted
+
+class RegistryIngestResponse(BaseModel):
+    success: bool
+    dry_run: bool = False
+    inserted: List[str] = []
+    updated: List[str] = []
+    deleted: List[str] = []
+    changed: List[ChangedProject] = []
+    stale_projects: List[str] = []
+    skipped: int = 0
+    full_reload: bool = False
+    message: Optional[str] = None
+
+class ProjectionRequest(BaseModel):
+    default_scores: Optional[Dict[int, float]] = None  # SDG -> 0-10, for rows without scores
+    overrides: Dict[str, Dict[int, float]] = {}  # Registry ID -> {SDG: 0-10}
+    use_stored: bool = True
+    group_by: List[str] = list(GROUP_COLUMNS)
+    top: int = 0
+
+class ProjectionResponse(BaseModel):
+    success: bool
+    projects: int = 0
+    scored: int = 0
+    total_tokens: float = 0
+    total_emission_reductions: float = 0
+    mean_geometric_mean: float = 0
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    top: List[Dict[str, Any]] = []
+    message: Optional[str] = None
+
+@router.get("", response_model=RegistryQueryResponse)
+async def query_registry(
+    country: Optional[List[str]] = Query(None, description="Country/Area (repeat for any-of)"),
+    region: Optional[List[str]] = Query(None, description="Region"),
+    project_type: Optional[List[str]] = Query(None, description="Project Type (matches any listed type)"),
+    status: Optional[List[str]] = Query(None, description="Status"),
+    methodology: Optional[List[str]] = Query(None, description="Methodology code, e.g. VM0048"),
+    crediting_start_from: Optional[date] = Query(None),
+    crediting_start_to: Optional[date] = Query(None),
+    crediting_end_from: Optional[date] = Query(None),
+    crediting_end_to: Optional[date] = Query(None),
+    sort: str = Query("emissions_desc", description=f"One of {SORT_ORDERS}"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
+    """
+    Filter, sort and page registry projects using precomputed indexes
+    """
+    if sort not in SORT_ORDERS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort: {sort}. Valid values: {list(SORT_ORDERS)}")
+    
+    try:
+        result = get_registry().query(
+            filters={
+                "country": country,
+                "region": region,
+                "project_type": project_type,
+                "status": status,
+                "methodology": methodology,
+            },
+            date_ranges={
+                "Crediting Period Start Date": (crediting_start_from, crediting_start_to),
+                "Crediting Period End Date": (crediting_end_from, crediting_end_to),
+            },
+            sort=sort,
+            limit=limit,
+            cursor=cursor
+        )
+        return RegistryQueryResponse(success=True, **result)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        return RegistryQueryResponse(
+            success=False,
+            message=f"Registry query failed: {str(e)}"
+        )
+
+@router.get("/match", response_model=RegistryMatchResponse)
+async def match_registry_projects(
+    q: str = Query(..., min_length=1, description="Project name or proponent (partial input allowed)"),
+    limit: int = Query(10, ge=1, le=50),
+    min_score: float = Query(0.3, ge=0, le=1)
+):
+    """
+    Fuzzy-match registry projects by name or proponent (autocomplete)
+    """
+    try:
+        candidates = get_registry().match(q, limit=limit, min_score=min_score)
+        return RegistryMatchResponse(
+            success=True,
+            query=q,
+            candidates=[MatchCandidate(**c) for c in candidates]
+        )
+    except Exception as e:
+        return RegistryMatchResponse(
+            success=False,
+            query=q,
+            message=f"Registry match failed: {str(e)}"
+        )
+
+
+@router.post("/projection", response_model=ProjectionResponse)
+async def project_registry_tokens(request: ProjectionRequest):
+    """
+    Project token supply for the whole registry from stored or what-if SDG scores
+    """
+    if not 0 <= request.top <= 500:
+        raise HTTPException(status_code=400, detail="top must be between 0 and 500")
+    
+    try:
+        result = project_portfolio(
+            get_registry().data(),
+            stored=get_stored_scores().scores() if request.use_stored else None,
+            default_scores=request.default_scores,
+            overrides=request.overrides,
+            group_by=tuple(request.group_by),
+            top=request.top
+        )
+        return ProjectionResponse(success=True, **result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        return ProjectionResponse(
+            success=False,
+            message=f"Registry projection failed: {str(e)}"
+        )
+
+@router.post("/ingest", response_model=RegistryIngestResponse)
+async def ingest_registry_export(
+    request: Request,
+    dry_run: bool = Query(False, description="Only report what would change"),
+    x_registry_token: Optional[str] = Header(None)
+):
+    """
+    Apply a new registry export (raw CSV request body) incrementally
+
+    Rows are diffed by ID; only inserted, updated and deleted projects touch
+    the indexes, and certifications of changed projects are flagged stale.
+    Requires the X-Registry-Token header to match REGISTRY_INGEST_TOKEN; the
+    ingest runs in a worker thread so the event loop keeps serving.
+    """
+    if not REGISTRY_INGEST_TOKEN:
+        raise HTTPException(status_code=403, detail="Registry ingest is disabled (REGISTRY_INGEST_TOKEN not set)")
+    if not x_registry_token or not hmac.compare_digest(x_registry_token, REGISTRY_INGEST_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Registry-Token")
+
+    body = await request.body()
+    if not body.strip():
+        raise HTTPException(status_code=400, detail="Request body must be a registry CSV export")
+
+    fd, export_path = tempfile.mkstemp(suffix=".csv")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        result = await run_in_threadpool(ingest_export, Path(export_path), dry_run=dry_run)
+        return RegistryIngestResponse(success=True, dry_run=dry_run, **result)
+    except Exception as e:
+        return RegistryIngestResponse(
+            success=False,
+            dry_run=dry_run,
+            message=f"Registry ingest failed: {str(e)}"
+        )
+    finally:
+        os.remove(export_path)
@@ -5,6 +5,7 @@ FastAPI endpoints for MP Token issuance and management
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
+import asyncio
 import json
 import os
 import sys
@@ -13,9 +14,27 @@ from pathlib import Path
 # Add the parent directory to sys.path to import from other modules
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
+from xrpl.wallet import Wallet
+
 # Import the certification and bridge
 from controllers.LLMCertification import certify_project
-from services.api.py_node_bridge import execute_js_bridge
+from services.api.py_node_bridge import execute_js_bridge, get_bridge_pool
+
+# Native xrpl-py MPT operations (needs xrpl-py with MPT support); the Node
+# bridge remains the fallback
+try:
+    from services.xrpl.mpt_service import mpt_service
+    from services.xrpl.ledger_stream import LEDGER_STREAM_ENABLED, fetch_account_offers, ledger_stream
+except ImportError:
+    mpt_service = ledger_stream = None
+MPT_NATIVE_ENABLED = os.getenv("MPT_NATIVE_ENABLED", "true").lower() != "false"
+
+# Largest accepted batch request (mints or holders)
+MINT_BATCH_MAX = int(os.getenv("MINT_BATCH_MAX", "1000"))
+# Largest accepted holdings batch (addresses x issuances)
+HOLDINGS_BATCH_MAX = int(os.getenv("HOLDINGS_BATCH_MAX", "10000"))
+# MPToken flag set once the issuer has authorized the holder
+LSF_MPT_AUTHORIZED = 0x00000002
 
 # Create router
 router = APIRouter(
@@ -24,6 +43,31 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+def start_ledger_stream():
+    """Keep holdings and offers current from the ledger stream (called from the app lifespan)"""
+    if ledger_stream is not None and MPT_NATIVE_ENABLED and LEDGER_STREAM_ENABLED:
+        ledger_stream.start()
+
+def stop_ledger_stream():
+    """Stop applying ledger-stream updates"""
+    if ledger_stream is not None:
+        ledger_stream.stop()
+
+async def execute_token_call(method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run a token operation in-process when possible, else through the Node bridge
+    
+    Args:
+        method: Bridge method name (createGreenAssetToken, authorizeHolder, mintToHolder, getHoldings)
+        params: Bridge method parameters
+        
+    Returns:
+        The operation's result, or {"success": False, "error": ...}
+    """
+    if mpt_service is not None and MPT_NATIVE_ENABLED:
+        return await mpt_service.call(method, params)
+    return await execute_js_bridge(method, params)
+
 # Request/Response Models
 class SDGVerification(BaseModel):
     sdg: str
@@ -59,12 +103,86 @@ class MintRequest(BaseModel):
     issuance_id: str
     amount: int
 
+class MintBatchItem(BaseModel):
+    holder_address: str
+    amount: int
+
+class MintBatchRequest(BaseModel):
+    issuer_seed: str
+    issuance_id: str
+    mints: List[MintBatchItem]
+    max_retries: int = Field(2, ge=0, le=5)
+
+class MintResult(BaseModel):
+    holder_address: str
+    amount: int
+    success: bool
+    engine_result: Optional[str] = None
+    hash: Optional[str] = None
+    attempts: int = 1
+    message: Optional[str] = None
+
+class MintBatchResponse(BaseModel):
+    success: bool
+    message: Optional[str] = None
+    issuance_id: Optional[str] = None
+    minted: int = 0
+    failed: int = 0
+    results: List[MintResult] = []
+
+class AuthorizeBatchRequest(BaseModel):
+    issuer_seed: str
+    issuance_id: str
+    holder_addresses: List[str]
+    max_retries: int = Field(2, ge=0, le=5)
+
+class AuthorizeResult(BaseModel):
+    holder_address: str
+    status: str  # authorized, already_authorized, not_opted_in or failed
+    engine_result: Optional[str] = None
+    hash: Optional[str] = None
+    attempts: int = 0
+    message: Optional[str] = None
+
+class AuthorizeBatchResponse(BaseModel):
+    success: bool
+    message: Optional[str] = None
+    issuance_id: Optional[str] = None
+    counts: Dict[str, int] = {}
+    results: List[AuthorizeResult] = []
+
 class TokenHoldingsResponse(BaseModel):
     success: bool
     address: Optional[str] = None
     holdings: Optional[Dict[str, Any]] = None
     message: Optional[str] = None
 
+class OffersResponse(BaseModel):
+    success: bool
+    address: Optional[str] = None
+    source: Optional[str] = None  # "stream" (local cache) or "ledger" (queried)
+    ledger_index: Optional[int] = None
+    offers: List[Dict[str, Any]] = []
+    message: Optional[str] = None
+
+class HoldingsBatchRequest(BaseModel):
+    addresses: List[str]
+    issuance_ids: List[str]
+
+class Holding(BaseModel):
+    address: str
+    issuance_id: str
+    found: bool = False  # False when the account holds no MPToken for the issuance
+    amount: str = "0"
+    flags: int = 0
+    message: Optional[str] = None
+
+class HoldingsBatchResponse(BaseModel):
+    success: bool
+    message: Optional[str] = None
+    ledger_index: Optional[int] = None
+    holdings: List[Holding] = []
+
 # Token issuance endpoint
 @router.post("/issue", response_model=TokenResponse)
 async def create_token_issuance(request: TokenRequest):
@@ -104,13 +222,13 @@ async def create_token_issuance(request: TokenRequest):
             "transferFee": request.transfer_fee
         }
         
-        # Call the Node.js bridge to create the token
+        # Call the token backend to create the token
         params = {
             "walletSeed": request.wallet_seed,
             "tokenData": token_data
         }
         
-        result = await execute_js_bridge("createGreenAssetToken", params)
+        result = await execute_token_call("createGreenAssetToken", params)
         
         if not result["success"]:
             return TokenResponse(
@@ -139,14 +257,14 @@ async def authorize_token_holder(request: AuthorizeRequest):
     Authorize a holder for an MP token
     """
     try:
-        # Call the Node.js bridge to authorize holder
+        # Call the token backend to authorize holder
         params = {
             "issuerSeed": request.issuer_seed,
             "holderAddress": request.holder_address,
             "issuanceID": request.issuance_id
         }
         
-        result = await execute_js_bridge("authorizeHolder", params)
+        result = await execute_token_call("authorizeHolder", params)
         
         if not result.get("success", False):
             return TokenResponse(
@@ -166,6 +284,90 @@ async def authorize_token_holder(request: AuthorizeRequest):
             message=f"Authorization failed: {str(e)}"
         )
 
+# Batch authorize endpoint
+@router.post("/authorize/batch", response_model=AuthorizeBatchResponse)
+async def authorize_token_holders_batch(request: AuthorizeBatchRequest):
+    """
+    Authorize many holders for an MP token
+    
+    Duplicate addresses are dropped and holders already authorized on the
+    ledger (or without an MPToken to authorize) are skipped; the rest are
+    authorized concurrently (one at a time through the Node bridge
+    fallback).  success is true when no holder failed.
+    """
+    if not request.holder_addresses:
+        raise HTTPException(status_code=400, detail="holder_addresses must not be empty")
+    if len(request.holder_addresses) > MINT_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {MINT_BATCH_MAX} holders per batch")
+    
+    try:
+        if mpt_service is not None and MPT_NATIVE_ENABLED:
+            reports = await mpt_service.authorize_batch(
+                Wallet.from_seed(request.issuer_seed),
+                request.issuance_id,
+                request.holder_addresses,
+                retries=request.max_retries
+            )
+            results = [AuthorizeResult(**report) for report in reports]
+        else:
+            # Node bridge fallback: read every distinct holder's MPToken first
+            # (concurrent reads), then authorize the rest one at a time, since
+            # each authorization autofills the same issuer's Sequence
+            holders = list(dict.fromkeys(request.holder_addresses))
+            entries = await asyncio.gather(*(
+                execute_js_bridge("getHoldings", {"account": holder, "issuanceID": request.issuance_id})
+                for holder in holders
+            ))
+            results = []
+            for holder, entry in zip(holders, entries):
+                error = str(entry.get("error", "unknown error"))
+                if not entry.get("success", False) and "entryNotFound" in error:
+                    results.append(AuthorizeResult(
+                        holder_address=holder,
+                        status="not_opted_in",
+                        message="Holder has no MPToken for this issuance"
+                    ))
+                elif not entry.get("success", False):
+                    results.append(AuthorizeResult(
+                        holder_address=holder,
+                        status="failed",
+                        message=f"Ledger lookup failed: {error}"
+                    ))
+                elif int(entry.get("result", {}).get("node", {}).get("Flags", 0)) & LSF_MPT_AUTHORIZED:
+                    results.append(AuthorizeResult(holder_address=holder, status="already_authorized"))
+                else:
+                    reply = await execute_js_bridge("authorizeHolder", {
+                        "issuerSeed": request.issuer_seed,
+                        "holderAddress": holder,
+                        "issuanceID": request.issuance_id
+                    })
+                    results.append(AuthorizeResult(
+                        holder_address=holder,
+                        status="authorized" if reply.get("success", False) else "failed",
+                        engine_result=reply.get("engine_result"),
+                        hash=reply.get("hash"),
+                        attempts=1,
+                        message=reply.get("error")
+                    ))
+        
+        counts: Dict[str, int] = {}
+        for result in results:
+            counts[result.status] = counts.get(result.status, 0) + 1
+        return AuthorizeBatchResponse(
+            success=counts.get("failed", 0) == 0,
+            message=", ".join(f"{count} {status}" for status, count in counts.items()),
+            issuance_id=request.issuance_id,
+            counts=counts,
+            results=results
+        )
+    
+    except Exception as e:
+        return AuthorizeBatchResponse(
+            success=False,
+            message=f"Batch authorization failed: {str(e)}",
+            issuance_id=request.issuance_id
+        )
+
 # Mint tokens endpoint
 @router.post("/mint", response_model=TokenResponse)
 async def mint_tokens(request: MintRequest):
@@ -173,7 +375,7 @@ async def mint_tokens(request: MintRequest):
     Mint tokens to a holder
     """
     try:
-        # Call the Node.js bridge to mint tokens
+        # Call the token backend to mint tokens
         params = {
             "issuerSeed": request.issuer_seed,
             "holderAddress": request.holder_address,
@@ -181,7 +383,7 @@ async def mint_tokens(request: MintRequest):
             "amount": request.amount
         }
         
-        result = await execute_js_bridge("mintToHolder", params)
+        result = await execute_token_call("mintToHolder", params)
         
         if not result.get("success", False):
             return TokenResponse(
@@ -202,6 +404,72 @@ async def mint_tokens(request: MintRequest):
             message=f"Minting failed: {str(e)}"
         )
 
+# Batch mint endpoint
+@router.post("/mint/batch", response_model=MintBatchResponse)
+async def mint_tokens_batch(request: MintBatchRequest):
+    """
+    Mint tokens to many holders of one issuance
+    
+    Payments are submitted concurrently on Tickets; payments known not to
+    have applied (tel/tef rejections, expiry) are retried up to max_retries
+    times.  Without the native service they go one at a time through the
+    Node bridge, without retries.  The response reports every holder; success is true only if every
+    payment succeeded.
+    """
+    if not request.mints:
+        raise HTTPException(status_code=400, detail="mints must not be empty")
+    if len(request.mints) > MINT_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {MINT_BATCH_MAX} mints per batch")
+    
+    try:
+        if mpt_service is not None and MPT_NATIVE_ENABLED:
+            reports = await mpt_service.mint_batch(
+                Wallet.from_seed(request.issuer_seed),
+                request.issuance_id,
+                [(item.holder_address, item.amount) for item in request.mints],
+                retries=request.max_retries
+            )
+            results = [MintResult(**report) for report in reports]
+        else:
+            # Node bridge fallback: one mintToHolder call per holder, one at a
+            # time, since every payment autofills the same issuer's Sequence
+            replies = []
+            for item in request.mints:
+                replies.append(await execute_js_bridge("mintToHolder", {
+                    "issuerSeed": request.issuer_seed,
+                    "holderAddress": item.holder_address,
+                    "issuanceID": request.issuance_id,
+                    "amount": item.amount
+                }))
+            results = [
+                MintResult(
+                    holder_address=item.holder_address,
+                    amount=item.amount,
+                    success=bool(reply.get("success", False)),
+                    engine_result=reply.get("engine_result"),
+                    hash=reply.get("hash"),
+                    message=reply.get("error")
+                )
+                for item, reply in zip(request.mints, replies)
+            ]
+        
+        failed = sum(1 for r in results if not r.success)
+        return MintBatchResponse(
+            success=failed == 0,
+            message=f"{len(results) - failed} of {len(results)} mints succeeded",
+            issuance_id=request.issuance_id,
+            minted=len(results) - failed,
+            failed=failed,
+            results=results
+        )
+    
+    except Exception as e:
+        return MintBatchResponse(
+            success=False,
+            message=f"Batch minting failed: {str(e)}",
+            issuance_id=request.issuance_id
+        )
+
 # Get token holdings endpoint
 @router.get("/holdings/{address}", response_model=TokenHoldingsResponse)
 async def get_token_holdings(address: str, issuance_id: Optional[str] = None):
@@ -209,13 +477,13 @@ async def get_token_holdings(address: str, issuance_id: Optional[str] = None):
     Get token holdings for an account
     """
     try:
-        # Call the Node.js bridge to get holdings
+        # Call the token backend to get holdings
         params = {
             "account": address,
             "issuanceID": issuance_id
         }
         
-        result = await execute_js_bridge("getHoldings", params)
+        result = await execute_token_call("getHoldings", params)
         
         if not result.get("success", False):
             return TokenHoldingsResponse(
@@ -233,4 +501,109 @@ async def get_token_holdings(address: str, issuance_id: Optional[str] = None):
         return TokenHoldingsResponse(
             success=False,
             message=f"Failed to get holdings: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+# Batch holdings endpoint
+@router.post("/holdings/batch", response_model=HoldingsBatchResponse)
+async def get_token_holdings_batch(request: HoldingsBatchRequest):
+    """
+    Get holdings of many accounts for many issuances (every address x issuance pair)
+    
+    All pairs are read at one validated ledger; entries already read at that
+    ledger are served from cache.
+    """
+    pairs = [(address, issuance) for address in dict.fromkeys(request.addresses)
+             for issuance in dict.fromkeys(request.issuance_ids)]
+    if not pairs:
+        raise HTTPException(status_code=400, detail="addresses and issuance_ids must not be empty")
+    if len(pairs) > HOLDINGS_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {HOLDINGS_BATCH_MAX} address/issuance pairs per batch")
+    
+    try:
+        ledger_index = None
+        if mpt_service is not None and MPT_NATIVE_ENABLED:
+            ledger_index, nodes = await mpt_service.holdings.get_many(pairs)
+            entries = [nodes[pair] for pair in pairs]
+        else:
+            # Node bridge fallback: one uncached getHoldings call per pair
+            replies = await asyncio.gather(*(
+                execute_js_bridge("getHoldings", {"account": address, "issuanceID": issuance})
+                for address, issuance in pairs
+            ))
+            entries = [
+                reply.get("result", {}).get("node") if reply.get("success", False)
+                else None if "entryNotFound" in str(reply.get("error", ""))
+                else RuntimeError(reply.get("error", "Failed to get holdings"))
+                for reply in replies
+            ]
+        
+        holdings = []
+        for (address, issuance), entry in zip(pairs, entries):
+            if isinstance(entry, Exception):
+                holdings.append(Holding(address=address, issuance_id=issuance, message=str(entry)))
+            elif entry is None:
+                holdings.append(Holding(address=address, issuance_id=issuance))
+            else:
+                holdings.append(Holding(
+                    address=address,
+                    issuance_id=issuance,
+                    found=True,
+                    amount=str(entry.get("MPTAmount", "0")),
+                    flags=int(entry.get("Flags", 0))
+                ))
+        return HoldingsBatchResponse(success=True, ledger_index=ledger_index, holdings=holdings)
+    
+    except Exception as e:
+        return HoldingsBatchResponse(
+            success=False,
+            message=f"Failed to get holdings: {str(e)}"
+        )
+
+# Account offers endpoint
+@router.get("/offers/{address}", response_model=OffersResponse)
+async def get_account_offers(address: str):
+    """
+    Get the live DEX offers of an account
+    
+    Accounts tracked by the ledger stream (LEDGER_STREAM_ACCOUNTS) are served
+    from its cache; others are read from the ledger.
+    """
+    if mpt_service is None or not MPT_NATIVE_ENABLED:
+        raise HTTPException(status_code=400, detail="Offer lookups need the native XRPL service")
+    
+    try:
+        offers = ledger_stream.account_offers(address)
+        if offers is not None:
+            return OffersResponse(
+                success=True, address=address, source="stream",
+                ledger_index=ledger_stream.ledger, offers=offers
+            )
+        offers = await fetch_account_offers(mpt_service.connection, address)
+        return OffersResponse(
+            success=True, address=address, source="ledger",
+            offers=[offers[seq] for seq in sorted(offers)]
+        )
+    
+    except Exception as e:
+        return OffersResponse(
+            success=False,
+            message=f"Failed to get offers: {str(e)}"
+        )
+
+# Ledger stream status endpoint
+@router.get("/stream")
+async def get_ledger_stream_status():
+    """
+    Get the ledger-stream cache status (sync state, ledger index, applied updates)
+    """
+    if ledger_stream is None:
+        return {"success": False, "message": "Ledger stream unavailable (needs xrpl-py with MPT support)"}
+    return {"success": True, "stream": ledger_stream.describe(), "cached_holdings": len(mpt_service.holdings)}
+
+# Bridge pool status endpoint
+@router.get("/bridge")
+async def get_bridge_status():
+    """
+    Get the Node bridge worker pool status (per-worker load, timeouts and restarts)
+    """
+    return {"success": True, "pool": get_bridge_pool().describe()}
@@ -0,0 +1,186 @@
+"""
+Token-budgeted evidence packing for LLM prompts
+
+Evidence gathered from web searches is ranked by relevance to the claim being
+verified, near-duplicate snippets are dropped and the remainder is packed into
+a fixed token budget so prompts never overflow the model context.
+"""
+
+import math
+import os
+import re
+from typing import List, Dict, Any, Optional, Sequence, Set, Tuple
+
+from utils.metrics import metrics
+
+# Default budget (in tokens) for the evidence section of a single prompt
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("EVIDENCE_TOKEN_BUDGET", "3000"))
+
+# Rough characters-per-token ratio for English text with GPT tokenizers
+CHARS_PER_TOKEN = 4
+
+# Fixed per-snippet cost for the source header / JSON keys around the text
+SNIPPET_OVERHEAD_TOKENS = 12
+
+# Don't bother truncating a snippet into less room than this
+MIN_TRUNCATED_TOKENS = 48
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "are", "was", "were",
+    "has", "have", "had", "its", "our", "their", "which", "into", "about",
+    "will", "been", "also", "than", "more", "such", "they", "them", "these",
+    "those", "not", "but", "all", "can", "who", "what", "how", "per"
+}
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens *text* will cost in a prompt"""
+    if not text:
+        return 0
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+def _terms(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall(text.lower()) if len(w) > 2 and w not in _STOPWORDS]
+
+def _shingles(words: List[str], size: int = 3) -> Set[Tuple[str, ...]]:
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Cut *text* to roughly *max_tokens* at a word boundary"""
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    limit -= len(" ...")
+    cut = text.rfind(" ", 0, limit)
+    return text[:cut if cut > 0 else limit].rstrip() + " ..."
+
+class EvidencePacker:
+    """Rank, dedupe and pack evidence snippets into a token budget"""
+
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        dedupe_threshold: float = 0.8,
+        k1: float = 1.2,
+        b: float = 0.75
+    ):
+        """
+        Args:
+            token_budget: Tokens available for evidence (default: EVIDENCE_TOKEN_BUDGET)
+            dedupe_threshold: Shingle containment above which a snippet counts as a duplicate
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalisation
+        """
+        self.token_budget = token_budget if token_budget is not None else DEFAULT_TOKEN_BUDGET
+        self.dedupe_threshold = dedupe_threshold
+        self.k1 = k1
+        self.b = b
+
+    def pack(
+        self,
+        claim: str,
+        snippets: List[Dict[str, Any]],
+        text_fields: Sequence[str] = ("text",),
+        token_budget: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Select the most relevant, non-redundant snippets that fit the budget
+
+        Args:
+            claim: Claim (or query) the evidence should support
+            snippets: Evidence items; all keys are preserved in the output
+            text_fields: Keys whose values make up the snippet text
+            token_budget: Override the packer's budget for this call
+
+        Returns:
+            Dictionary with the packed ``snippets`` (most relevant first) and
+            token accounting (``tokens_in``, ``tokens_used``, ``tokens_saved``, ``dropped``)
+        """
+        budget = self.token_budget if token_budget is None else token_budget
+
+        texts = [" ".join(str(s.get(f) or "") for f in text_fields).strip() for s in snippets]
+        costs = [estimate_tokens(t) + SNIPPET_OVERHEAD_TOKENS for t in texts]
+        tokens_in = sum(costs)
+
+        words = [_terms(t) for t in texts]
+        scores = self._bm25(_terms(claim), words)
+        order = sorted(range(len(snippets)), key=lambda i: (-scores[i], i))
+
+        packed: List[Dict[str, Any]] = []
+        kept_shingles: List[Set[Tuple[str, ...]]] = []
+        used = 0
+        for i in order:
+            if not texts[i]:
+                continue
+
+            shingles = _shingles(words[i])
+            if shingles and any(
+                len(shingles & other) / len(shingles) >= self.dedupe_threshold
+                for other in kept_shingles
+            ):
+                continue
+
+            item = dict(snippets[i])
+            remaining = budget - used
+            if costs[i] > remaining:
+                # Only the last text field (the body) is shortened
+                body_field = text_fields[-1]
+                head = " ".join(str(item.get(f) or "") for f in text_fields[:-1])
+                room = remaining - SNIPPET_OVERHEAD_TOKENS - estimate_tokens(head)
+                if room < MIN_TRUNCATED_TOKENS:
+                    continue
+                item[body_field] = _truncate(str(item.get(body_field) or ""), room)
+                cost = costs[i] - estimate_tokens(texts[i]) + estimate_tokens(
+                    (head + " " + item[body_field]).strip()
+                )
+            else:
+                cost = costs[i]
+
+            packed.append(item)
+            kept_shingles.append(shingles)
+            used += cost
+
+        saved = max(0, tokens_in - used)
+        metrics.incr("evidence_packer.calls")
+        metrics.incr("evidence_packer.tokens_in", tokens_in)
+        metrics.incr("evidence_packer.tokens_used", used)
+        metrics.incr("evidence_packer.tokens_saved", saved)
+        metrics.observe("evidence_packer.prompt_tokens", used)
+
+        return {
+            "snippets": packed,
+            "tokens_in": tokens_in,
+            "tokens_used": used,
+            "tokens_saved": saved,
+            "dropped": len(snippets) - len(packed)
+        }
+
+    def _bm25(self, query: List[str], docs: List[List[str]]) -> List[float]:
+        """Score every document in *docs* against *query* with Okapi BM25"""
+        if not docs:
+            return []
+        n = len(docs)
+        avg_len = (sum(len(d) for d in docs) / n) or 1.0
+
+        doc_freq: Dict[str, int] = {}
+        for doc in docs:
+            for term in set(doc):
+                doc_freq[term] = doc_freq.get(term, 0) + 1
+
+        query_terms = set(query)
+        scores = []
+        for doc in docs:
+            tf: Dict[str, int] = {}
+            for term in doc:
+                if term in query_terms:
+                    tf[term] = tf.get(term, 0) + 1
+            norm = self.k1 * (1 - self.b + self.b * len(doc) / avg_len)
+            score = 0.0
+            for term, freq in tf.items():
+                idf = math.log(1 + (n - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+                score += idf * freq * (self.k1 + 1) / (freq + norm)
+            scores.append(score)
+        return scores
@@ -5,7 +5,9 @@ Service for interacting with OpenAI's API
 import os
 import logging
 from openai import OpenAI
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from services.llm.evidence_packer import EvidencePacker
 
 logger = logging.getLogger(__name__)
 
@@ -15,14 +17,17 @@ OPENAI_KEY = os.environ.get("OPENAI_KEY")
 class OpenAIService:
     """Service for making requests to OpenAI API"""
     
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, evidence_token_budget: Optional[int] = None):
         """
         Initialize with API key from parameter or environment
         
         Args:
             api_key: OpenAI API key (optional, falls back to environment variable)
+            evidence_token_budget: Tokens allowed for evidence per prompt
+                (optional, falls back to EVIDENCE_TOKEN_BUDGET)
         """
         self.api_key = api_key or OPENAI_KEY
+        self.evidence_packer = EvidencePacker(token_budget=evidence_token_budget)
         if not self.api_key:
             logger.warning("OpenAI API key not provided and not found in environment")
             
@@ -80,10 +85,24 @@ class OpenAIService:
             
             sdg_goal_name = sdg_descriptions.get(sdg_goal_id, f"SDG #{sdg_goal_id}")
             
+            # Rank, dedupe and fit the evidence into the prompt budget
+            packed = self.evidence_packer.pack(
+                claim_text,
+                [
+                    {"text": text, "source": sources[i] if i < len(sources) else "unknown"}
+                    for i, text in enumerate(evidence_texts)
+                ]
+            )
+            if packed["tokens_saved"]:
+                logger.info(
+                    f"Evidence packed for SDG {sdg_goal_id}: {packed['tokens_used']} tokens "
+                    f"used, {packed['tokens_saved']} saved, {packed['dropped']} snippets dropped"
+                )
+            
             # Prepare evidence text
             combined_evidence = "\n\n---\n\n".join(
-                [f"SOURCE {i+1} ({sources[i] if i < len(sources) else 'unknown'}):\n{text}" 
-                 for i, text in enumerate(evidence_texts)]
+                [f"SOURCE {i+1} ({item['source']}):\n{item['text']}" 
+                 for i, item in enumerate(packed["snippets"])]
             )
             
             # Create the prompt
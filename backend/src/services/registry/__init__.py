@@ -0,0 +1,5 @@
+# Registry Services Package
+
+"""
+This package contains services for indexing and querying the project registry (pipeline.csv).
+"""
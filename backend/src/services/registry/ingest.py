@@ -0,0 +1,80 @@
+"""
+Incremental registry ingest
+
+A new registry export is diffed against the loaded registry by ``ID`` and
+only the inserted, updated and deleted rows are applied to the in-memory
+indexes (see ProjectRegistry.ingest).  Stored certifications of changed
+projects are then flagged stale so they can be re-run.
+
+Usage (from ``backend/src``)::
+
+    python -m services.registry.ingest --export ../new_export.csv [--dry-run]
+"""
+
+import argparse
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from services.registry.project_registry import PIPELINE_CSV, get_registry, normalize_key
+from services.storage.project_storage import ProjectStorageService
+
+logger = logging.getLogger(__name__)
+
+def stale_project_ids(storage: ProjectStorageService, changed: List[Dict[str, str]]) -> List[str]:
+    """
+    Stored projects certified against a changed registry entry
+
+    Matches ``reg_<ID>`` projects from bulk certification, and other projects
+    by project name or company name against the changed Name/Proponent.
+    """
+    ids = {f"reg_{c['id']}" for c in changed if c["change"] != "inserted" and c["id"]}
+    names = {
+        normalize_key(c[field]) for c in changed if c["change"] != "inserted"
+        for field in ("name", "proponent") if c[field]
+    }
+    return [
+        project.id for project in storage.list_projects()
+        if project.id in ids
+        or normalize_key(project.project_name) in names
+        or normalize_key(project.company_name) in names
+    ]
+
+def ingest_export(
+    export_path: Path,
+    csv_path: Optional[Path] = None,
+    dry_run: bool = False,
+    storage: Optional[ProjectStorageService] = None
+) -> Dict[str, Any]:
+    """
+    Ingest a registry export and flag stale certifications
+
+    Args:
+        export_path: New registry CSV export
+        csv_path: Registry CSV to update (default: PIPELINE_CSV)
+        dry_run: Only report the diff; nothing is written or flagged
+        storage: Project storage used for stale flagging
+
+    Returns:
+        The ProjectRegistry.ingest() report plus ``stale_projects``
+    """
+    report = get_registry(csv_path).ingest(Path(export_path), dry_run=dry_run)
+    storage = storage or ProjectStorageService()
+    candidates = stale_project_ids(storage, report["changed"])
+    report["stale_projects"] = candidates if dry_run else storage.mark_certifications_stale(candidates)
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply a new registry export incrementally")
+    parser.add_argument("--export", type=Path, required=True, help="New registry CSV export")
+    parser.add_argument("--csv", type=Path, default=PIPELINE_CSV, help="Registry CSV to update")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    parser.add_argument("--data-dir", default=None, help="Project storage directory")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = ingest_export(
+        args.export, args.csv, dry_run=args.dry_run, storage=ProjectStorageService(args.data_dir)
+    )
+    print(json.dumps({k: v for k, v in result.items() if k != "changed"}, indent=2))
@@ -0,0 +1,167 @@
+"""
+Fuzzy name/proponent matching over the project registry
+
+A trigram index is precomputed for every Name and Proponent so a query only
+touches the postings of its own trigrams instead of scanning every row.
+Company suffixes are canonicalised ("Ltd" and "Limited" index identically),
+punctuation is ignored and acronyms of multi-word names are indexed too.
+"""
+
+import re
+from typing import List, Optional, Dict, Any, Sequence, Set, Tuple
+
+# Company-form aliases mapped onto one canonical token
+SUFFIX_ALIASES = {
+    "ltd": "limited",
+    "ltda": "limited",
+    "inc": "incorporated",
+    "corp": "corporation",
+    "co": "company",
+    "pvt": "private",
+    "plc": "plc",
+    "llc": "llc",
+    "sa": "sa",
+    "bhd": "berhad",
+    "intl": "international",
+    "mgmt": "management",
+    "dev": "development",
+}
+
+# Tokens ignored when building acronyms
+_ACRONYM_SKIP = {"and", "of", "the", "in", "for", "de", "la", "limited", "incorporated",
+                 "corporation", "company", "private", "llc", "plc", "sa", "berhad", "sdn"}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def fuzzy_normalize(text: Optional[str]) -> str:
+    """Lower-case, drop punctuation and canonicalise company suffixes"""
+    tokens = _TOKEN_RE.findall((text or "").lower().replace("&", " and "))
+    return " ".join(SUFFIX_ALIASES.get(t, t) for t in tokens)
+
+def trigrams(normalized: str) -> Set[str]:
+    """Character trigrams of a normalised string (padded at word edges)"""
+    if not normalized:
+        return set()
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def acronym(normalized: str) -> str:
+    """Initials of the significant words, e.g. "infinite environmental solutions" -> "ies" """
+    words = [w for w in normalized.split() if w not in _ACRONYM_SKIP]
+    return "".join(w[0] for w in words) if len(words) >= 2 else ""
+
+class TrigramIndex:
+    """Trigram postings over (row, field) registry entries"""
+
+    def __init__(self, fields: Dict[str, Sequence[str]]):
+        """
+        Build the index
+
+        Args:
+            fields: Column name -> values (one per registry row)
+        """
+        self._entries: List[Tuple[int, str]] = []
+        self._sizes: List[int] = []
+        self._normalized: List[str] = []
+        self._postings: Dict[str, List[int]] = {}
+        self._acronyms: Dict[str, List[int]] = {}
+        self._row_entries: Dict[int, List[int]] = {}
+        self._dead: Set[int] = set()
+
+        for field, values in fields.items():
+            for row, value in enumerate(values):
+                self._add(row, field, value)
+
+    def _add(self, row: int, field: str, value: str) -> None:
+        normalized = fuzzy_normalize(value)
+        grams = trigrams(normalized)
+        if not grams:
+            return
+        entry = len(self._entries)
+        self._entries.append((row, field))
+        self._sizes.append(len(grams))
+        self._normalized.append(normalized)
+        self._row_entries.setdefault(row, []).append(entry)
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(entry)
+        initials = acronym(normalized)
+        if len(initials) >= 2:
+            self._acronyms.setdefault(initials, []).append(entry)
+
+    def copy(self) -> "TrigramIndex":
+        """Independent copy that can be patched while this one keeps serving queries"""
+        clone = TrigramIndex.__new__(TrigramIndex)
+        clone._entries = list(self._entries)
+        clone._sizes = list(self._sizes)
+        clone._normalized = list(self._normalized)
+        clone._postings = {gram: list(entries) for gram, entries in self._postings.items()}
+        clone._acronyms = {initials: list(entries) for initials, entries in self._acronyms.items()}
+        clone._row_entries = {row: list(entries) for row, entries in self._row_entries.items()}
+        clone._dead = set(self._dead)
+        return clone
+
+    def remove_row(self, row: int) -> None:
+        """Drop every entry of *row* (entries are tombstoned, not compacted)"""
+        self._dead.update(self._row_entries.pop(row, ()))
+
+    def set_row(self, row: int, fields: Dict[str, str]) -> None:
+        """Index (or re-index) *row* with new field values"""
+        self.remove_row(row)
+        for field, value in fields.items():
+            self._add(row, field, value)
+
+    def search(self, query: str, limit: int = 10, min_score: float = 0.3) -> List[Dict[str, Any]]:
+        """
+        Rank registry rows against *query*
+
+        Each candidate carries ``similarity`` (trigram Dice coefficient, 1.0 for
+        an identical normalised string) and ``score``, which also rewards how
+        much of the query is covered so partial input ranks well for autocomplete.
+
+        Returns:
+            Up to *limit* candidates ``{row, field, score, similarity}``, best first,
+            one per row
+        """
+        normalized = fuzzy_normalize(query)
+        grams = trigrams(normalized)
+        if not grams:
+            return []
+
+        counts: Dict[int, int] = {}
+        for gram in grams:
+            for entry in self._postings.get(gram, ()):
+                counts[entry] = counts.get(entry, 0) + 1
+
+        q = len(grams)
+        best: Dict[int, Dict[str, Any]] = {}
+
+        def offer(entry: int, similarity: float, score: float) -> None:
+            row, field = self._entries[entry]
+            current = best.get(row)
+            if current is None or score > current["score"]:
+                best[row] = {
+                    "row": row,
+                    "field": field,
+                    "score": round(score, 4),
+                    "similarity": round(similarity, 4),
+                }
+
+        for entry, common in counts.items():
+            if entry in self._dead:
+                continue
+            dice = 2.0 * common / (q + self._sizes[entry])
+            coverage = common / q
+            score = 0.5 * dice + 0.5 * coverage
+            if self._normalized[entry].startswith(normalized):
+                score = max(score, 0.5 + 0.4 * coverage)
+            if score >= min_score:
+                offer(entry, dice, score)
+
+        # Abbreviations: a single-word query equal to a name's initials
+        if " " not in normalized:
+            for entry in self._acronyms.get(normalized, ()):
+                if entry not in self._dead:
+                    offer(entry, 0.8, 0.8)
+
+        ranked = sorted(best.values(), key=lambda c: (-c["score"], c["row"]))
+        return ranked[:limit]
@@ -0,0 +1,553 @@
+"""
+In-memory indexed project registry backed by pipeline.csv
+"""
+
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+from datetime import date
+from typing import List, Optional, Dict, Any, Tuple
+
+import numpy as np
+
+from services.registry.matching import TrigramIndex
+from services.registry.query import (
+    FILTER_COLUMNS, RegistryIndex, decode_cursor, encode_cursor
+)
+from services.registry.snapshot import (
+    EMISSION_COLUMN, NumericColumn, default_snapshot_dir, encode_columns,
+    load_snapshot, read_csv_columns, read_manifest, typed_value, write_snapshot
+)
+
+logger = logging.getLogger(__name__)
+
+# Default registry export (relative paths resolve against the working directory)
+PIPELINE_CSV = Path(os.getenv("PIPELINE_CSV", "pipeline.csv"))
+
+# Minimum trigram similarity for lookup() to accept a fuzzy match
+FUZZY_LOOKUP_THRESHOLD = float(os.getenv("REGISTRY_FUZZY_THRESHOLD", "0.85"))
+# Top-ranked candidates compared by similarity for a fuzzy lookup
+FUZZY_LOOKUP_CANDIDATES = 5
+
+def normalize_key(value: Optional[str]) -> str:
+    """Normalise a name/proponent for exact, case-insensitive matching"""
+    return " ".join((value or "").split()).lower()
+
+def _writable(column: Any) -> Any:
+    return list(column) if isinstance(column, list) else column.writable()
+
+def _set_raw(column: Any, row: int, raw: str) -> None:
+    if isinstance(column, list):
+        column[row] = raw
+    else:
+        column.set_raw(row, raw)
+
+def _extend_raw(column: Any, raws: List[str]) -> None:
+    if isinstance(column, list):
+        column.extend(raws)
+    else:
+        column.extend_raw(raws)
+
+class RegistryData:
+    """
+    One load of the registry: typed columns plus lookup indexes
+
+    Columns come either from a memory-mapped snapshot or from parsing the
+    CSV; both expose the same typed column objects (see snapshot.py).  A load
+    is never changed while it is served: an incremental ingest patches rows
+    and indexes of a copy() (deleted rows are masked out, not compacted) and
+    the registry then swaps the reference.
+    """
+
+    def __init__(self, columns: Dict[str, Any], mtime: Optional[float], source: str = "csv"):
+        self.columns = columns
+        self.mtime = mtime
+        self.source = source
+        self.rows = len(next(iter(columns.values()))) if columns else 0
+        self.reductions: NumericColumn = columns.get(EMISSION_COLUMN) or NumericColumn.from_values([""] * self.rows)
+
+        # First row wins, matching the original "first match" behaviour
+        self.by_name: Dict[str, int] = {}
+        for i, value in enumerate(columns.get("Name", [])):
+            self.by_name.setdefault(normalize_key(value), i)
+        self.by_proponent: Dict[str, int] = {}
+        for i, value in enumerate(columns.get("Proponent", [])):
+            self.by_proponent.setdefault(normalize_key(value), i)
+        self.by_name.pop("", None)
+        self.by_proponent.pop("", None)
+
+        self._fuzzy: Optional[TrigramIndex] = None
+        self._index: Optional[RegistryIndex] = None
+        self._by_id: Optional[Dict[str, int]] = None
+        self._writable = False
+
+        # Rows still present (None while nothing has been deleted)
+        self.live: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return self.rows if self.live is None else int(np.count_nonzero(self.live))
+
+    def is_live(self, row: int) -> bool:
+        return self.live is None or bool(self.live[row])
+
+    @property
+    def by_id(self) -> Dict[str, int]:
+        """Registry ID -> row, built on first use"""
+        if self._by_id is None:
+            by_id: Dict[str, int] = {}
+            for row, value in enumerate(self.columns.get("ID", [])):
+                if value and self.is_live(row):
+                    by_id.setdefault(value, row)
+            self._by_id = by_id
+        return self._by_id
+
+    @property
+    def fuzzy(self) -> TrigramIndex:
+        """Trigram index over Name/Proponent, built on first fuzzy query"""
+        if self._fuzzy is None:
+            fuzzy = TrigramIndex({
+                field: self.columns[field] for field in ("Name", "Proponent") if field in self.columns
+            })
+            if self.live is not None:
+                for row in np.flatnonzero(~self.live):
+                    fuzzy.remove_row(int(row))
+            self._fuzzy = fuzzy
+        return self._fuzzy
+
+    @property
+    def index(self) -> RegistryIndex:
+        """Filter/sort indexes, built on first query"""
+        if self._index is None:
+            self._index = RegistryIndex(self.columns, self.reductions.values, self.live)
+        return self._index
+
+    def value(self, column: str, row: int) -> str:
+        values = self.columns.get(column)
+        return values[row] if values is not None else ""
+
+    def record(self, row: int) -> Dict[str, Any]:
+        return {col: values[row] for col, values in self.columns.items()}
+
+    def copy(self) -> "RegistryData":
+        """Independent, writable copy of this load and its built indexes"""
+        clone = RegistryData.__new__(RegistryData)
+        clone.columns = {name: _writable(column) for name, column in self.columns.items()}
+        clone.mtime = self.mtime
+        clone.source = self.source
+        clone.rows = self.rows
+        clone.reductions = clone.columns.get(EMISSION_COLUMN, self.reductions.writable())
+        clone.by_name = dict(self.by_name)
+        clone.by_proponent = dict(self.by_proponent)
+        clone._fuzzy = self._fuzzy.copy() if self._fuzzy is not None else None
+        clone._index = self._index.copy() if self._index is not None else None
+        clone._by_id = dict(self._by_id) if self._by_id is not None else None
+        clone._writable = True
+        clone.live = self.live.copy() if self.live is not None else None
+        return clone
+
+    def apply_changes(
+        self,
+        updates: Dict[int, Dict[str, str]],
+        inserts: List[Dict[str, str]],
+        deletes: List[int]
+    ) -> List[Tuple[int, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]:
+        """
+        Patch rows and every built index in place
+
+        Args:
+            updates: Row -> raw CSV values of the columns that changed
+            inserts: Raw CSV rows to append
+            deletes: Rows to remove
+
+        Returns:
+            (row, old record or None, new record or None) for every changed row
+        """
+        if not self._writable:
+            # Copy-on-write: mapped snapshot arrays are read-only
+            self.columns = {name: _writable(column) for name, column in self.columns.items()}
+            self.reductions = self.columns.get(EMISSION_COLUMN, self.reductions.writable())
+            self._writable = True
+
+        changes: List[Tuple[int, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]] = []
+        for row, raw in updates.items():
+            old = self.record(row)
+            for column, value in raw.items():
+                _set_raw(self.columns[column], row, value)
+            changes.append((row, old, self.record(row)))
+
+        for row in deletes:
+            changes.append((row, self.record(row), None))
+
+        if inserts:
+            start = self.rows
+            for name, column in self.columns.items():
+                _extend_raw(column, [r.get(name, "") for r in inserts])
+            if EMISSION_COLUMN not in self.columns:
+                self.reductions.extend_raw([""] * len(inserts))
+            self.rows += len(inserts)
+            changes.extend((row, None, self.record(row)) for row in range(start, self.rows))
+
+        if inserts or deletes:
+            live = np.ones(self.rows, dtype=bool)
+            if self.live is not None:
+                live[:len(self.live)] = self.live
+            live[list(deletes)] = False
+            self.live = live
+
+        for row, old, new in changes:
+            self._reindex_keys(row, old, new)
+            if self._fuzzy is not None:
+                if new is None:
+                    self._fuzzy.remove_row(row)
+                else:
+                    self._fuzzy.set_row(row, {f: new[f] for f in ("Name", "Proponent") if f in new})
+        if self._index is not None:
+            self._index.apply_changes(changes, self.reductions.values, self.live)
+        return changes
+
+    def _reindex_keys(self, row: int, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        """Keep the ID/Name/Proponent hash indexes consistent for one changed row"""
+        if self._by_id is not None:
+            if old and self._by_id.get(old.get("ID")) == row:
+                del self._by_id[old["ID"]]
+            if new and new.get("ID"):
+                self._by_id.setdefault(new["ID"], row)
+
+        for field, keys in (("Name", self.by_name), ("Proponent", self.by_proponent)):
+            old_key = normalize_key(old.get(field)) if old else ""
+            new_key = normalize_key(new.get(field)) if new else ""
+            if old_key == new_key and new is not None:
+                continue
+            if old_key and keys.get(old_key) == row:
+                # Fall back to the next live row with the same key, if any
+                del keys[old_key]
+                for other, value in enumerate(self.columns.get(field, [])):
+                    if other != row and self.is_live(other) and normalize_key(value) == old_key:
+                        keys[old_key] = other
+                        break
+            if new_key and (keys.get(new_key) is None or row < keys[new_key]):
+                keys[new_key] = row
+
+def diff_export(data: RegistryData, export: Dict[str, List[str]]) -> Dict[str, Any]:
+    """
+    Diff a new registry export against the current load by ``ID``
+
+    Args:
+        data: Current registry load
+        export: Raw CSV columns of the new export (see read_csv_columns)
+
+    Returns:
+        Dictionary with ``updates`` (row -> changed raw values), ``inserts``
+        (raw rows), ``deletes`` (rows) and ``skipped`` (export rows without an ID)
+    """
+    names = list(export)
+    ids = export.get("ID", [])
+    by_id = data.by_id
+    seen: set = set()
+    updates: Dict[int, Dict[str, str]] = {}
+    inserts: List[Dict[str, str]] = []
+    skipped = 0
+
+    for i, project_id in enumerate(ids):
+        if not project_id:
+            skipped += 1
+            continue
+        if project_id in seen:
+            continue  # Duplicate IDs: the first row wins, as in by_id
+        seen.add(project_id)
+        row = by_id.get(project_id)
+        if row is None:
+            inserts.append({name: export[name][i] for name in names})
+            continue
+        changed = {
+            name: export[name][i] for name in names
+            if typed_value(name, export[name][i]) != data.value(name, row)
+        }
+        if changed:
+            updates[row] = changed
+
+    deletes = sorted(row for project_id, row in by_id.items() if project_id not in seen)
+    return {"updates": updates, "inserts": inserts, "deletes": deletes, "skipped": skipped}
+
+class ProjectRegistry:
+    """
+    Registry rows loaded once into hash indexes on Name and Proponent, plus a
+    trigram index for fuzzy matching
+
+    The CSV's mtime is checked on every access; when the file changes the
+    registry reloads itself, so lookups never serve a stale export.  New
+    exports should go through ingest(), which patches a copy of the loaded
+    registry and swaps it in instead of reloading it.
+    """
+
+    def __init__(self, csv_path: Path, snapshot_dir: Optional[Path] = None):
+        """
+        Initialize the registry (data is loaded lazily on first access)
+
+        Args:
+            csv_path: Path to the registry CSV export
+            snapshot_dir: Columnar snapshot of the CSV (default: <csv stem>.snapshot)
+        """
+        self.csv_path = Path(csv_path)
+        self.snapshot_dir = Path(snapshot_dir) if snapshot_dir else default_snapshot_dir(self.csv_path)
+        self._lock = threading.Lock()
+        self._data: Optional[RegistryData] = None
+
+    def _current_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.csv_path).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def data(self) -> RegistryData:
+        """Return the current registry load, reloading if the CSV changed"""
+        mtime = self._current_mtime()
+        data = self._data
+        if data is not None and data.mtime == mtime:
+            return data
+        with self._lock:
+            data = self._data
+            if data is None or data.mtime != mtime:
+                data = self._load(mtime)
+                self._data = data
+        return data
+
+    def _load(self, mtime: Optional[float]) -> RegistryData:
+        # Prefer the memory-mapped snapshot when it was built from this CSV
+        manifest = read_manifest(self.snapshot_dir)
+        if manifest is not None and (
+            mtime is None or (
+                manifest.get("source_mtime") == mtime and
+                manifest.get("source_size") == os.stat(self.csv_path).st_size
+            )
+        ):
+            columns, _ = load_snapshot(self.snapshot_dir)
+            data = RegistryData(columns, mtime, source="snapshot")
+            logger.info(f"Mapped {len(data)} registry rows from snapshot {self.snapshot_dir}")
+            return data
+
+        columns = encode_columns(read_csv_columns(self.csv_path)) if mtime is not None else {}
+        data = RegistryData(columns, mtime)
+        logger.info(f"Loaded {len(data)} registry rows from {self.csv_path}")
+        return data
+
+    def ingest(self, export_path: Path, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Apply a new registry export incrementally
+
+        The export is diffed against the loaded registry by ``ID``; inserts,
+        updates and deletes are applied to a copy of the columns and indexes,
+        the export replaces the CSV (and the snapshot, if one is kept) and the
+        copy is swapped in.
+        A changed column layout falls back to a full reload.
+
+        Args:
+            export_path: New registry CSV export
+            dry_run: Only report the diff
+
+        Returns:
+            Dictionary with ``inserted``/``updated``/``deleted`` registry IDs,
+            ``changed`` (id, name, proponent, change) and ``full_reload``
+        """
+        export = read_csv_columns(export_path)
+        data = self.data()
+        with self._lock:
+            if self._data is not None:
+                data = self._data
+            full_reload = list(export) != list(data.columns)
+            diff = diff_export(data, export)
+
+            changed: List[Dict[str, str]] = []
+            for change, rows in (("updated", diff["updates"]), ("deleted", diff["deletes"])):
+                for row in rows:
+                    changed.append({
+                        "id": data.value("ID", row),
+                        "name": data.value("Name", row),
+                        "proponent": data.value("Proponent", row),
+                        "change": change,
+                    })
+            for raw in diff["inserts"]:
+                changed.append({
+                    "id": raw.get("ID", ""),
+                    "name": raw.get("Name", ""),
+                    "proponent": raw.get("Proponent", ""),
+                    "change": "inserted",
+                })
+            report = {
+                "inserted": [c["id"] for c in changed if c["change"] == "inserted"],
+                "updated": [c["id"] for c in changed if c["change"] == "updated"],
+                "deleted": [c["id"] for c in changed if c["change"] == "deleted"],
+                "changed": changed,
+                "skipped": diff["skipped"],
+                "full_reload": full_reload,
+            }
+            if dry_run:
+                return report
+
+            # Readers keep the current load until the patched copy is swapped in
+            patched = None if full_reload else data.copy()
+            if patched is not None:
+                patched.apply_changes(diff["updates"], diff["inserts"], diff["deletes"])
+            mtime = self._replace_csv(Path(export_path), export)
+            if patched is not None:
+                patched.mtime = mtime
+            self._data = patched
+
+        logger.info(
+            f"Ingested {export_path}: {len(report['inserted'])} inserted, "
+            f"{len(report['updated'])} updated, {len(report['deleted'])} deleted"
+            f"{' (full reload)' if full_reload else ''}"
+        )
+        return report
+
+    def _replace_csv(self, export_path: Path, export: Dict[str, List[str]]) -> Optional[float]:
+        """Atomically install the export as the registry CSV; returns its new mtime"""
+        if export_path.resolve() != self.csv_path.resolve():
+            tmp_path = self.csv_path.with_name(f".{self.csv_path.name}.tmp-{os.getpid()}")
+            shutil.copyfile(export_path, tmp_path)
+            os.replace(tmp_path, self.csv_path)
+        stat = os.stat(self.csv_path)
+
+        # Keep an existing snapshot in step so cold starts still map it
+        if read_manifest(self.snapshot_dir) is not None:
+            write_snapshot(
+                encode_columns(export), self.snapshot_dir,
+                source_mtime=stat.st_mtime, source_size=stat.st_size
+            )
+        return stat.st_mtime
+
+    def __len__(self) -> int:
+        return len(self.data())
+
+    def find(self, name: Optional[str], proponent: Optional[str]) -> Optional[int]:
+        """
+        Find the first row whose Name or Proponent matches (case-insensitive)
+
+        Returns:
+            Row index, or None when nothing matches
+        """
+        return self._find(self.data(), name, proponent)
+
+    def _find(self, data: RegistryData, name: Optional[str], proponent: Optional[str]) -> Optional[int]:
+        candidates = [
+            row for row in (
+                data.by_name.get(normalize_key(name)) if name else None,
+                data.by_proponent.get(normalize_key(proponent)) if proponent else None,
+            )
+            if row is not None
+        ]
+        return min(candidates) if candidates else None
+
+    def _fuzzy_find(self, data: RegistryData, name: Optional[str], proponent: Optional[str]) -> Optional[int]:
+        """Best fuzzy match for name/proponent above FUZZY_LOOKUP_THRESHOLD"""
+        best: Optional[Dict[str, Any]] = None
+        for query in (name, proponent):
+            if not query:
+                continue
+            # Ranking score favours query coverage; pick among the top few by similarity.
+            # score >= 0.75 * similarity, so no candidate above the threshold is filtered out.
+            candidates = data.fuzzy.search(
+                query, limit=FUZZY_LOOKUP_CANDIDATES, min_score=0.75 * FUZZY_LOOKUP_THRESHOLD
+            )
+            for candidate in candidates:
+                if candidate["similarity"] >= FUZZY_LOOKUP_THRESHOLD and (
+                    best is None or candidate["similarity"] > best["similarity"]
+                ):
+                    best = candidate
+        if best is not None:
+            logger.info(f"Fuzzy registry match for {name!r}/{proponent!r}: row {best['row']}")
+        return best["row"] if best else None
+
+    def match(self, query: str, limit: int = 10, min_score: float = 0.3) -> List[Dict[str, Any]]:
+        """
+        Ranked fuzzy candidates for *query* across Name and Proponent
+
+        Returns:
+            List of ``{id, name, proponent, matched_field, score, similarity}``
+        """
+        data = self.data()
+        return [
+            {
+                "id": data.value("ID", c["row"]),
+                "name": data.value("Name", c["row"]),
+                "proponent": data.value("Proponent", c["row"]),
+                "matched_field": c["field"],
+                "score": c["score"],
+                "similarity": c["similarity"],
+            }
+            for c in data.fuzzy.search(query, limit=limit, min_score=min_score)
+        ]
+
+    def query(
+        self,
+        filters: Optional[Dict[str, List[str]]] = None,
+        date_ranges: Optional[Dict[str, Tuple[Optional[date], Optional[date]]]] = None,
+        sort: str = "emissions_desc",
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Filter, sort and page the registry using the precomputed indexes
+
+        Args:
+            filters: Filter name (see FILTER_COLUMNS) -> accepted values
+            date_ranges: Date column -> inclusive (from, to)
+            sort: "emissions_desc" or "emissions_asc"
+            limit: Page size
+            cursor: ``next_cursor`` from the previous page
+
+        Returns:
+            Dictionary with ``items``, ``total`` and ``next_cursor``
+
+        Raises:
+            InvalidCursor: If the cursor is malformed or stale
+        """
+        data = self.data()
+        index = data.index
+        after = decode_cursor(cursor, sort, data.mtime) if cursor else None
+
+        rows = index.matching_rows(
+            {FILTER_COLUMNS[key]: values for key, values in (filters or {}).items() if values},
+            date_ranges or {}
+        )
+        page, next_after, total = index.page(rows, sort=sort, limit=limit, after=after)
+        return {
+            "items": [data.record(int(row)) for row in page],
+            "total": total,
+            "next_cursor": encode_cursor(next_after, sort, data.mtime) if next_after is not None else None,
+        }
+
+    def record(self, row: int) -> Dict[str, Any]:
+        """Return one registry row as a dictionary"""
+        return self.data().record(row)
+
+    def lookup(self, name: Optional[str], proponent: Optional[str]) -> Tuple[Optional[float], Optional[str]]:
+        """
+        Return (emission_reduction, industry) for a project, or (None, None)
+        """
+        data = self.data()
+        row = self._find(data, name, proponent)
+        if row is None:
+            row = self._fuzzy_find(data, name, proponent)
+        if row is None:
+            return None, None
+        industry = data.value("Project Type", row) or data.value("Industry", row) or None
+        return data.reductions[row], industry
+
+# Shared registries, one per CSV path
+_registries: Dict[Any, ProjectRegistry] = {}
+_registries_lock = threading.Lock()
+
+def get_registry(csv_path: Optional[Path] = None) -> ProjectRegistry:
+    """Return the process-wide registry for *csv_path* (default: PIPELINE_CSV)"""
+    csv_path = PIPELINE_CSV if csv_path is None else csv_path
+    registry = _registries.get(csv_path)
+    if registry is None:
+        with _registries_lock:
+            resolved = Path(csv_path).resolve()
+            registry = _registries.get(resolved) or ProjectRegistry(resolved)
+            _registries[resolved] = registry
+            _registries[csv_path] = registry
+    return registry
@@ -0,0 +1,222 @@
+"""
+Portfolio-wide token projection over the project registry
+
+Applies the certification formula::
+
+    tokens = annual_emission_reductions × (geometric_mean / 10)
+
+to every registry row at once.  Per-SDG scores (0-10) form a rows × 17
+matrix, filled from stored ``reg_<ID>`` certifications, a what-if default
+vector and per-project overrides; geometric means, token counts and the
+group-by aggregates are then single NumPy passes over that matrix.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import List, Optional, Dict, Any, Tuple
+
+import numpy as np
+
+from services.registry.project_registry import RegistryData
+from services.registry.snapshot import CategoricalColumn
+from utils.metrics import metrics
+
+SDG_COUNT = 17
+
+# Group-by name -> registry column
+GROUP_COLUMNS = {
+    "region": "Region",
+    "project_type": "Project Type",
+    "country": "Country/Area",
+}
+
+def geometric_means(scores: np.ndarray) -> np.ndarray:
+    """
+    Row-wise geometric mean of the positive scores of a 2-D matrix
+
+    Zero, negative and NaN (unscored) entries are ignored; rows without any
+    positive score get 0, matching LLMCertification.geometric_mean().
+    """
+    positive = scores > 0
+    logs = np.log(np.where(positive, scores, 1.0))
+    counts = np.count_nonzero(positive, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.exp(logs.sum(axis=1) / counts)
+    return np.where(counts > 0, means, 0.0)
+
+def project_tokens(reductions: np.ndarray, gm_scores: np.ndarray) -> np.ndarray:
+    """Tokens per row; 0 where reductions are missing or nothing was scored"""
+    with np.errstate(invalid="ignore"):
+        tokens = np.rint(reductions * (gm_scores / 10))
+    return np.where(np.isnan(tokens) | (gm_scores == 0), 0.0, tokens)
+
+def _score_vector(scores: Dict[int, float]) -> np.ndarray:
+    vector = np.full(SDG_COUNT, np.nan)
+    for sdg, score in scores.items():
+        if 1 <= int(sdg) <= SDG_COUNT:
+            vector[int(sdg) - 1] = float(score)
+    return vector
+
+class StoredScores:
+    """
+    Per-SDG scores (0-10) of stored ``reg_<ID>`` certifications
+
+    Project files are re-parsed only when their mtime changes, so repeated
+    projections cost one directory scan.
+    """
+
+    def __init__(self, projects_dir: str):
+        self.projects_dir = projects_dir
+        self._lock = threading.Lock()
+        self._files: Dict[str, Tuple[int, Optional[np.ndarray]]] = {}
+
+    def _parse(self, path: str) -> Optional[np.ndarray]:
+        try:
+            with open(path) as f:
+                verification = json.load(f).get("verification") or {}
+        except (OSError, ValueError):
+            return None
+        scores: Dict[int, float] = {}
+        for result in verification.get("results", []):
+            # Stored scores are scaled 0-100; the token formula uses 0-10
+            scores[int(result.get("sdg_id", 0))] = float(result.get("verification_score", 0)) / 10
+        return _score_vector(scores) if scores else None
+
+    def scores(self) -> Dict[str, np.ndarray]:
+        """Registry ID -> score vector"""
+        with self._lock:
+            seen = set()
+            try:
+                entries = list(os.scandir(self.projects_dir))
+            except FileNotFoundError:
+                entries = []
+            for entry in entries:
+                if not (entry.name.startswith("reg_") and entry.name.endswith(".json")):
+                    continue
+                seen.add(entry.name)
+                mtime = entry.stat().st_mtime_ns
+                cached = self._files.get(entry.name)
+                if cached is None or cached[0] != mtime:
+                    self._files[entry.name] = (mtime, self._parse(entry.path))
+            for name in set(self._files) - seen:
+                del self._files[name]
+            return {
+                name[len("reg_"):-len(".json")]: vector
+                for name, (_, vector) in self._files.items() if vector is not None
+            }
+
+def score_matrix(
+    data: RegistryData,
+    stored: Optional[Dict[str, np.ndarray]] = None,
+    default_scores: Optional[Dict[int, float]] = None,
+    overrides: Optional[Dict[str, Dict[int, float]]] = None
+) -> np.ndarray:
+    """
+    Build the rows × 17 score matrix (NaN = unscored)
+
+    Precedence per row: override, then stored certification, then default.
+    """
+    matrix = np.full((data.rows, SDG_COUNT), np.nan)
+    if default_scores:
+        matrix[:] = _score_vector(default_scores)
+    by_id = data.by_id
+    for project_id, vector in (stored or {}).items():
+        row = by_id.get(project_id)
+        if row is not None:
+            matrix[row] = vector
+    for project_id, scores in (overrides or {}).items():
+        row = by_id.get(project_id)
+        if row is None:
+            raise ValueError(f"Unknown registry ID: {project_id}")
+        matrix[row] = _score_vector(scores)
+    return matrix
+
+def _group(data: RegistryData, column: str, rows: np.ndarray, tokens: np.ndarray,
+           reductions: np.ndarray, scored: np.ndarray) -> List[Dict[str, Any]]:
+    values = data.columns.get(column)
+    if not isinstance(values, CategoricalColumn):
+        values = CategoricalColumn.from_values(list(values or [""] * data.rows))
+    codes = np.asarray(values.codes)[rows]
+    size = len(values.categories)
+
+    projects = np.bincount(codes, minlength=size)
+    counts = np.bincount(codes, weights=scored, minlength=size)
+    token_sums = np.bincount(codes, weights=tokens, minlength=size)
+    reduction_sums = np.bincount(codes, weights=np.nan_to_num(reductions), minlength=size)
+
+    order = np.argsort(-token_sums, kind="stable")
+    return [
+        {
+            "value": values.categories[code],
+            "projects": int(projects[code]),
+            "scored": int(counts[code]),
+            "tokens": float(token_sums[code]),
+            "emission_reductions": float(reduction_sums[code]),
+        }
+        for code in order if projects[code]
+    ]
+
+def project_portfolio(
+    data: RegistryData,
+    stored: Optional[Dict[str, np.ndarray]] = None,
+    default_scores: Optional[Dict[int, float]] = None,
+    overrides: Optional[Dict[str, Dict[int, float]]] = None,
+    group_by: Tuple[str, ...] = tuple(GROUP_COLUMNS),
+    top: int = 0
+) -> Dict[str, Any]:
+    """
+    Project token supply for every live registry row
+
+    Args:
+        data: Registry load
+        stored: Registry ID -> stored score vector (see StoredScores)
+        default_scores: What-if SDG -> score (0-10) for rows without other scores
+        overrides: What-if registry ID -> {SDG: score} replacing any other scores
+        group_by: Aggregates to compute (keys of GROUP_COLUMNS)
+        top: Also return this many projects with the most tokens
+
+    Returns:
+        Totals, ``groups`` (name -> aggregates, most tokens first) and ``top``
+
+    Raises:
+        ValueError: If a group-by name or an override's registry ID is unknown
+    """
+    unknown = [name for name in group_by if name not in GROUP_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown group_by: {unknown}. Valid values: {list(GROUP_COLUMNS)}")
+
+    started = time.perf_counter()
+    rows = np.arange(data.rows) if data.live is None else np.flatnonzero(data.live)
+    gm_all = geometric_means(score_matrix(data, stored, default_scores, overrides)[rows])
+    reductions = np.asarray(data.reductions.values, dtype=np.float64)[rows]
+    tokens = project_tokens(reductions, gm_all)
+    scored = (gm_all > 0).astype(np.float64)
+
+    result: Dict[str, Any] = {
+        "projects": int(len(rows)),
+        "scored": int(scored.sum()),
+        "total_tokens": float(tokens.sum()),
+        "total_emission_reductions": float(np.nansum(reductions)),
+        "mean_geometric_mean": float(gm_all[gm_all > 0].mean()) if scored.any() else 0.0,
+        "groups": {
+            name: _group(data, GROUP_COLUMNS[name], rows, tokens, reductions, scored)
+            for name in group_by
+        },
+        "top": [],
+    }
+    if top > 0:
+        best = np.argsort(-tokens, kind="stable")[:top]
+        result["top"] = [
+            {
+                "id": data.value("ID", int(rows[i])),
+                "name": data.value("Name", int(rows[i])),
+                "emission_reductions": float(reductions[i]),
+                "geometric_mean": round(float(gm_all[i]), 4),
+                "tokens": float(tokens[i]),
+            }
+            for i in best if tokens[i] > 0
+        ]
+    metrics.observe("registry.projection_ms", (time.perf_counter() - started) * 1000)
+    return result
@@ -0,0 +1,241 @@
+"""
+Indexed filtering, sorting and cursor pagination over the project registry
+
+Indexes are precomputed once per registry load:
+
+* categorical columns: sorted row-id postings per (lower-cased) value; for
+  multi-valued columns such as ``Methodology`` ("ACM0006; AMS-III.E.") each
+  ``;``-separated token gets its own postings,
+* date columns: values sorted with their row ids, so a range is two binary
+  searches,
+* emission reductions: ascending/descending sort permutations plus their
+  inverse (the rank of every row), so a filtered row set is put in order by
+  sorting small integer ranks.
+
+A page cursor is simply the rank of the last returned row.  An incremental
+ingest patches the postings and date arrays of the changed rows (on a copy of
+the index) and re-derives only the sort permutations.
+"""
+
+import base64
+import json
+from datetime import date
+from typing import List, Optional, Dict, Any, Set, Tuple
+
+import numpy as np
+
+from services.registry.snapshot import CategoricalColumn, DATE_COLUMNS
+
+# Query parameter -> registry column
+FILTER_COLUMNS = {
+    "country": "Country/Area",
+    "region": "Region",
+    "project_type": "Project Type",
+    "status": "Status",
+    "methodology": "Methodology",
+}
+
+SORT_ORDERS = ("emissions_desc", "emissions_asc")
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor is malformed or was issued for another registry load"""
+
+def _tokens(value: str) -> Set[str]:
+    """Index keys of a categorical value: the whole value plus each ';' token"""
+    tokens = {t.strip().lower() for t in value.split(";") if t.strip()}
+    if value:
+        tokens.add(value.lower())
+    return tokens
+
+def encode_cursor(position: int, sort: str, version: Optional[float]) -> str:
+    payload = json.dumps({"p": position, "s": sort, "v": version}).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str, version: Optional[float]) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        position = int(payload["p"])
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+    if payload.get("s") != sort or payload.get("v") != version:
+        raise InvalidCursor("Cursor does not match this query or the registry has changed")
+    return position
+
+class RegistryIndex:
+    """Per-column indexes over one registry load"""
+
+    def __init__(self, columns: Dict[str, Any], reductions: np.ndarray, live: Optional[np.ndarray] = None):
+        """
+        Build every index
+
+        Args:
+            columns: Typed registry columns (see snapshot.py)
+            reductions: Emission reductions (float64, NaN when missing)
+            live: Boolean mask of rows that have not been deleted (default: all)
+        """
+        self.rows = len(reductions)
+        empty = np.empty(0, dtype=np.int64)
+
+        self._postings: Dict[str, Dict[str, np.ndarray]] = {}
+        for column in FILTER_COLUMNS.values():
+            values = columns.get(column)
+            if not isinstance(values, CategoricalColumn):
+                values = CategoricalColumn.from_values(list(values or []))
+            codes = np.asarray(values.codes)
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(values.categories) + 1))
+
+            parts: Dict[str, List[np.ndarray]] = {}
+            for code, category in enumerate(values.categories):
+                rows = order[bounds[code]:bounds[code + 1]]
+                for token in _tokens(category):
+                    parts.setdefault(token, []).append(rows)
+            self._postings[column] = {
+                token: np.unique(np.concatenate(arrays)) if len(arrays) > 1 else np.sort(arrays[0])
+                for token, arrays in parts.items()
+            }
+        self._empty = empty
+
+        # NaT sorts last, so the valid prefix of the order is searchable
+        self._dates: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for column in DATE_COLUMNS:
+            values = columns.get(column)
+            if values is None:
+                continue
+            raw = np.asarray(values.values)
+            order = np.argsort(raw, kind="stable")
+            valid = int(np.count_nonzero(~np.isnat(raw)))
+            self._dates[column] = (raw[order][:valid], order[:valid])
+
+        self._set_orders(reductions, live)
+
+    def _set_orders(self, reductions: np.ndarray, live: Optional[np.ndarray]) -> None:
+        """Sort permutations over live rows (NaN last) and each row's rank (-1 if deleted)"""
+        reductions = np.asarray(reductions, dtype=np.float64)
+        self.rows = len(reductions)
+        rows = np.arange(self.rows) if live is None else np.flatnonzero(live)
+        self._orders = {
+            "emissions_desc": rows[np.argsort(-reductions[rows], kind="stable")],
+            "emissions_asc": rows[np.argsort(reductions[rows], kind="stable")],
+        }
+        self._ranks = {}
+        for sort, order in self._orders.items():
+            rank = np.full(self.rows, -1, dtype=np.int64)
+            rank[order] = np.arange(len(order))
+            self._ranks[sort] = rank
+
+    def copy(self) -> "RegistryIndex":
+        """Independent copy for apply_changes (arrays are replaced, never written, so they are shared)"""
+        clone = RegistryIndex.__new__(RegistryIndex)
+        clone.rows = self.rows
+        clone._empty = self._empty
+        clone._postings = {column: dict(postings) for column, postings in self._postings.items()}
+        clone._dates = dict(self._dates)
+        clone._orders = dict(self._orders)
+        clone._ranks = dict(self._ranks)
+        return clone
+
+    def apply_changes(
+        self,
+        changes: List[Tuple[int, Optional[Dict[str, str]], Optional[Dict[str, str]]]],
+        reductions: np.ndarray,
+        live: Optional[np.ndarray]
+    ) -> None:
+        """
+        Update the indexes in place for changed rows
+
+        Args:
+            changes: (row, old values or None for an insert, new values or None
+                for a delete); values are the typed column values keyed by column
+            reductions: Emission reductions after the change
+            live: Live-row mask after the change
+        """
+        for row, old, new in changes:
+            for column in FILTER_COLUMNS.values():
+                postings = self._postings.setdefault(column, {})
+                old_tokens = _tokens(old.get(column, "")) if old else set()
+                new_tokens = _tokens(new.get(column, "")) if new else set()
+                for token in old_tokens - new_tokens:
+                    rows = postings.get(token, self._empty)
+                    postings[token] = rows[rows != row]
+                for token in new_tokens - old_tokens:
+                    rows = postings.get(token, self._empty)
+                    postings[token] = np.insert(rows, np.searchsorted(rows, row), row)
+
+            for column, (values, order) in list(self._dates.items()):
+                old_date = old.get(column, "") if old else ""
+                new_date = new.get(column, "") if new else ""
+                if old_date == new_date:
+                    continue
+                if old_date:
+                    keep = order != row
+                    values, order = values[keep], order[keep]
+                if new_date:
+                    value = np.datetime64(new_date, "D")
+                    at = np.searchsorted(values, value, "right")
+                    values, order = np.insert(values, at, value), np.insert(order, at, row)
+                self._dates[column] = (values, order)
+
+        self._set_orders(reductions, live)
+
+    def matching_rows(
+        self,
+        filters: Dict[str, List[str]],
+        date_ranges: Dict[str, Tuple[Optional[date], Optional[date]]]
+    ) -> Optional[np.ndarray]:
+        """
+        Sorted row ids matching every filter, or None when nothing is filtered
+
+        Args:
+            filters: Registry column -> accepted values (any of them matches)
+            date_ranges: Date column -> inclusive (from, to); either end may be None
+        """
+        sets: List[np.ndarray] = []
+        for column, values in filters.items():
+            postings = self._postings.get(column, {})
+            matched = [postings.get(v.strip().lower(), self._empty) for v in values if v.strip()]
+            if not matched:
+                continue
+            sets.append(matched[0] if len(matched) == 1 else np.unique(np.concatenate(matched)))
+
+        for column, (start, end) in date_ranges.items():
+            if start is None and end is None:
+                continue
+            values, order = self._dates.get(column, (self._empty.astype("datetime64[D]"), self._empty))
+            lo = np.searchsorted(values, np.datetime64(start, "D"), "left") if start else 0
+            hi = np.searchsorted(values, np.datetime64(end, "D"), "right") if end else len(values)
+            sets.append(np.sort(order[lo:hi]))
+
+        if not sets:
+            return None
+        sets.sort(key=len)
+        rows = sets[0]
+        for other in sets[1:]:
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return rows
+
+    def page(
+        self,
+        rows: Optional[np.ndarray],
+        sort: str = "emissions_desc",
+        limit: int = 50,
+        after: Optional[int] = None
+    ) -> Tuple[np.ndarray, Optional[int], int]:
+        """
+        Order *rows* and cut one page
+
+        Returns:
+            (row ids of the page, rank to resume after or None, total matches)
+        """
+        if rows is None:
+            positions = np.arange(len(self._orders[sort]))
+        else:
+            positions = self._ranks[sort][rows]
+            positions = np.sort(positions[positions >= 0])
+        total = len(positions)
+        if after is not None:
+            positions = positions[np.searchsorted(positions, after, "right"):]
+        page = positions[:limit]
+        next_after = int(page[-1]) if len(positions) > limit else None
+        return self._orders[sort][page], next_after, total
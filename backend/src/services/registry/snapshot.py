@@ -0,0 +1,373 @@
+"""
+Typed, memory-mappable columnar snapshots of the project registry
+
+``pipeline.csv`` is compiled once into a directory of NumPy arrays:
+
+* emission reductions as ``float64`` (NaN when missing),
+* dates as ``datetime64[D]`` (NaT when missing),
+* low-cardinality columns (country, region, status, ...) dictionary-encoded
+  as ``int32`` codes plus a category list in the manifest,
+* free-text columns as one UTF-8 blob plus ``int64`` offsets.
+
+Snapshots are opened with ``mmap_mode="r"`` so every worker process shares
+the same page-cached copy and cold start skips CSV parsing entirely.
+
+Build (from ``backend/src``)::
+
+    python -m services.registry.snapshot --csv ../pipeline.csv
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import List, Optional, Dict, Any, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+EMISSION_COLUMN = "Estimated Annual Emission Reductions"
+NUMERIC_COLUMNS = (EMISSION_COLUMN,)
+DATE_COLUMNS = (
+    "Project Registration Date",
+    "Crediting Period Start Date",
+    "Crediting Period End Date",
+)
+CATEGORICAL_COLUMNS = (
+    "Country/Area",
+    "Region",
+    "Status",
+    "Methodology",
+    "Project Type",
+    "AFOLU Activities",
+)
+
+###############################################################################
+# Column types
+###############################################################################
+
+class StringColumn:
+    """Variable-length UTF-8 strings stored as one blob plus offsets"""
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self.offsets = offsets
+        self.blob = blob
+
+    @classmethod
+    def from_values(cls, values: Sequence[str]) -> "StringColumn":
+        encoded = [v.encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(offsets, blob)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        # One bulk copy is far cheaper than slicing the mapped array per row
+        raw = self.blob.tobytes()
+        offsets = self.offsets.tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield raw[start:end].decode("utf-8")
+
+    def writable(self) -> List[str]:
+        """Materialise as a plain list (free text is edited as Python strings)"""
+        return list(self)
+
+class CategoricalColumn:
+    """Dictionary-encoded strings: ``int32`` codes into ``categories``"""
+
+    def __init__(self, codes: np.ndarray, categories: List[str]):
+        self.codes = codes
+        self.categories = categories
+        self._lookup: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_values(cls, values: Sequence[str]) -> "CategoricalColumn":
+        lookup: Dict[str, int] = {}
+        codes = np.fromiter(
+            (lookup.setdefault(v, len(lookup)) for v in values),
+            dtype=np.int32,
+            count=len(values),
+        )
+        return cls(codes, list(lookup))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, row: int) -> str:
+        return self.categories[self.codes[row]]
+
+    def __iter__(self):
+        categories = self.categories
+        for code in self.codes.tolist():
+            yield categories[code]
+
+    def writable(self) -> "CategoricalColumn":
+        return CategoricalColumn(np.array(self.codes, dtype=np.int32), list(self.categories))
+
+    def _code(self, value: str) -> int:
+        if self._lookup is None:
+            self._lookup = {c: i for i, c in enumerate(self.categories)}
+        code = self._lookup.get(value)
+        if code is None:
+            code = self._lookup[value] = len(self.categories)
+            self.categories.append(value)
+        return code
+
+    def set_raw(self, row: int, raw: str) -> None:
+        self.codes[row] = self._code(raw)
+
+    def extend_raw(self, raws: Sequence[str]) -> None:
+        codes = np.array([self._code(v) for v in raws], dtype=np.int32)
+        self.codes = np.concatenate([self.codes, codes])
+
+class DateColumn:
+    """Dates as ``datetime64[D]``; reads back as ISO strings ("" when missing)"""
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+
+    @classmethod
+    def from_values(cls, values: Sequence[str]) -> "DateColumn":
+        parsed = []
+        for v in values:
+            try:
+                parsed.append(np.datetime64(v[:10], "D") if v else np.datetime64("NaT"))
+            except ValueError:
+                parsed.append(np.datetime64("NaT"))
+        return cls(np.array(parsed, dtype="datetime64[D]"))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, row: int) -> str:
+        value = self.values[row]
+        return "" if np.isnat(value) else str(value)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def writable(self) -> "DateColumn":
+        return DateColumn(np.array(self.values, dtype="datetime64[D]"))
+
+    def set_raw(self, row: int, raw: str) -> None:
+        self.values[row] = DateColumn.from_values([raw]).values[0]
+
+    def extend_raw(self, raws: Sequence[str]) -> None:
+        self.values = np.concatenate([self.values, DateColumn.from_values(raws).values])
+
+class NumericColumn:
+    """``float64`` values; reads back as ``float`` or ``None`` for NaN"""
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+
+    @classmethod
+    def from_values(cls, values: Sequence[str]) -> "NumericColumn":
+        parsed = []
+        for v in values:
+            try:
+                parsed.append(float(str(v or "").replace(",", "").strip()))
+            except ValueError:
+                parsed.append(np.nan)
+        return cls(np.array(parsed, dtype=np.float64))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, row: int) -> Optional[float]:
+        value = float(self.values[row])
+        return None if np.isnan(value) else value
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def writable(self) -> "NumericColumn":
+        return NumericColumn(np.array(self.values, dtype=np.float64))
+
+    def set_raw(self, row: int, raw: str) -> None:
+        self.values[row] = NumericColumn.from_values([raw]).values[0]
+
+    def extend_raw(self, raws: Sequence[str]) -> None:
+        self.values = np.concatenate([self.values, NumericColumn.from_values(raws).values])
+
+def encode_columns(raw: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Convert raw CSV string columns into typed columns
+
+    Free-text columns stay plain lists in memory; they are only blob-encoded
+    when written to a snapshot.
+    """
+    encoded: Dict[str, Any] = {}
+    for name, values in raw.items():
+        if name in NUMERIC_COLUMNS:
+            encoded[name] = NumericColumn.from_values(values)
+        elif name in DATE_COLUMNS:
+            encoded[name] = DateColumn.from_values(values)
+        elif name in CATEGORICAL_COLUMNS:
+            encoded[name] = CategoricalColumn.from_values(values)
+        else:
+            encoded[name] = values
+    return encoded
+
+def typed_value(name: str, raw: str) -> Any:
+    """The value a typed column of *name* would hold for *raw* (for diffing)"""
+    if name in NUMERIC_COLUMNS:
+        return NumericColumn.from_values([raw])[0]
+    if name in DATE_COLUMNS:
+        return DateColumn.from_values([raw])[0]
+    return raw
+
+###############################################################################
+# Persistence
+###############################################################################
+
+def read_csv_columns(csv_path: Path) -> Dict[str, List[str]]:
+    """Read a registry CSV into ``{column: [values]}`` with stripped names"""
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = [c.strip() for c in next(reader, [])]
+        columns: Dict[str, List[str]] = {c: [] for c in header}
+        for row in reader:
+            for col, value in zip(header, row):
+                columns[col].append(value.strip())
+            # Pad short rows so every column has the same length
+            for col in header[len(row):]:
+                columns[col].append("")
+    return columns
+
+def _file_stem(index: int) -> str:
+    return f"col{index:02d}"
+
+def write_snapshot(
+    columns: Dict[str, Any],
+    out_dir: Path,
+    source_mtime: Optional[float] = None,
+    source_size: Optional[int] = None,
+) -> Path:
+    """Write typed *columns* to *out_dir*, replacing any previous snapshot atomically"""
+    out_dir = Path(out_dir)
+    tmp_dir = out_dir.with_name(f"{out_dir.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    manifest: Dict[str, Any] = {
+        "version": SNAPSHOT_VERSION,
+        "rows": 0,
+        "source_mtime": source_mtime,
+        "source_size": source_size,
+        "columns": [],
+    }
+    for index, (name, column) in enumerate(columns.items()):
+        stem = _file_stem(index)
+        entry: Dict[str, Any] = {"name": name, "file": stem}
+        if isinstance(column, NumericColumn):
+            entry["type"] = "numeric"
+            np.save(tmp_dir / f"{stem}.npy", column.values)
+        elif isinstance(column, DateColumn):
+            entry["type"] = "date"
+            np.save(tmp_dir / f"{stem}.npy", column.values)
+        elif isinstance(column, CategoricalColumn):
+            entry["type"] = "categorical"
+            entry["categories"] = column.categories
+            np.save(tmp_dir / f"{stem}.npy", column.codes)
+        else:
+            strings = column if isinstance(column, StringColumn) else StringColumn.from_values(column)
+            entry["type"] = "string"
+            np.save(tmp_dir / f"{stem}.offsets.npy", strings.offsets)
+            np.save(tmp_dir / f"{stem}.blob.npy", strings.blob)
+        manifest["rows"] = len(column)
+        manifest["columns"].append(entry)
+
+    with open(tmp_dir / MANIFEST_FILE, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    # Swap directories so readers never see a half-written snapshot
+    old_dir = out_dir.with_name(f"{out_dir.name}.old-{os.getpid()}")
+    if out_dir.exists():
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return out_dir
+
+def read_manifest(snapshot_dir: Path) -> Optional[Dict[str, Any]]:
+    """Return the snapshot manifest, or None if there is no usable snapshot"""
+    try:
+        with open(Path(snapshot_dir) / MANIFEST_FILE) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    return manifest if manifest.get("version") == SNAPSHOT_VERSION else None
+
+def load_snapshot(snapshot_dir: Path) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Open a snapshot zero-copy (memory-mapped, read-only)
+
+    Returns:
+        (columns, manifest)
+    """
+    snapshot_dir = Path(snapshot_dir)
+    manifest = read_manifest(snapshot_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No registry snapshot in {snapshot_dir}")
+
+    def mapped(name: str) -> np.ndarray:
+        return np.load(snapshot_dir / name, mmap_mode="r")
+
+    columns: Dict[str, Any] = {}
+    for entry in manifest["columns"]:
+        stem = entry["file"]
+        kind = entry["type"]
+        if kind == "numeric":
+            columns[entry["name"]] = NumericColumn(mapped(f"{stem}.npy"))
+        elif kind == "date":
+            columns[entry["name"]] = DateColumn(mapped(f"{stem}.npy"))
+        elif kind == "categorical":
+            columns[entry["name"]] = CategoricalColumn(mapped(f"{stem}.npy"), entry["categories"])
+        else:
+            columns[entry["name"]] = StringColumn(
+                mapped(f"{stem}.offsets.npy"), mapped(f"{stem}.blob.npy")
+            )
+    return columns, manifest
+
+def default_snapshot_dir(csv_path: Path) -> Path:
+    """Snapshot location for *csv_path* (REGISTRY_SNAPSHOT_DIR overrides)"""
+    override = os.getenv("REGISTRY_SNAPSHOT_DIR")
+    if override:
+        return Path(override)
+    csv_path = Path(csv_path)
+    return csv_path.with_name(f"{csv_path.stem}.snapshot")
+
+def build_snapshot(csv_path: Path, out_dir: Optional[Path] = None) -> Path:
+    """Compile *csv_path* into a snapshot next to it (or in *out_dir*)"""
+    csv_path = Path(csv_path)
+    stat = os.stat(csv_path)
+    columns = encode_columns(read_csv_columns(csv_path))
+    out_dir = Path(out_dir) if out_dir else default_snapshot_dir(csv_path)
+    write_snapshot(columns, out_dir, source_mtime=stat.st_mtime, source_size=stat.st_size)
+    logger.info(f"Wrote registry snapshot for {csv_path} to {out_dir}")
+    return out_dir
+
+if __name__ == "__main__":
+    from services.registry.project_registry import PIPELINE_CSV
+
+    parser = argparse.ArgumentParser(description="Compile the registry CSV into a columnar snapshot")
+    parser.add_argument("--csv", type=Path, default=PIPELINE_CSV, help="Registry CSV export")
+    parser.add_argument("--out", type=Path, default=None, help="Snapshot directory")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(build_snapshot(args.csv, args.out))
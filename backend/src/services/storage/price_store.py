@@ -0,0 +1,321 @@
+"""
+Append-only on-disk time series of oracle prices with OHLC candles
+
+Every price point is appended as a fixed 32-byte record (timestamp, price_xrp,
+price_usd, xrp_usd_rate as little-endian float64) to ``prices.bin``.  In
+memory the most recent points live in a bounded buffer of typed arrays, so a
+time range is two binary searches.  Candles at each resolution are
+pre-aggregated: rebuilt from the file on start-up, then updated in O(1) as
+points are appended.
+
+With several API worker processes sharing the data directory, only the one
+holding the exclusive lock on ``prices.lock`` writes; the others fold in the
+records it appends whenever they are read.  Loading sorts the file's points
+and drops duplicate timestamps, so older files written concurrently load clean.
+"""
+
+import logging
+import os
+import struct
+import threading
+import time
+from typing import List, Optional, Dict, Any, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, every process writes
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("price_xrp", "price_usd", "xrp_usd_rate")
+RECORD = struct.Struct("<dddd")
+
+# Candle resolution name -> bucket width in seconds
+RESOLUTIONS = {"5m": 300, "1h": 3600, "1d": 86400}
+
+# Points/candles kept in memory per series (older ones stay on disk only)
+PRICE_STORE_CAPACITY = int(os.getenv("PRICE_STORE_CAPACITY", "262144"))
+
+# Candle row layout: bucket start, sample count, then open/high/low/close per field
+_OHLC = ("open", "high", "low", "close")
+_CANDLE_WIDTH = 2 + 4 * len(FIELDS)
+
+class _Buffer:
+    """
+    Bounded, append-only 2-D float64 buffer keeping the newest *capacity* rows
+
+    Storage grows by doubling up to twice the capacity; once there, reaching
+    the end moves the live rows back to the front.  Appends are amortised O(1)
+    and the live rows are always one contiguous, time-ordered slice.
+    """
+
+    def __init__(self, width: int, capacity: int):
+        self.capacity = max(1, capacity)
+        self._data = np.empty((min(2 * self.capacity, 1024), width))
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def view(self) -> np.ndarray:
+        return self._data[self._start:self._end]
+
+    def last(self) -> Optional[np.ndarray]:
+        return self._data[self._end - 1] if self._end > self._start else None
+
+    def append(self, row: np.ndarray) -> None:
+        if self._end == len(self._data):
+            if len(self._data) < 2 * self.capacity:
+                grown = np.empty((min(2 * len(self._data), 2 * self.capacity), self._data.shape[1]))
+                grown[:self._end] = self._data
+                self._data = grown
+            else:
+                keep = self._data[self._end - self.capacity + 1:self._end].copy()
+                self._data[:len(keep)] = keep
+                self._start, self._end = 0, len(keep)
+        self._data[self._end] = row
+        self._end += 1
+        if self._end - self._start > self.capacity:
+            self._start += 1
+
+    def extend(self, rows: np.ndarray) -> None:
+        """Replace the contents with (the newest *capacity* of) *rows*"""
+        rows = rows[-self.capacity:]
+        if len(rows) > len(self._data):
+            self._data = np.empty((min(2 * len(rows), 2 * self.capacity), self._data.shape[1]))
+        self._data[:len(rows)] = rows
+        self._start, self._end = 0, len(rows)
+
+def _candles(points: np.ndarray, width: int) -> np.ndarray:
+    """Aggregate time-ordered points (ts, *FIELDS) into candle rows"""
+    if not len(points):
+        return np.empty((0, _CANDLE_WIDTH))
+    buckets = np.floor(points[:, 0] / width) * width
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(points)]
+
+    candles = np.empty((len(starts), _CANDLE_WIDTH))
+    candles[:, 0] = buckets[starts]
+    candles[:, 1] = ends - starts
+    for i in range(len(FIELDS)):
+        values = points[:, 1 + i]
+        base = 2 + 4 * i
+        candles[:, base] = values[starts]
+        candles[:, base + 1] = np.maximum.reduceat(values, starts)
+        candles[:, base + 2] = np.minimum.reduceat(values, starts)
+        candles[:, base + 3] = values[ends - 1]
+    return candles
+
+def _range(times: np.ndarray, start: Optional[float], end: Optional[float]) -> Tuple[int, int]:
+    lo = int(np.searchsorted(times, start, "left")) if start is not None else 0
+    hi = int(np.searchsorted(times, end, "right")) if end is not None else len(times)
+    return lo, hi
+
+class PriceStore:
+    """Persistent price history with pre-aggregated candles"""
+
+    def __init__(self, data_dir: Optional[str] = None, capacity: int = PRICE_STORE_CAPACITY):
+        """
+        Open (or create) the store and load its history
+
+        Args:
+            data_dir: Directory for prices.bin (default: prices/ in the project data dir)
+            capacity: Points and candles per resolution kept in memory
+        """
+        self.data_dir = data_dir or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+            "data", "prices"
+        )
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.path = os.path.join(self.data_dir, "prices.bin")
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._writer = self._acquire_writer()
+        self._offset = 0  # Bytes of prices.bin folded into memory
+        self._points = _Buffer(1 + len(FIELDS), capacity)
+        self._candles = {name: _Buffer(_CANDLE_WIDTH, capacity) for name in RESOLUTIONS}
+        self._load()
+
+    def _acquire_writer(self) -> bool:
+        """Try to become the single process appending to prices.bin"""
+        if fcntl is None:
+            return True
+        lock_file = open(os.path.join(self.data_dir, "prices.lock"), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file  # Held for the life of the process
+        logger.info(f"Price store {self.path}: this process is the writer")
+        return True
+
+    def _read_records(self, offset: int) -> np.ndarray:
+        """Whole records of prices.bin from byte *offset* on"""
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        count = (size - offset) // RECORD.size
+        if count <= 0:
+            return np.empty((0, 1 + len(FIELDS)))
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return np.fromfile(f, dtype="<f8", count=count * (1 + len(FIELDS))).reshape(-1, 1 + len(FIELDS))
+
+    def _load(self) -> None:
+        if self._writer and os.path.exists(self.path):
+            size = os.path.getsize(self.path)
+            whole = size - size % RECORD.size
+            if whole != size:
+                # Drop a record torn by a crash mid-append
+                logger.warning(f"Truncating {size - whole} trailing bytes of {self.path}")
+                with open(self.path, "r+b") as f:
+                    f.truncate(whole)
+        points = self._read_records(0)
+        self._offset = len(points) * RECORD.size
+        if len(points):
+            # Concurrent writers may have interleaved or duplicated points
+            _, first = np.unique(points[:, 0], return_index=True)
+            if len(first) != len(points) or np.any(np.diff(points[:, 0]) < 0):
+                logger.warning(f"Dropped {len(points) - len(first)} duplicate and re-sorted price points")
+            points = points[first]
+        self._points.extend(points)
+        for name, width in RESOLUTIONS.items():
+            self._candles[name].extend(_candles(points, width))
+        logger.info(f"Loaded {len(points)} price points from {self.path}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            if not self._writer:
+                self._catch_up()
+            return len(self._points)
+
+    def _fold(self, row: np.ndarray) -> None:
+        """Add one point to the buffer and every candle"""
+        ts = row[0]
+        self._points.append(row)
+        for name, width in RESOLUTIONS.items():
+            buffer = self._candles[name]
+            bucket = (ts // width) * width
+            candle = buffer.last()
+            if candle is not None and candle[0] == bucket:
+                candle[1] += 1
+                for i, value in enumerate(row[1:]):
+                    base = 2 + 4 * i
+                    candle[base + 1] = max(candle[base + 1], value)
+                    candle[base + 2] = min(candle[base + 2], value)
+                    candle[base + 3] = value
+            else:
+                buffer.append(_candles(row[None, :], width)[0])
+
+    def _catch_up(self) -> None:
+        """Fold in points another process appended (caller holds the lock)"""
+        rows = self._read_records(self._offset)
+        self._offset += len(rows) * RECORD.size
+        for row in rows:
+            last = self._points.last()
+            if last is None or row[0] > last[0]:
+                self._fold(row)
+
+    def append(self, price_xrp: float, price_usd: float, xrp_usd_rate: float,
+               timestamp: Optional[float] = None) -> Optional[float]:
+        """
+        Durably append one price point and fold it into every candle
+
+        Only the writer process stores points; in any other process this
+        just folds in what the writer has appended.  If the writer has exited
+        its lock is taken over here.
+
+        Returns:
+            The stored timestamp (later than the previous point), or None
+            when another process is the writer
+        """
+        with self._lock:
+            if not self._writer:
+                self._catch_up()
+                self._writer = self._acquire_writer()
+                if not self._writer:
+                    return None
+                # Took over from an exited writer: fold in its last points, drop a torn record
+                self._catch_up()
+                with open(self.path, "ab") as f:
+                    f.truncate(self._offset)
+            last = self._points.last()
+            ts = time.time() if timestamp is None else timestamp
+            if last is not None and ts <= last[0]:
+                ts = float(np.nextafter(last[0], np.inf))
+            row = np.array([ts, price_xrp, price_usd, xrp_usd_rate], dtype=np.float64)
+
+            with open(self.path, "ab") as f:
+                f.write(RECORD.pack(*row))
+                f.flush()
+                os.fsync(f.fileno())
+            self._offset += RECORD.size
+
+            self._fold(row)
+            return ts
+
+    def points(self, start: Optional[float] = None, end: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Price points with start <= timestamp <= end (epoch seconds, either may be None)
+        """
+        with self._lock:
+            if not self._writer:
+                self._catch_up()
+            view = self._points.view()
+            lo, hi = _range(view[:, 0], start, end)
+            rows = view[lo:hi].copy()
+        return [dict(zip(("timestamp",) + FIELDS, map(float, row))) for row in rows]
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if not self._writer:
+                self._catch_up()
+            last = self._points.last()
+            return dict(zip(("timestamp",) + FIELDS, map(float, last))) if last is not None else None
+
+    def candles(
+        self,
+        resolution: str,
+        field: str = "price_xrp",
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        OHLC candles of *field* whose bucket starts within [start, end]
+
+        Args:
+            resolution: One of RESOLUTIONS
+            field: One of FIELDS
+            start: Earliest bucket start (epoch seconds)
+            end: Latest bucket start (epoch seconds)
+            limit: Return only the most recent *limit* candles
+
+        Raises:
+            ValueError: If the resolution or field is unknown
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}. Valid values: {list(RESOLUTIONS)}")
+        if field not in FIELDS:
+            raise ValueError(f"Unknown field: {field}. Valid values: {list(FIELDS)}")
+        base = 2 + 4 * FIELDS.index(field)
+
+        with self._lock:
+            if not self._writer:
+                self._catch_up()
+            view = self._candles[resolution].view()
+            lo, hi = _range(view[:, 0], start, end)
+            if limit is not None:
+                lo = max(lo, hi - limit)
+            rows = view[lo:hi, [0, 1, base, base + 1, base + 2, base + 3]].copy()
+        return [
+            {
+                "timestamp": float(row[0]),
+                "samples": int(row[1]),
+                **{key: float(value) for key, value in zip(_OHLC, row[2:])},
+            }
+            for row in rows
+        ]
@@ -171,4 +171,24 @@ class ProjectStorageService:
             project.updated_at = datetime.now()
             
             self.save_project(project)
-            return True
\ No newline at end of file
+            return True
+
+    def mark_certifications_stale(self, project_ids: List[str]) -> List[str]:
+        """
+        Flag the certifications of projects as stale
+        
+        Args:
+            project_ids: IDs of the projects to flag
+            
+        Returns:
+            IDs of the projects that exist and were flagged
+        """
+        flagged = []
+        for project_id in project_ids:
+            project = self.get_project(project_id)
+            if not project or not project.verification or project.certification_stale:
+                continue
+            project.certification_stale = True
+            self.save_project(project)
+            flagged.append(project_id)
+        return flagged
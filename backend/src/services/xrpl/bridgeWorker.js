@@ -0,0 +1,78 @@
+const readline = require("readline")
+const xrpl = require("xrpl")
+const TokenizationService = require("./tokenizationService")
+
+/**
+ * Long-lived worker behind py_node_bridge.
+ *
+ * Speaks line-delimited JSON-RPC over stdio: each stdin line is a request
+ * `{"id": <int>, "method": <string>, "params": <object>}` and each stdout line
+ * a response `{"id": <int>, "result": <any>}` or `{"id": <int>, "error": <string>}`.
+ * Requests run concurrently over one TokenizationService, so the ledger
+ * connection is opened once and reused; responses may arrive out of order.
+ */
+
+// stdout carries protocol lines only; route library/service logging to stderr
+console.log = console.error
+
+const service = new TokenizationService()
+
+// Same shape as the native Python MPT service: { success, hash, engine_result }
+function txReport(response) {
+  const engineResult = response?.result?.meta?.TransactionResult
+  return {
+    success: engineResult === "tesSUCCESS",
+    hash: response?.result?.hash,
+    engine_result: engineResult,
+    error: engineResult === "tesSUCCESS" ? undefined : `Transaction failed: ${engineResult}`
+  }
+}
+
+const methods = {
+  createGreenAssetToken: (params) =>
+    service.createGreenAssetToken(params.tokenData, xrpl.Wallet.fromSeed(params.walletSeed)),
+  authorizeHolder: async (params) =>
+    txReport(await service.authorizeHolder(xrpl.Wallet.fromSeed(params.issuerSeed), params.holderAddress, params.issuanceID)),
+  mintToHolder: async (params) =>
+    txReport(await service.mintToHolder(xrpl.Wallet.fromSeed(params.issuerSeed), params.holderAddress, params.issuanceID, params.amount)),
+  getHoldings: async (params) =>
+    ({ success: true, result: (await service.getHoldings(params.account, params.issuanceID)).result }),
+  ping: async () => "pong"
+}
+
+function respond(message) {
+  process.stdout.write(JSON.stringify(message) + "\n")
+}
+
+async function handle(line) {
+  let request
+  try {
+    request = JSON.parse(line)
+  } catch (error) {
+    respond({ id: null, error: `Invalid request: ${error.message}` })
+    return
+  }
+
+  const handler = methods[request.method]
+  try {
+    if (!handler) {
+      throw new Error(`Unsupported method: ${request.method}`)
+    }
+    respond({ id: request.id, result: await handler(request.params || {}) })
+  } catch (error) {
+    respond({ id: request.id, error: error.message })
+  }
+}
+
+const input = readline.createInterface({ input: process.stdin, terminal: false })
+input.on("line", (line) => {
+  if (line.trim()) {
+    handle(line)
+  }
+})
+
+// The parent closed our stdin: finish up and exit
+input.on("close", async () => {
+  await service.disconnect().catch(() => {})
+  process.exit(0)
+})
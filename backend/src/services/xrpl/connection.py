@@ -0,0 +1,247 @@
+"""Shared, self-healing XRPL websocket connection.
+
+One ``XRPLConnectionManager`` per process keeps a single websocket open to
+the first reachable endpoint of ``XRPL_WSS`` (comma-separated for
+failover).  Concurrent requests are multiplexed over that socket (responses
+are matched by request id), a health probe runs in the background, and when
+the socket fails the manager reconnects with exponential backoff, rotating
+through the endpoints.  A request that merely times out does not drop the
+connection; a run of timeouts brings the next health probe forward instead.
+
+The manager can be passed wherever xrpl-py expects a client for plain
+requests (``request`` / ``_request_impl``), e.g. ``get_fee(manager)``.
+Stream consumers register a handler with ``add_stream_handler``; it is told
+about every (re)connect, so it can re-subscribe, and receives every stream
+message (anything that is not a response to a request).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from websockets.exceptions import ConnectionClosed
+from xrpl.asyncio.clients import AsyncWebsocketClient
+from xrpl.models import ServerInfo
+from xrpl.models.requests.request import Request
+from xrpl.models.response import Response
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+XRPL_WSS_URLS = [
+    url.strip()
+    for url in os.getenv("XRPL_WSS", "wss://s.altnet.rippletest.net:51233").split(",")
+    if url.strip()
+]
+XRPL_REQUEST_TIMEOUT = float(os.getenv("XRPL_REQUEST_TIMEOUT_SEC", "10"))
+XRPL_HEALTH_INTERVAL = float(os.getenv("XRPL_HEALTH_INTERVAL_SEC", "30"))
+XRPL_MAX_BACKOFF = 30.0
+# Consecutive request timeouts after which the health probe runs immediately
+XRPL_PROBE_AFTER_TIMEOUTS = int(os.getenv("XRPL_PROBE_AFTER_TIMEOUTS", "3"))
+
+class XRPLConnectionManager:
+    """Supervised websocket connection with endpoint failover"""
+
+    def __init__(
+        self,
+        urls: List[str],
+        request_timeout: float = XRPL_REQUEST_TIMEOUT,
+        health_interval: float = XRPL_HEALTH_INTERVAL
+    ):
+        """
+        Initialize the manager (the connection opens with start())
+
+        Args:
+            urls: Websocket endpoints, in order of preference
+            request_timeout: Seconds to wait for a connection or a response
+            health_interval: Seconds between server_info health probes
+        """
+        if not urls:
+            raise ValueError("At least one XRPL endpoint is required")
+        self.urls = urls
+        self.request_timeout = request_timeout
+        self.health_interval = health_interval
+        self.url: Optional[str] = None
+        self._client: Optional[AsyncWebsocketClient] = None
+        self._connected: Optional[asyncio.Event] = None
+        self._broken: Optional[asyncio.Event] = None
+        self._probe: Optional[asyncio.Event] = None
+        self._timeouts = 0  # Consecutive request timeouts
+        self._task: Optional[asyncio.Task] = None
+        self._handlers: List[Any] = []
+        self._stats: Dict[str, Any] = {
+            "connects": 0,
+            "failures": 0,
+            "requests": 0,
+            "request_errors": 0,
+            "request_timeouts": 0,
+            "connected_since": None,
+            "last_error": None,
+        }
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None and self._client.is_open()
+
+    def add_stream_handler(self, handler: Any) -> None:
+        """
+        Register a stream consumer
+
+        *handler* provides ``async on_connect(client)`` (called after every
+        connect, before stream messages are delivered; raising drops the
+        connection), ``on_message(message)`` and ``on_disconnect()``.
+        """
+        self._handlers.append(handler)
+
+    def remove_stream_handler(self, handler: Any) -> None:
+        if handler in self._handlers:
+            self._handlers.remove(handler)
+
+    async def start(self) -> None:
+        """Start the supervisor task (returns without waiting for the connection)"""
+        if self._task is None or self._task.done():
+            self._connected = asyncio.Event()
+            self._broken = asyncio.Event()
+            self._probe = asyncio.Event()
+            self._task = asyncio.ensure_future(self._supervise())
+
+    async def stop(self) -> None:
+        """Stop the supervisor and close the socket"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _supervise(self) -> None:
+        index, failed = 0, 0
+        while True:
+            url = self.urls[index % len(self.urls)]
+            client = AsyncWebsocketClient(url)
+            try:
+                await asyncio.wait_for(client.open(), self.request_timeout)
+                self._client, self.url = client, url
+                self._stats["connects"] += 1
+                self._stats["connected_since"] = time.time()
+                metrics.incr("xrpl.connects")
+                logger.info(f"Connected to XRPL node {url}")
+                self._broken.clear()
+                self._probe.clear()
+                self._timeouts = 0
+                self._connected.set()
+                failed = 0
+                for handler in list(self._handlers):
+                    await handler.on_connect(client)
+                pump = asyncio.ensure_future(self._pump(client))
+                try:
+                    await self._monitor(client)
+                finally:
+                    pump.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["failures"] += 1
+                self._stats["last_error"] = f"{url}: {e}"
+                metrics.incr("xrpl.connection_failures")
+                logger.warning(f"XRPL connection to {url} failed: {e}")
+            finally:
+                self._connected.clear()
+                self._client = None
+                self._stats["connected_since"] = None
+                for handler in list(self._handlers):
+                    handler.on_disconnect()
+                if client.is_open():
+                    await client.close()
+
+            # Fail over to the next endpoint; back off once every one has been tried
+            index += 1
+            failed += 1
+            if failed % len(self.urls) == 0:
+                await asyncio.sleep(min(XRPL_MAX_BACKOFF, 2 ** (failed // len(self.urls))))
+
+    async def _monitor(self, client: AsyncWebsocketClient) -> None:
+        """Return when the socket closes, a request reports it broken or a probe fails"""
+        while client.is_open():
+            waiters = [asyncio.ensure_future(self._broken.wait()), asyncio.ensure_future(self._probe.wait())]
+            try:
+                await asyncio.wait(waiters, timeout=self.health_interval, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for waiter in waiters:
+                    waiter.cancel()
+            if self._broken.is_set():
+                raise ConnectionError("request failure")
+            self._probe.clear()
+            started = time.perf_counter()
+            response = await asyncio.wait_for(client.request(ServerInfo()), self.request_timeout)
+            if not response.is_successful():
+                raise ConnectionError(f"server_info failed: {response.result}")
+            metrics.observe("xrpl.health_probe_ms", (time.perf_counter() - started) * 1000)
+        raise ConnectionError("socket closed")
+
+    async def _pump(self, client: AsyncWebsocketClient) -> None:
+        """Deliver stream messages to the handlers"""
+        async for message in client:
+            for handler in list(self._handlers):
+                try:
+                    handler.on_message(message)
+                except Exception as e:
+                    logger.warning(f"Stream handler failed on {message.get('type')}: {e}")
+
+    async def client(self) -> AsyncWebsocketClient:
+        """The open client, waiting up to the request timeout for a (re)connect"""
+        if self._task is None:
+            await self.start()
+        if not self.connected:
+            await asyncio.wait_for(self._connected.wait(), self.request_timeout)
+        return self._client
+
+    async def request(self, request: Request) -> Response:
+        """Send *request* over the shared socket"""
+        client = await self.client()
+        started = time.perf_counter()
+        self._stats["requests"] += 1
+        try:
+            response = await asyncio.wait_for(client.request(request), self.request_timeout)
+        except asyncio.TimeoutError:
+            # A slow node or a dead socket: only this request fails, the probe decides which
+            self._stats["request_timeouts"] += 1
+            metrics.incr("xrpl.request_timeouts")
+            self._timeouts += 1
+            if self._timeouts >= XRPL_PROBE_AFTER_TIMEOUTS and self._probe is not None:
+                self._timeouts = 0
+                self._probe.set()
+            raise
+        except Exception as e:
+            self._stats["request_errors"] += 1
+            metrics.incr("xrpl.request_errors")
+            if isinstance(e, (ConnectionClosed, ConnectionError, OSError)) or not client.is_open():
+                self.mark_broken()
+            raise
+        self._timeouts = 0
+        metrics.observe("xrpl.request_ms", (time.perf_counter() - started) * 1000)
+        return response
+
+    def mark_broken(self) -> None:
+        """Ask the supervisor to drop and re-establish the connection"""
+        if self._broken is not None:
+            self._broken.set()
+
+    # xrpl-py helpers (get_fee, ledger utilities) call this on their client
+    _request_impl = request
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "connected": self.connected,
+            "url": self.url,
+            "endpoints": self.urls,
+            **self._stats,
+        }
+
+# Process-wide connection shared by the oracle and ledger reads
+xrpl_connection = XRPLConnectionManager(XRPL_WSS_URLS)
@@ -0,0 +1,167 @@
+"""
+MPT holdings cache keyed by validated ledger index
+
+A holding (account, issuance) is the account's MPToken ledger entry.  Entries
+are read pinned to a validated ledger index and cached with it; a cached
+entry is served as long as no newer ledger has been validated, so repeated
+reads within one ledger (about 4 seconds) cost no node traffic.  Misses of a
+batch are fetched concurrently over the shared connection.
+
+While a ledger stream (services/xrpl/ledger_stream.py) delivers every change
+to an issuance without gaps, its entries stay valid across ledgers: the
+stream applies each change as it validates and advances the ledger index,
+so reads need no node traffic at all.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+from xrpl.models import Ledger, LedgerEntry
+from xrpl.models.requests.ledger_entry import MPToken
+
+from services.xrpl.connection import XRPLConnectionManager
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Seconds the latest validated ledger index is reused before asking the node again
+LEDGER_INDEX_TTL = float(os.getenv("HOLDINGS_LEDGER_TTL_SEC", "1"))
+HOLDINGS_CACHE_SIZE = int(os.getenv("HOLDINGS_CACHE_SIZE", "100000"))
+HOLDINGS_READ_CONCURRENCY = int(os.getenv("HOLDINGS_READ_CONCURRENCY", "32"))
+
+Key = Tuple[str, str]  # (account, issuance ID)
+
+def _key(account: str, issuance: str) -> Key:
+    # Issuance IDs are hex: callers may use either case, the ledger uses upper
+    return account, issuance.upper()
+
+class HoldingsCache:
+    """MPToken entries per (account, issuance), valid for the ledger they were read at"""
+
+    def __init__(self, connection: XRPLConnectionManager, size: int = HOLDINGS_CACHE_SIZE):
+        self.connection = connection
+        self.size = size
+        # Key -> (ledger index, MPToken node or None when the holder has none)
+        self._entries: "OrderedDict[Key, Tuple[int, Optional[Dict[str, Any]]]]" = OrderedDict()
+        self._ledger: Optional[int] = None
+        self._ledger_checked = 0.0
+        self._ledger_task: Optional[asyncio.Task] = None
+        # Issuances whose every change after _continuous_from is applied by a stream
+        self._streamed: Set[str] = set()
+        self._continuous_from: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def _fetch_ledger(self) -> int:
+        response = await self.connection.request(Ledger(ledger_index="validated"))
+        if not response.is_successful():
+            raise RuntimeError(f"ledger failed: {response.result}")
+        return int(response.result["ledger_index"])
+
+    @property
+    def streaming(self) -> bool:
+        return self._continuous_from is not None
+
+    def stream_synced(self, since: int, issuances: Set[str]) -> None:
+        """
+        A stream applies every change to *issuances* in ledgers after *since*
+
+        Entries read at *since* or later stay valid until the stream updates them.
+        """
+        self._streamed = {issuance.upper() for issuance in issuances}
+        self._continuous_from = since
+        self.advance(since)
+
+    def stream_lost(self) -> None:
+        """The stream stopped or missed ledgers; fall back to per-ledger validity"""
+        self._continuous_from = None
+
+    async def validated_ledger(self) -> int:
+        """Latest validated ledger index (re-read at most every LEDGER_INDEX_TTL, single-flight)"""
+        if self._ledger is not None and (
+            self.streaming or time.monotonic() - self._ledger_checked < LEDGER_INDEX_TTL
+        ):
+            return self._ledger
+        if self._ledger_task is None or self._ledger_task.done():
+            self._ledger_task = asyncio.ensure_future(self._fetch_ledger())
+        ledger = await asyncio.shield(self._ledger_task)
+        self.advance(ledger)
+        return self._ledger
+
+    def advance(self, ledger: int) -> None:
+        """Record that *ledger* is validated (cached entries from older ledgers become stale)"""
+        if self._ledger is None or ledger >= self._ledger:
+            self._ledger = ledger
+            self._ledger_checked = time.monotonic()
+
+    def update(self, account: str, issuance: str, node: Optional[Dict[str, Any]], ledger: int) -> None:
+        """Store an entry as of *ledger* (ignored if a newer one is cached)"""
+        key = _key(account, issuance)
+        cached = self._entries.get(key)
+        if cached is not None and cached[0] > ledger:
+            return
+        self._entries[key] = (ledger, node)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def cached(self, account: str, issuance: str, ledger: int) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """(hit, node) for an entry valid at *ledger*"""
+        key = _key(account, issuance)
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        streamed = self.streaming and key[1] in self._streamed and entry[0] >= self._continuous_from
+        if entry[0] < ledger and not streamed:
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry[1]
+
+    async def _read(self, account: str, issuance: str, ledger: int) -> Optional[Dict[str, Any]]:
+        response = await self.connection.request(LedgerEntry(
+            mptoken=MPToken(mpt_issuance_id=issuance, account=account), ledger_index=ledger
+        ))
+        if response.is_successful():
+            return response.result.get("node")
+        if response.result.get("error") == "entryNotFound":
+            return None
+        raise RuntimeError(response.result.get("error_message") or response.result.get("error"))
+
+    async def get_many(self, keys: List[Key]) -> Tuple[int, Dict[Key, Any]]:
+        """
+        Holdings for many (account, issuance) pairs as of the latest validated ledger
+
+        Returns:
+            The ledger index and, per key (as given; issuance IDs match in
+            either case), the MPToken node, None when the account holds no
+            MPToken for the issuance, or the lookup's exception
+        """
+        ledger = await self.validated_ledger()
+        results: Dict[Key, Any] = {}
+        misses: List[Key] = []
+        for key in dict.fromkeys(_key(*key) for key in keys):
+            hit, node = self.cached(key[0], key[1], ledger)
+            if hit:
+                results[key] = node
+            else:
+                misses.append(key)
+        metrics.incr("holdings.cache_hits", len(results))
+        metrics.incr("holdings.cache_misses", len(misses))
+
+        limit = asyncio.Semaphore(HOLDINGS_READ_CONCURRENCY)
+
+        async def fetch(key: Key) -> Optional[Dict[str, Any]]:
+            async with limit:
+                return await self._read(key[0], key[1], ledger)
+
+        nodes = await asyncio.gather(*(fetch(key) for key in misses), return_exceptions=True)
+        for key, node in zip(misses, nodes):
+            if not isinstance(node, Exception):
+                self.update(key[0], key[1], node, ledger)
+            results[key] = node
+        return ledger, {key: results[_key(*key)] for key in keys}
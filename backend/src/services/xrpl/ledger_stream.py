@@ -0,0 +1,245 @@
+"""
+Ledger-stream consumer keeping the holdings and offers caches current
+
+Subscribes, over the shared XRPL connection, to the ``ledger`` stream plus
+either the ``transactions`` stream (when issuances are tracked: holder to
+holder transfers do not touch the issuer's account) or the ``accounts``
+stream of the tracked accounts.  Every validated transaction's AffectedNodes
+are applied to
+
+* the ``HoldingsCache``: MPToken entries of tracked issuances, and
+* an offers cache: the live DEX offers of tracked accounts,
+
+so reads are local lookups.  A ledger is considered complete once the next
+one closes, so served data lags the newest validated ledger by at most one.
+
+Continuity is checked by ledger index.  On every (re)connect the offers are
+reloaded at the subscription's ledger and the holdings cache restarts its
+continuous window there, unless no ledger was missed; a gap in ``ledgerClosed``
+indexes while connected is handled the same way.
+"""
+
+import asyncio
+import logging
+import os
+from typing import List, Dict, Any, Optional, Set
+
+from xrpl.asyncio.clients import AsyncWebsocketClient
+from xrpl.models import AccountOffers, Subscribe
+from xrpl.models.requests.subscribe import StreamParameter
+
+from services.xrpl.connection import XRPLConnectionManager
+from services.xrpl.holdings_cache import HoldingsCache
+from services.xrpl.mpt_service import mpt_service
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+def _env_list(name: str, default: str = "") -> List[str]:
+    return [item.strip() for item in os.getenv(name, default).split(",") if item.strip()]
+
+# Accounts whose offers are cached (default: the GRASS issuer / oracle account)
+LEDGER_STREAM_ACCOUNTS = _env_list("LEDGER_STREAM_ACCOUNTS", os.getenv("ISSUER_ADDRESS", ""))
+# MPT issuances whose holdings are kept current
+LEDGER_STREAM_ISSUANCES = _env_list("LEDGER_STREAM_ISSUANCES")
+LEDGER_STREAM_ENABLED = os.getenv("LEDGER_STREAM_ENABLED", "true").lower() != "false"
+
+def _offer_from_ledger(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Ledger Offer fields in account_offers format"""
+    return {
+        "seq": int(fields["Sequence"]),
+        "flags": int(fields.get("Flags", 0)),
+        "taker_gets": fields.get("TakerGets"),
+        "taker_pays": fields.get("TakerPays"),
+    }
+
+async def fetch_account_offers(client: Any, account: str, ledger_index: Any = "validated") -> Dict[int, Dict[str, Any]]:
+    """All offers of *account* (paging through account_offers), by sequence"""
+    offers: Dict[int, Dict[str, Any]] = {}
+    marker: Optional[Any] = None
+    while True:
+        response = await client.request(AccountOffers(
+            account=account, ledger_index=ledger_index, limit=400, marker=marker
+        ))
+        if not response.is_successful():
+            raise RuntimeError(f"account_offers failed: {response.result}")
+        for offer in response.result.get("offers", []):
+            offers[int(offer["seq"])] = offer
+        marker = response.result.get("marker")
+        if not marker:
+            return offers
+
+class LedgerStreamCache:
+    """Applies validated transactions from the ledger stream to the caches"""
+
+    def __init__(
+        self,
+        connection: XRPLConnectionManager,
+        holdings: HoldingsCache,
+        accounts: Optional[List[str]] = None,
+        issuances: Optional[List[str]] = None
+    ):
+        """
+        Initialize the consumer (it subscribes once started)
+
+        Args:
+            connection: Shared XRPL connection
+            holdings: Cache receiving MPToken updates
+            accounts: Accounts whose offers are cached
+            issuances: MPT issuance IDs whose holdings are kept current
+        """
+        self.connection = connection
+        self.holdings = holdings
+        self.accounts: Set[str] = set(accounts or [])
+        self.issuances: Set[str] = {i.upper() for i in issuances or []}
+        self.offers: Dict[str, Dict[int, Dict[str, Any]]] = {a: {} for a in self.accounts}
+        self.ledger: Optional[int] = None  # Newest complete ledger
+        self.synced = False
+        self._closing: Optional[int] = None  # Ledger closed, transactions still arriving
+        self._synced_since: Optional[int] = None  # Start of the continuous window
+        self._started = False
+        self._resync_task: Optional[asyncio.Task] = None
+        # Messages held back while a resync snapshot is being loaded
+        self._buffer: Optional[List[Dict[str, Any]]] = None
+        self._stats = {"transactions": 0, "holding_updates": 0, "offer_updates": 0, "resyncs": 0, "gaps": 0}
+
+    def start(self) -> None:
+        if not self._started:
+            self.connection.add_stream_handler(self)
+            self._started = True
+
+    def stop(self) -> None:
+        if self._started:
+            self.connection.remove_stream_handler(self)
+            self._started = False
+            self.on_disconnect()
+
+    # Connection handler interface
+
+    async def on_connect(self, client: AsyncWebsocketClient) -> None:
+        streams = [StreamParameter.LEDGER]
+        if self.issuances:
+            streams.append(StreamParameter.TRANSACTIONS)
+        response = await client.request(Subscribe(
+            streams=streams,
+            accounts=sorted(self.accounts) if self.accounts and not self.issuances else None
+        ))
+        if not response.is_successful():
+            raise RuntimeError(f"subscribe failed: {response.result}")
+        ledger = int(response.result["ledger_index"])
+
+        if self.ledger is not None and ledger == self.ledger and self._closing is None:
+            # Nothing was missed: the continuous window carries on
+            logger.info(f"Ledger stream resumed at {ledger} without a gap")
+            self.holdings.stream_synced(self._synced_since, self.issuances)
+        else:
+            await self._resync(client, ledger)
+        self._closing = None
+        self.synced = True
+
+    def on_disconnect(self) -> None:
+        self.synced = False
+        self.holdings.stream_lost()
+        if self._resync_task is not None and not self._resync_task.done():
+            self._resync_task.cancel()
+        self._buffer = None
+
+    def on_message(self, message: Dict[str, Any]) -> None:
+        if self._buffer is not None:
+            self._buffer.append(message)
+            return
+        kind = message.get("type")
+        if kind == "ledgerClosed":
+            self._ledger_closed(int(message["ledger_index"]))
+        elif kind == "transaction" and message.get("validated"):
+            self._apply(message)
+
+    # Stream processing
+
+    async def _resync(self, client: Any, ledger: int) -> None:
+        """Reload offers at *ledger* and restart the holdings window there"""
+        self._stats["resyncs"] += 1
+        metrics.incr("ledger_stream.resyncs")
+        for account in self.accounts:
+            self.offers[account] = await fetch_account_offers(client, account, ledger)
+        self.ledger = ledger
+        self._synced_since = ledger
+        self.holdings.stream_synced(ledger, self.issuances)
+        logger.info(f"Ledger stream synced at {ledger}: {sum(map(len, self.offers.values()))} offers")
+
+    async def _resync_live(self, ledger: int) -> None:
+        """Resync after a gap at *ledger* while connected, then replay buffered messages"""
+        try:
+            await self._resync(self.connection, ledger - 1)
+        except Exception as e:
+            logger.warning(f"Ledger stream resync failed: {e}")
+            self._buffer = None
+            self.connection.mark_broken()  # Reconnect, which resyncs again
+            return
+        self._closing = ledger
+        self.synced = True
+        buffered, self._buffer = self._buffer or [], None
+        for message in buffered:
+            self.on_message(message)
+
+    def _ledger_closed(self, ledger: int) -> None:
+        previous = self._closing if self._closing is not None else self.ledger
+        if previous is not None and ledger > previous + 1:
+            # Ledgers were skipped: their transactions are lost
+            self._stats["gaps"] += 1
+            metrics.incr("ledger_stream.gaps")
+            logger.warning(f"Ledger stream gap: {previous} -> {ledger}; resyncing")
+            self.holdings.stream_lost()
+            self.synced = False
+            self._buffer = []
+            self._resync_task = asyncio.ensure_future(self._resync_live(ledger))
+            return
+        if self._closing is not None:
+            # The previous ledger's transactions have all been delivered
+            self.ledger = self._closing
+            self.holdings.advance(self._closing)
+        self._closing = ledger
+
+    def _apply(self, message: Dict[str, Any]) -> None:
+        ledger = int(message["ledger_index"])
+        self._stats["transactions"] += 1
+        for affected in message.get("meta", {}).get("AffectedNodes", []):
+            kind, node = next(iter(affected.items()))
+            entry_type = node.get("LedgerEntryType")
+            fields = node.get("NewFields") or node.get("FinalFields") or {}
+            if entry_type == "MPToken":
+                issuance = str(fields.get("MPTokenIssuanceID", "")).upper()
+                if issuance in self.issuances and "Account" in fields:
+                    entry = None if kind == "DeletedNode" else dict(fields, LedgerEntryType="MPToken")
+                    self.holdings.update(fields["Account"], issuance, entry, ledger)
+                    self._stats["holding_updates"] += 1
+            elif entry_type == "Offer" and fields.get("Account") in self.offers:
+                offers = self.offers[fields["Account"]]
+                if kind == "DeletedNode":
+                    offers.pop(int(fields["Sequence"]), None)
+                else:
+                    offers[int(fields["Sequence"])] = _offer_from_ledger(fields)
+                self._stats["offer_updates"] += 1
+
+    # Reads
+
+    def account_offers(self, account: str) -> Optional[List[Dict[str, Any]]]:
+        """Live offers of a tracked account, or None if not tracked or not synced"""
+        if not self.synced or account not in self.offers:
+            return None
+        return sorted(self.offers[account].values(), key=lambda o: o["seq"])
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "enabled": self._started,
+            "synced": self.synced,
+            "ledger_index": self.ledger,
+            "accounts": sorted(self.accounts),
+            "issuances": sorted(self.issuances),
+            **self._stats,
+        }
+
+# Process-wide consumer feeding mpt_service's holdings cache
+ledger_stream = LedgerStreamCache(
+    mpt_service.connection, mpt_service.holdings, LEDGER_STREAM_ACCOUNTS, LEDGER_STREAM_ISSUANCES
+)
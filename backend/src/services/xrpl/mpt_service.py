@@ -0,0 +1,351 @@
+"""
+Native MPT (Multi-Purpose Token) operations on the shared XRPL connection
+
+In-process counterpart of the Node TokenizationService: the same four
+operations used by token_api, built with xrpl-py models and submitted
+through ``SubmissionEngine`` over ``xrpl_connection``.  Results mirror the
+Node bridge's JSON so callers can use either path.
+
+Requires an xrpl-py release with MPT support (4.x); importing this module
+raises ImportError on older releases.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from typing import List, Dict, Any, Optional, Tuple
+
+from xrpl.core.addresscodec import decode_classic_address
+from xrpl.models import LedgerEntry, MPTAmount, MPTokenAuthorize, MPTokenIssuanceCreate, Payment
+from xrpl.models.requests.ledger_entry import MPToken
+from xrpl.models.transactions.transaction import Transaction
+from xrpl.utils import str_to_hex
+from xrpl.wallet import Wallet
+
+from services.xrpl.connection import XRPLConnectionManager, xrpl_connection
+from services.xrpl.holdings_cache import HoldingsCache
+from services.xrpl.submission import SubmissionEngine, SubmissionError, SubmissionResult, TicketPool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAXIMUM_AMOUNT = "100000000"
+
+# Tickets kept ready per issuer for batch submissions
+MPT_TICKET_POOL_SIZE = int(os.getenv("MPT_TICKET_POOL_SIZE", "50"))
+# Ticketed transactions per submit_batch; one TicketCreate may create at most 250
+MPT_BATCH_CHUNK = 200
+# Extra attempts for batch transactions that failed transiently
+MPT_BATCH_RETRIES = int(os.getenv("MPT_BATCH_RETRIES", "2"))
+# Ledger reads in flight at once during batch operations
+MPT_READ_CONCURRENCY = int(os.getenv("MPT_READ_CONCURRENCY", "32"))
+
+# MPToken ledger entry flag set once the issuer has authorized the holder
+LSF_MPT_AUTHORIZED = 0x00000002
+
+def issuance_id(issuer: str, sequence: int) -> str:
+    """MPTokenIssuanceID: the creating transaction's sequence (uint32) followed by the issuer's AccountID"""
+    return (sequence.to_bytes(4, "big") + decode_classic_address(issuer)).hex().upper()
+
+def _retryable(result: SubmissionResult) -> bool:
+    # Only transactions known never to have applied are re-signed: final tel/tef
+    # rejections, expiry past LastLedgerSequence, or never submitted.  Validated
+    # (tes/tec), malformed (tem) and unresolved ("unknown") results are kept.
+    code = result.engine_result
+    return not result.validated and code != "tefALREADY" and (
+        code == "expired" or code.startswith(("tel", "tef", "notSubmitted"))
+    )
+
+class MPTService:
+    """MPT issuance, authorization, minting and holdings lookups"""
+
+    def __init__(self, connection: XRPLConnectionManager = xrpl_connection):
+        self.connection = connection
+        # One engine per signing account, so its local sequence counter is reused
+        self._engines: Dict[str, SubmissionEngine] = {}
+        self.holdings = HoldingsCache(connection)
+
+    def engine(self, wallet: Wallet) -> SubmissionEngine:
+        engine = self._engines.get(wallet.address)
+        if engine is None:
+            engine = self._engines[wallet.address] = SubmissionEngine(
+                self.connection, wallet, TicketPool(MPT_TICKET_POOL_SIZE)
+            )
+        return engine
+
+    async def _submit(self, wallet: Wallet, tx: Transaction) -> SubmissionResult:
+        result = (await self.engine(wallet).submit_batch([tx]))[0]
+        if result.engine_result != "tesSUCCESS":
+            raise RuntimeError(f"{tx.transaction_type} failed: {result.engine_result}")
+        return result
+
+    async def submit_independent(
+        self,
+        wallet: Wallet,
+        transactions: List[Transaction],
+        retries: int = MPT_BATCH_RETRIES
+    ) -> List[Tuple[SubmissionResult, int]]:
+        """
+        Submit transactions that do not depend on each other on Tickets
+
+        Chunks of up to MPT_BATCH_CHUNK are submitted concurrently; those known
+        not to have applied (rejected with tef/tel, or expired past their
+        LastLedgerSequence) are re-signed on fresh Tickets up to *retries*
+        more times.  ``ter`` results and connection errors are followed by the
+        engine until they resolve, so a payment is never signed twice while
+        its first signature could still validate.
+
+        Returns:
+            Per transaction, in order: the last SubmissionResult and the number of attempts
+        """
+        engine = self.engine(wallet)
+        results: List[Optional[SubmissionResult]] = [None] * len(transactions)
+        attempts = [0] * len(transactions)
+        pending = list(range(len(transactions)))
+        for _ in range(retries + 1):
+            for offset in range(0, len(pending), MPT_BATCH_CHUNK):
+                chunk = pending[offset:offset + MPT_BATCH_CHUNK]
+                try:
+                    outcome = await engine.submit_batch([transactions[i] for i in chunk], use_tickets=True)
+                except SubmissionError as e:
+                    outcome = e.results
+                except Exception as e:
+                    # Raised before anything was submitted (see submit_batch)
+                    logger.warning(f"Batch chunk of {len(chunk)} failed: {e}")
+                    outcome = [SubmissionResult("", 0, f"notSubmitted: {e}", 0, False)] * len(chunk)
+                for i, result in zip(chunk, outcome):
+                    results[i] = result
+                    attempts[i] += 1
+            pending = [i for i in pending if _retryable(results[i])]
+            if not pending:
+                break
+        return list(zip(results, attempts))
+
+    async def create_issuance(
+        self,
+        wallet: Wallet,
+        maximum_amount: Optional[str] = None,
+        metadata: Optional[str] = None,
+        asset_scale: int = 0,
+        transfer_fee: int = 0,
+        flags: int = 0
+    ) -> str:
+        """
+        Create an MPTokenIssuance
+
+        Returns:
+            The new MPTokenIssuanceID (hex)
+        """
+        tx = MPTokenIssuanceCreate(
+            account=wallet.address,
+            maximum_amount=str(maximum_amount) if maximum_amount is not None else None,
+            mptoken_metadata=str_to_hex(metadata) if metadata else None,
+            asset_scale=asset_scale,
+            transfer_fee=transfer_fee or None,  # Only allowed together with tfMPTCanTransfer
+            flags=flags
+        )
+        result = await self._submit(wallet, tx)
+        return issuance_id(wallet.address, result.sequence)
+
+    async def create_green_asset_token(self, token_data: Dict[str, Any], wallet: Wallet) -> Dict[str, Any]:
+        """Create an issuance carrying the project metadata (see TokenizationService.createGreenAssetToken)"""
+        metadata = json.dumps({
+            "name": token_data.get("name"),
+            "description": token_data.get("description"),
+            "company": token_data.get("company"),
+            "projectId": token_data.get("projectId") or "",
+            "sdgs": token_data.get("sdgs"),
+            "verificationScore": token_data.get("verificationScore"),
+            "tokenPrice": token_data.get("tokenPrice") or 1
+        }, separators=(",", ":"))
+        maximum_amount = token_data.get("maximumAmount") or DEFAULT_MAXIMUM_AMOUNT
+        issuance = await self.create_issuance(
+            wallet,
+            maximum_amount=maximum_amount,
+            metadata=metadata,
+            asset_scale=token_data.get("assetScale") or 0,
+            transfer_fee=token_data.get("transferFee") or 0
+        )
+        return {
+            "success": True,
+            "issuanceID": issuance,
+            "issuerWallet": wallet.address,
+            "totalSupply": float(maximum_amount),
+            "availableSupply": float(maximum_amount),
+            "projectId": token_data.get("projectId") or "",
+            "tokenPrice": token_data.get("tokenPrice") or 1
+        }
+
+    async def authorize_holder(self, issuer: Wallet, holder_address: str, issuance: str) -> Dict[str, Any]:
+        """Authorize *holder_address* to hold the issuance (for tfMPTRequireAuth issuances)"""
+        result = await self._submit(issuer, MPTokenAuthorize(
+            account=issuer.address, holder=holder_address, mptoken_issuance_id=issuance
+        ))
+        return {"success": True, "hash": result.hash, "engine_result": result.engine_result}
+
+    async def mint_to_holder(self, issuer: Wallet, holder_address: str, issuance: str, amount: Any) -> Dict[str, Any]:
+        """Send *amount* of the issuance from the issuer to *holder_address*"""
+        result = await self._submit(issuer, Payment(
+            account=issuer.address,
+            destination=holder_address,
+            amount=MPTAmount(mpt_issuance_id=issuance, value=str(amount))
+        ))
+        return {"success": True, "hash": result.hash, "engine_result": result.engine_result}
+
+    async def mint_batch(
+        self,
+        issuer: Wallet,
+        issuance: str,
+        payments: List[Tuple[str, Any]],
+        retries: int = MPT_BATCH_RETRIES
+    ) -> List[Dict[str, Any]]:
+        """
+        Mint to many holders at once (see submit_independent)
+
+        Args:
+            issuer: Issuer wallet
+            issuance: MPTokenIssuanceID
+            payments: (holder address, amount) pairs
+            retries: Extra attempts for transiently failed payments
+
+        Returns:
+            One report per payment, in order
+        """
+        transactions = [
+            Payment(
+                account=issuer.address,
+                destination=holder,
+                amount=MPTAmount(mpt_issuance_id=issuance, value=str(amount))
+            )
+            for holder, amount in payments
+        ]
+        outcome = await self.submit_independent(issuer, transactions, retries)
+        return [
+            {
+                "holder_address": holder,
+                "amount": amount,
+                "success": result.validated and result.engine_result == "tesSUCCESS",
+                "engine_result": result.engine_result,
+                "hash": result.hash or None,
+                "attempts": attempts,
+            }
+            for (holder, amount), (result, attempts) in zip(payments, outcome)
+        ]
+
+    async def holder_flags(self, issuance: str, holders: List[str]) -> Dict[str, Any]:
+        """
+        Read the MPToken entry flags of many holders concurrently
+
+        Returns:
+            Holder -> Flags, None when the holder has no MPToken (has not opted
+            in), or the exception raised by the lookup
+        """
+        limit = asyncio.Semaphore(MPT_READ_CONCURRENCY)
+
+        async def lookup(holder: str) -> Optional[int]:
+            async with limit:
+                response = await self.connection.request(LedgerEntry(
+                    mptoken=MPToken(mpt_issuance_id=issuance, account=holder), ledger_index="validated"
+                ))
+            if response.is_successful():
+                return int(response.result.get("node", {}).get("Flags", 0))
+            if response.result.get("error") == "entryNotFound":
+                return None
+            raise RuntimeError(response.result.get("error_message") or response.result.get("error"))
+
+        flags = await asyncio.gather(*(lookup(h) for h in holders), return_exceptions=True)
+        return dict(zip(holders, flags))
+
+    async def authorize_batch(
+        self,
+        issuer: Wallet,
+        issuance: str,
+        holders: List[str],
+        retries: int = MPT_BATCH_RETRIES
+    ) -> List[Dict[str, Any]]:
+        """
+        Authorize many holders at once, skipping those that need no transaction
+
+        Duplicates are dropped, then every holder's MPToken entry is read:
+        holders already authorized and holders without an MPToken (the
+        authorization would fail with a fee) are reported without submitting.
+        The rest are authorized concurrently on Tickets (see submit_independent).
+
+        Returns:
+            One report per distinct holder, in first-seen order, with status
+            authorized, already_authorized, not_opted_in or failed
+        """
+        unique = list(dict.fromkeys(holders))
+        flags = await self.holder_flags(issuance, unique)
+
+        reports: Dict[str, Dict[str, Any]] = {}
+        pending: List[str] = []
+        for holder in unique:
+            state = flags[holder]
+            if isinstance(state, Exception):
+                reports[holder] = {"status": "failed", "message": f"Ledger lookup failed: {state}"}
+            elif state is None:
+                reports[holder] = {"status": "not_opted_in", "message": "Holder has no MPToken for this issuance"}
+            elif state & LSF_MPT_AUTHORIZED:
+                reports[holder] = {"status": "already_authorized"}
+            else:
+                pending.append(holder)
+
+        outcome = await self.submit_independent(issuer, [
+            MPTokenAuthorize(account=issuer.address, holder=holder, mptoken_issuance_id=issuance)
+            for holder in pending
+        ], retries)
+        for holder, (result, attempts) in zip(pending, outcome):
+            success = result.validated and result.engine_result == "tesSUCCESS"
+            reports[holder] = {
+                "status": "authorized" if success else "failed",
+                "engine_result": result.engine_result,
+                "hash": result.hash or None,
+                "attempts": attempts,
+            }
+        return [{"holder_address": holder, **reports[holder]} for holder in unique]
+
+    async def get_holdings(self, account: str, issuance: Optional[str] = None) -> Dict[str, Any]:
+        """The account's MPToken ledger entry for *issuance* (or the MPToken object ID *account*)"""
+        if issuance:
+            ledger, nodes = await self.holdings.get_many([(account, issuance)])
+            node = nodes[(account, issuance)]
+            if isinstance(node, Exception):
+                return {"success": False, "error": str(node)}
+            if node is None:
+                return {"success": False, "error": "entryNotFound"}
+            return {"success": True, "result": {"node": node, "ledger_index": ledger, "validated": True}}
+
+        response = await self.connection.request(LedgerEntry(
+            mptoken=account
+        ))
+        if not response.is_successful():
+            return {"success": False, "error": response.result.get("error_message") or response.result.get("error")}
+        return {"success": True, "result": response.result}
+
+    async def call(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run a bridge-style call (same method names and params as execute_js_bridge)
+
+        Returns:
+            The operation's result, or {"success": False, "error": ...}
+        """
+        try:
+            if method == "createGreenAssetToken":
+                return await self.create_green_asset_token(params["tokenData"], Wallet.from_seed(params["walletSeed"]))
+            if method == "authorizeHolder":
+                return await self.authorize_holder(
+                    Wallet.from_seed(params["issuerSeed"]), params["holderAddress"], params["issuanceID"]
+                )
+            if method == "mintToHolder":
+                return await self.mint_to_holder(
+                    Wallet.from_seed(params["issuerSeed"]), params["holderAddress"], params["issuanceID"], params["amount"]
+                )
+            if method == "getHoldings":
+                return await self.get_holdings(params["account"], params.get("issuanceID"))
+            return {"success": False, "error": f"Unsupported method: {method}"}
+        except Exception as e:
+            logger.warning(f"MPT {method} failed: {e}")
+            return {"success": False, "error": str(e)}
+
+mpt_service = MPTService()
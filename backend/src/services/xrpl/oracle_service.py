@@ -1,48 +1,74 @@
 """XRPL on‑ledger oracle for GRASS/XRP price tied to carbon market USD price.
 
 This service:
-1. Fetches the current **carbon credit price per tonne in USD** from a chosen API.
-2. Fetches current **XRP/USD** price (CoinGecko).
+1. Fetches the current **carbon credit price per tonne in USD** from one or more APIs.
+2. Fetches current **XRP/USD** price from several feeds (CoinGecko, Kraken, Bitstamp).
+   All sources are queried concurrently, each under its own timeout; the
+   price is the median of the quotes left after outlier rejection.
 3. Computes GRASS/XRP midpoint = (carbon_price_usd) / (xrp_price_usd).
 4. Publishes two offers from the *issuer* account on the XRPL DEX:
      • Offer 1 – Sell 1 GRASS for `price_xrp` XRP
      • Offer 2 – Buy 1 GRASS for `price_xrp` XRP
    These back‑to‑back offers act as a price oracle visible on‑chain.
-5. Clears previous oracle offers (identified by Memos tag) before publishing.
+5. Cancels the previous oracle offers in the same batch that posts the new
+   ones; the batch is signed up front and submitted back-to-back (see
+   services/xrpl/submission.py), so one update takes one ledger close.
+6. Only re-publishes when the price moved more than ORACLE_DEVIATION_BPS from
+   the last published price, or ORACLE_HEARTBEAT_MIN has passed; skipped
+   cycles and the ledger fees they saved are recorded in ``publish_stats``.
+7. Talks to the ledger over the process-wide XRPL connection
+   (services/xrpl/connection.py), which reconnects and fails over between
+   XRPL_WSS endpoints on its own.  When the API's ledger stream tracks the
+   issuer account, the live oracle offers are read from its cache.
 
 Environment variables expected:
 ───────────────────────────────
-XRPL_WSS                – wss endpoint (default testnet)
+XRPL_WSS                – wss endpoint(s), comma-separated for failover (default testnet)
 ISSUER_ADDRESS          – issuer/oracle account (same as GRASS issuer)
 ISSUER_SECRET           – secret seed for issuer (ONLY for testnet!)
 CARBON_API_URL          – REST endpoint returning JSON { price_usd: <float> }
 CARBON_API_KEY          – optional API key header/value
 COINGECKO_API_URL       – (optional) override for XRP price feed
+XRP_USD_SOURCES         – (optional) XRP/USD feeds, comma-separated ``name|url|json.path``
+CARBON_USD_SOURCES      – (optional) extra carbon price feeds, same format
+PRICE_SOURCE_TIMEOUT_SEC – per-source deadline (default 5 seconds)
+PRICE_OUTLIER_MAX_DEVIATION – max relative distance from the median (default 0.05)
 ORACLE_MEMO_TAG         – unique identifier (default "GRASS_ORACLE")
 UPDATE_INTERVAL_MIN     – scheduler interval (default 30 minutes)
+ORACLE_DEVIATION_BPS    – re-publish when the price moves this many basis points (default 50)
+ORACLE_HEARTBEAT_MIN    – re-publish at least this often regardless (default 360 minutes)
+ORACLE_USE_TICKETS      – submit from a pool of pre-created Tickets (default false)
+ORACLE_OFFER_RESCAN_CYCLES – updates between full account_offers scans (default 48)
 """
 from __future__ import annotations
 
 import asyncio
 import json
 import os
+import statistics
 import time
-from typing import List, Tuple
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
 
 import aiohttp
 import xrpl
-# Import modified to use available methods
-from xrpl.asyncio.account import get_account_info
-from xrpl.asyncio.clients import AsyncWebsocketClient
-from xrpl.asyncio.transaction import submit_and_wait
-from xrpl.models import OfferCancel, OfferCreate, Memo
+from xrpl.models import AccountOffers, IssuedCurrencyAmount, OfferCancel, OfferCreate, Memo
+from xrpl.models.transactions import OfferCreateFlag
 from xrpl.wallet import Wallet
 
+from services.xrpl.connection import XRPL_WSS_URLS, XRPLConnectionManager, xrpl_connection
+from services.xrpl.submission import SubmissionEngine, SubmissionError, SubmissionResult, TicketPool
+from utils.metrics import metrics
+
+try:
+    from services.xrpl.ledger_stream import ledger_stream
+except ImportError:  # xrpl-py without MPT support: no ledger stream
+    ledger_stream = None
+
 ###############################################################################
 # Config helpers
 ###############################################################################
 
-WSS = os.getenv("XRPL_WSS", "wss://s.altnet.rippletest.net:51233")
+WSS = XRPL_WSS_URLS[0]
 ISSUER_ADDRESS = os.getenv("ISSUER_ADDRESS")
 ISSUER_SECRET = os.getenv("ISSUER_SECRET")
 if not ISSUER_ADDRESS or not ISSUER_SECRET:
@@ -54,8 +80,21 @@ COINGECKO_URL = os.getenv(
     "COINGECKO_API_URL",
     "https://api.coingecko.com/api/v3/simple/price?ids=ripple&vs_currencies=usd",
 )
+PRICE_SOURCE_TIMEOUT = float(os.getenv("PRICE_SOURCE_TIMEOUT_SEC", "5"))
+PRICE_OUTLIER_MAX_DEVIATION = float(os.getenv("PRICE_OUTLIER_MAX_DEVIATION", "0.05"))
 ORACLE_MEMO_TAG = os.getenv("ORACLE_MEMO_TAG", "GRASS_ORACLE")
 UPDATE_INTERVAL = int(os.getenv("UPDATE_INTERVAL_MIN", "30")) * 60  # seconds
+DEVIATION_BPS = float(os.getenv("ORACLE_DEVIATION_BPS", "50"))
+HEARTBEAT_INTERVAL = int(os.getenv("ORACLE_HEARTBEAT_MIN", "360")) * 60  # seconds
+# Draw oracle transactions from a pool of pre-created Tickets instead of the
+# account sequence (each unused Ticket holds an owner reserve)
+USE_TICKETS = os.getenv("ORACLE_USE_TICKETS", "false").lower() == "true"
+TICKET_POOL_SIZE = int(os.getenv("ORACLE_TICKET_POOL_SIZE", "12"))
+# Oracle updates between full account_offers scans of the offer index
+OFFER_RESCAN_CYCLES = int(os.getenv("ORACLE_OFFER_RESCAN_CYCLES", "48"))
+LSF_PASSIVE = 0x00010000
+# Fee assumed per transaction before the first publish reports a real one
+DEFAULT_TX_FEE_DROPS = 12
 TOKEN_CODE = "GRASS"
 
 oracle_wallet = Wallet.from_seed(ISSUER_SECRET)
@@ -69,15 +108,123 @@ async def fetch_json(session: aiohttp.ClientSession, url: str, headers=None):
         resp.raise_for_status()
         return await resp.json()
 
+class PriceSource(NamedTuple):
+    name: str
+    url: str
+    path: str  # dotted path to the price in the JSON response, e.g. "ripple.usd"
+    headers: Optional[Dict[str, str]] = None
+
+def parse_sources(spec: str, headers: Optional[Dict[str, str]] = None) -> List[PriceSource]:
+    """Parse ``name|url|json.path`` entries separated by commas"""
+    sources = []
+    for entry in filter(None, (e.strip() for e in spec.split(","))):
+        name, url, path = entry.split("|")
+        sources.append(PriceSource(name, url, path, headers))
+    return sources
+
+XRP_USD_SOURCES = parse_sources(os.getenv(
+    "XRP_USD_SOURCES",
+    f"coingecko|{COINGECKO_URL}|ripple.usd,"
+    "kraken|https://api.kraken.com/0/public/Ticker?pair=XRPUSD|result.XXRPZUSD.c.0,"
+    "bitstamp|https://www.bitstamp.net/api/v2/ticker/xrpusd/|last",
+))
+CARBON_USD_SOURCES = [
+    PriceSource(
+        "carbon_api", CARBON_API_URL, "price_usd",
+        {"Authorization": f"Bearer {CARBON_API_KEY}"} if CARBON_API_KEY else None,
+    )
+] + parse_sources(os.getenv("CARBON_USD_SOURCES", ""))
+
+def extract_path(data: Any, path: str) -> Any:
+    for key in path.split("."):
+        data = data[int(key)] if isinstance(data, list) else data[key]
+    return data
+
+async def fetch_quote(session: aiohttp.ClientSession, source: PriceSource) -> float:
+    """Fetch one source under its own deadline"""
+    data = await asyncio.wait_for(
+        fetch_json(session, source.url, headers=source.headers), PRICE_SOURCE_TIMEOUT
+    )
+    price = float(extract_path(data, source.path))
+    if not price > 0:
+        raise ValueError(f"non-positive price {price}")
+    return price
+
+def aggregate_quotes(quotes: Dict[str, float]) -> Tuple[float, List[str], List[str]]:
+    """
+    Median of *quotes* after dropping outliers
+
+    With three or more quotes, any quote further than PRICE_OUTLIER_MAX_DEVIATION
+    (relative) from the median is rejected and the median recomputed.
+
+    Returns:
+        (price, contributing source names, rejected source names)
+    """
+    median = statistics.median(quotes.values())
+    used = list(quotes)
+    rejected: List[str] = []
+    if len(quotes) >= 3:
+        used = [n for n, q in quotes.items() if abs(q - median) / median <= PRICE_OUTLIER_MAX_DEVIATION]
+        rejected = [n for n in quotes if n not in used]
+        if used:
+            median = statistics.median(quotes[n] for n in used)
+        else:
+            used, rejected = list(quotes), []
+    return median, used, rejected
+
+async def get_aggregated_price(session: aiohttp.ClientSession, sources: List[PriceSource]) -> Dict[str, Any]:
+    """
+    Query every source concurrently and aggregate the answers
+
+    Returns:
+        ``{"price", "sources", "rejected", "quotes", "errors"}``
+
+    Raises:
+        RuntimeError: If no source answered
+    """
+    results = await asyncio.gather(
+        *(fetch_quote(session, source) for source in sources), return_exceptions=True
+    )
+    quotes: Dict[str, float] = {}
+    errors: Dict[str, str] = {}
+    for source, result in zip(sources, results):
+        if isinstance(result, BaseException):
+            errors[source.name] = (
+                "timed out" if isinstance(result, asyncio.TimeoutError)
+                else str(result) or type(result).__name__
+            )
+        else:
+            quotes[source.name] = result
+    if not quotes:
+        raise RuntimeError(f"All price sources failed: {errors}")
+
+    price, used, rejected = aggregate_quotes(quotes)
+    return {"price": price, "sources": used, "rejected": rejected, "quotes": quotes, "errors": errors}
+
 async def get_carbon_price_usd(session: aiohttp.ClientSession) -> float:
-    headers = {"Authorization": f"Bearer {CARBON_API_KEY}"} if CARBON_API_KEY else None
-    data = await fetch_json(session, CARBON_API_URL, headers=headers)
-    # Expect schema { price_usd: <number> }
-    return float(data["price_usd"])
+    return (await get_aggregated_price(session, CARBON_USD_SOURCES))["price"]
 
 async def get_xrp_usd(session: aiohttp.ClientSession) -> float:
-    data = await fetch_json(session, COINGECKO_URL)
-    return float(data["ripple"]["usd"])
+    return (await get_aggregated_price(session, XRP_USD_SOURCES))["price"]
+
+async def get_prices(session: aiohttp.ClientSession) -> Dict[str, Any]:
+    """
+    Fetch carbon USD and XRP/USD concurrently and derive the GRASS/XRP price
+
+    Returns:
+        ``{"carbon_usd", "xrp_usd", "price_xrp", "sources"}`` where ``sources``
+        holds the per-price aggregation details
+    """
+    carbon, xrp_usd = await asyncio.gather(
+        get_aggregated_price(session, CARBON_USD_SOURCES),
+        get_aggregated_price(session, XRP_USD_SOURCES),
+    )
+    return {
+        "carbon_usd": carbon["price"],
+        "xrp_usd": xrp_usd["price"],
+        "price_xrp": carbon["price"] / xrp_usd["price"],
+        "sources": {"carbon_usd": carbon, "xrp_usd": xrp_usd},
+    }
 
 ###############################################################################
 # XRPL offer helpers
@@ -89,61 +236,209 @@ def build_memo() -> Memo:
         memo_format=xrpl.utils.str_to_hex("text/plain"),
     )
 
-async def clear_existing_offers(client: AsyncWebsocketClient):
-    # Changed to skip offer retrieval since get_account_offers is not available
-    # TODO: Use proper method when available
-    offers = []
-    oracle_offer_seq: List[int] = [
-        off["seq"]
-        for off in offers["offers"]
-        if any(m.get("MemoData") == xrpl.utils.str_to_hex(ORACLE_MEMO_TAG) for m in off.get("memos", []))
+def token_currency() -> str:
+    # Currency codes longer than 3 characters must be 40-char hex on the ledger
+    return TOKEN_CODE if len(TOKEN_CODE) == 3 else xrpl.utils.str_to_hex(TOKEN_CODE).upper().ljust(40, "0")
+
+def is_oracle_offer(offer: Dict[str, Any]) -> bool:
+    """
+    Whether an ``account_offers`` entry is one of our oracle offers
+
+    Offers on the ledger do not carry the creating transaction's memos, so a
+    scan recognises them by shape: passive, GRASS (our issue) against XRP.
+    """
+    if not offer.get("flags", 0) & LSF_PASSIVE:
+        return False
+    sides = (offer.get("taker_gets"), offer.get("taker_pays"))
+    xrp = [side for side in sides if isinstance(side, str)]
+    issued = [side for side in sides if isinstance(side, dict)]
+    return len(xrp) == 1 and len(issued) == 1 and (
+        issued[0].get("currency") == token_currency() and issued[0].get("issuer") == oracle_wallet.address
+    )
+
+class OracleOfferIndex:
+    """
+    Sequence numbers of the issuer's live oracle offers
+
+    While the ledger stream (services/xrpl/ledger_stream.py) tracks the
+    issuer's offers, they are read from its cache and never scanned.
+    Otherwise the index is kept up to date from submission results; the
+    ledger is only re-scanned (paging through ``account_offers``) on first
+    use, after a failed batch, or every ORACLE_OFFER_RESCAN_CYCLES updates as
+    a safety net.
+    """
+
+    def __init__(self, rescan_every: int = OFFER_RESCAN_CYCLES):
+        self.sequences: Set[int] = set()
+        self.rescan_every = rescan_every
+        self._stale = True
+        self._updates_since_scan = 0
+
+    def invalidate(self) -> None:
+        self._stale = True
+
+    async def rescan(self, client: XRPLConnectionManager) -> None:
+        sequences: Set[int] = set()
+        marker: Optional[Any] = None
+        pages = 0
+        while True:
+            response = await client.request(AccountOffers(
+                account=oracle_wallet.address, ledger_index="validated", limit=400, marker=marker
+            ))
+            if not response.is_successful():
+                raise RuntimeError(f"account_offers failed: {response.result}")
+            sequences.update(o["seq"] for o in response.result.get("offers", []) if is_oracle_offer(o))
+            pages += 1
+            marker = response.result.get("marker")
+            if not marker:
+                break
+        self.sequences = sequences
+        self._stale = False
+        self._updates_since_scan = 0
+        metrics.incr("oracle.offer_rescans")
+        print(f"[oracle] Offer scan: {len(sequences)} oracle offers ({pages} pages)")
+
+    async def current(self, client: XRPLConnectionManager) -> List[int]:
+        """Sequences of the live oracle offers, re-scanning when due"""
+        streamed = ledger_stream.account_offers(oracle_wallet.address) if ledger_stream is not None else None
+        if streamed is not None:
+            self.sequences = {o["seq"] for o in streamed if is_oracle_offer(o)}
+            self._stale = False
+            self._updates_since_scan = 0
+            return sorted(self.sequences)
+        if self._stale or self._updates_since_scan >= self.rescan_every:
+            await self.rescan(client)
+        return sorted(self.sequences)
+
+    def apply(self, cancelled: List[int], created: List[SubmissionResult]) -> None:
+        """Fold one validated batch into the index"""
+        self.sequences.difference_update(cancelled)
+        self.sequences.update(r.sequence for r in created if r.engine_result == "tesSUCCESS")
+        self._updates_since_scan += 1
+
+offer_index = OracleOfferIndex()
+
+def build_cancel_transactions(sequences: List[int]) -> List[OfferCancel]:
+    return [
+        OfferCancel(account=oracle_wallet.address, offer_sequence=seq)
+        for seq in sequences
     ]
-    for seq in oracle_offer_seq:
-        cancel_tx = OfferCancel(
-            account=oracle_wallet.address,
-            offer_sequence=seq,
-        )
-        await submit_and_wait(cancel_tx, client, oracle_wallet)
-
-async def publish_oracle_offers(client: AsyncWebsocketClient, price_xrp: float):
+
+def token_amount(value: str) -> IssuedCurrencyAmount:
+    return IssuedCurrencyAmount(currency=token_currency(), issuer=oracle_wallet.address, value=value)
+
+def build_offer_transactions(price_xrp: float) -> List[OfferCreate]:
+    price_drops = xrpl.utils.xrp_to_drops(round(price_xrp, 6))
     # Sell 1 GRASS for price_xrp XRP
     offer1 = OfferCreate(
         account=oracle_wallet.address,
-        taker_gets={"currency": "XRP", "value": str(round(price_xrp, 6))},
-        taker_pays={"currency": TOKEN_CODE, "issuer": oracle_wallet.address, "value": "1"},
+        taker_gets=price_drops,
+        taker_pays=token_amount("1"),
         memos=[build_memo()],
-        flags="tfPassive",  # passive so it doesn't consume liquidity
+        flags=OfferCreateFlag.TF_PASSIVE,  # passive so it doesn't consume liquidity
     )
     # Buy 1 GRASS for price_xrp XRP (reverse side)
     offer2 = OfferCreate(
         account=oracle_wallet.address,
-        taker_gets={"currency": TOKEN_CODE, "issuer": oracle_wallet.address, "value": "1"},
-        taker_pays={"currency": "XRP", "value": str(round(price_xrp, 6))},
+        taker_gets=token_amount("1"),
+        taker_pays=price_drops,
         memos=[build_memo()],
-        flags="tfPassive",
+        flags=OfferCreateFlag.TF_PASSIVE,
     )
-    await submit_and_wait(offer1, client, oracle_wallet)
-    await submit_and_wait(offer2, client, oracle_wallet)
+    return [offer1, offer2]
+
+async def publish_oracle_offers(engine: SubmissionEngine, price_xrp: float) -> int:
+    """
+    Replace the oracle offers in one pipelined batch (cancels + new offers)
+
+    Returns:
+        Total fee paid, in drops
+    """
+    sequences = await offer_index.current(engine.client)
+    cancels = build_cancel_transactions(sequences)
+    offers = build_offer_transactions(price_xrp)
+    try:
+        results = await engine.submit_batch(cancels + offers, use_tickets=USE_TICKETS)
+    except SubmissionError:
+        # Part of the batch may have applied; re-read the ledger next time
+        offer_index.invalidate()
+        raise
+    offer_index.apply(sequences, results[len(cancels):])
+    return sum(r.fee_drops for r in results)
 
 ###############################################################################
 # Main loop
 ###############################################################################
 
-async def update_loop():
-    async with AsyncWebsocketClient(WSS) as client, aiohttp.ClientSession() as session:
+# Publish decisions since start-up (the last published price is not persisted,
+# so the first cycle after a restart always publishes)
+publish_stats = {
+    "published": 0,
+    "skipped": 0,
+    "fees_paid_drops": 0,
+    "fees_saved_drops": 0,
+    "last_price_xrp": None,
+    "last_published_at": None,
+    "last_decision": None,
+}
+_last_update_fee_drops = 4 * DEFAULT_TX_FEE_DROPS  # 2 cancels + 2 offers
+
+def publish_decision(price_xrp: float, now: Optional[float] = None) -> Tuple[bool, str]:
+    """Whether *price_xrp* should be published, and why"""
+    now = time.time() if now is None else now
+    last_price = publish_stats["last_price_xrp"]
+    last_at = publish_stats["last_published_at"]
+    if last_price is None or last_at is None:
+        return True, "initial"
+    deviation_bps = abs(price_xrp - last_price) / last_price * 10_000
+    if deviation_bps >= DEVIATION_BPS:
+        return True, f"deviation {deviation_bps:.1f}bps"
+    if now - last_at >= HEARTBEAT_INTERVAL:
+        return True, "heartbeat"
+    return False, f"within band ({deviation_bps:.1f}bps)"
+
+async def update_oracle(engine: SubmissionEngine, price_xrp: float) -> bool:
+    """Publish *price_xrp* if it passes publish_decision(); returns whether it did"""
+    global _last_update_fee_drops
+
+    publish, reason = publish_decision(price_xrp)
+    publish_stats["last_decision"] = reason
+    if not publish:
+        publish_stats["skipped"] += 1
+        publish_stats["fees_saved_drops"] += _last_update_fee_drops
+        metrics.incr("oracle.skipped")
+        metrics.incr("oracle.fees_saved_drops", _last_update_fee_drops)
+        print(f"[oracle] Skipped publish: {reason}")
+        return False
+
+    fees = await publish_oracle_offers(engine, price_xrp)
+    _last_update_fee_drops = fees or _last_update_fee_drops
+    publish_stats["published"] += 1
+    publish_stats["fees_paid_drops"] += fees
+    publish_stats["last_price_xrp"] = price_xrp
+    publish_stats["last_published_at"] = time.time()
+    metrics.incr("oracle.published")
+    metrics.incr("oracle.fees_paid_drops", fees)
+    print(f"[oracle] Offers published ({reason}, {fees} drops).")
+    return True
+
+async def update_loop(connection: Optional[XRPLConnectionManager] = None):
+    """Publish the oracle price every UPDATE_INTERVAL over the shared XRPL connection"""
+    connection = connection or xrpl_connection
+    await connection.start()
+    async with aiohttp.ClientSession() as session:
+        engine = SubmissionEngine(connection, oracle_wallet, TicketPool(TICKET_POOL_SIZE) if USE_TICKETS else None)
         while True:
             try:
-                carbon = await get_carbon_price_usd(session)
-                xrp_usd = await get_xrp_usd(session)
-                price_xrp = carbon / xrp_usd
+                prices = await get_prices(session)
+                carbon, xrp_usd, price_xrp = prices["carbon_usd"], prices["xrp_usd"], prices["price_xrp"]
 
                 print(
-                    f"[oracle] Carbon USD={carbon:.2f} XRP/USD={xrp_usd:.4f} -> GRASS/XRP={price_xrp:.6f}"
+                    f"[oracle] Carbon USD={carbon:.2f} XRP/USD={xrp_usd:.4f} -> GRASS/XRP={price_xrp:.6f} "
+                    f"(XRP sources: {', '.join(prices['sources']['xrp_usd']['sources'])})"
                 )
 
-                await clear_existing_offers(client)
-                await publish_oracle_offers(client, price_xrp)
-                print("[oracle] Offers published.")
+                await update_oracle(engine, price_xrp)
             except Exception as exc:
                 print("[oracle] Error:", exc)
 
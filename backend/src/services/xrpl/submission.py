@@ -0,0 +1,284 @@
+"""Pipelined XRPL transaction submission for one account.
+
+``submit_and_wait`` signs, submits and waits for validation one transaction
+at a time, so N transactions take N ledger closes.  ``SubmissionEngine``
+instead:
+
+1. assigns sequence numbers locally (one AccountInfo round-trip, then a
+   local counter) or draws pre-created Tickets from a ``TicketPool``,
+2. autofills Fee and LastLedgerSequence once for the whole batch,
+3. signs every transaction and submits them back-to-back (concurrently
+   when they use Tickets, which do not depend on each other), and
+4. awaits validation of all of them together.
+
+A batch therefore usually validates in a single ledger close.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from dataclasses import replace
+from typing import Any, List, NamedTuple, Optional, Union
+
+from xrpl.asyncio.clients import AsyncWebsocketClient
+from xrpl.asyncio.ledger import get_fee, get_latest_validated_ledger_sequence
+from xrpl.core.binarycodec import encode
+from xrpl.models import AccountInfo, AccountObjects, SubmitOnly, TicketCreate, Tx
+from xrpl.models.transactions.transaction import Transaction
+from xrpl.transaction import sign
+from xrpl.wallet import Wallet
+
+from services.xrpl.connection import XRPLConnectionManager
+
+logger = logging.getLogger(__name__)
+
+# Ledgers a batch may take to validate before it is considered expired
+LEDGER_OFFSET = int(os.getenv("XRPL_LEDGER_OFFSET", "20"))
+VALIDATION_POLL_SEC = float(os.getenv("XRPL_VALIDATION_POLL_SEC", "1"))
+
+VALIDATION_MAX_POLL_ERRORS = int(os.getenv("XRPL_VALIDATION_MAX_POLL_ERRORS", "30"))
+
+# Submit results that mean "accepted for consideration"
+_ACCEPTED = ("tesSUCCESS", "terQUEUED")
+# Ticket rejections meaning the Ticket no longer exists
+_TICKET_GONE = ("tefNO_TICKET", "tefPAST_SEQ")
+
+def _accepted(result: str) -> bool:
+    return result in _ACCEPTED or result.startswith("tec")
+
+def _in_flight(result: str) -> bool:
+    """Whether a submitted transaction may still apply: accepted, held (ter) or lost in transit"""
+    return _accepted(result) or result.startswith(("ter", "error:"))
+
+class SubmissionResult(NamedTuple):
+    hash: str
+    sequence: int  # Account sequence, or the Ticket sequence that was used
+    engine_result: str  # TransactionResult once validated, else why not (see submit_batch)
+    fee_drops: int
+    validated: bool
+
+class SubmissionError(Exception):
+    """Raised when a transaction of a batch is rejected or expires"""
+
+    def __init__(self, message: str, results: List[SubmissionResult]):
+        super().__init__(message)
+        self.results = results
+
+class SubmissionEngine:
+    """Signs and submits batches of transactions for one wallet"""
+
+    def __init__(self, client: Union[AsyncWebsocketClient, XRPLConnectionManager], wallet: Wallet, tickets: Optional["TicketPool"] = None):
+        self.client = client
+        self.wallet = wallet
+        self.tickets = tickets
+        self._next_sequence: Optional[int] = None
+        self._lock = asyncio.Lock()
+
+    async def _sync_sequence(self) -> int:
+        if self._next_sequence is None:
+            response = await self.client.request(
+                AccountInfo(account=self.wallet.address, ledger_index="current")
+            )
+            self._next_sequence = int(response.result["account_data"]["Sequence"])
+        return self._next_sequence
+
+    async def submit_batch(self, transactions: List[Transaction], use_tickets: bool = False) -> List[SubmissionResult]:
+        """
+        Sign, submit and await validation of *transactions* as one pipeline
+
+        With account sequences, transactions are submitted in order and a
+        rejected one stops the batch: later ones depend on its sequence, so
+        they are not submitted and the local sequence is re-synchronised.
+        Ticketed transactions are independent and are all submitted at once.
+        Transactions that were accepted, held (``ter``) or whose submission
+        failed in transit are followed until they validate or their
+        LastLedgerSequence has passed; their Tickets are only released once
+        they are known not to have applied.  Either way SubmissionError is
+        raised afterwards if any transaction did not validate.  Any other
+        exception means nothing was submitted.
+
+        A result's ``engine_result`` is the TransactionResult once validated,
+        the rejection for final (tem/tef/tel) failures, ``notSubmitted``,
+        ``expired`` (past LastLedgerSequence, never applied) or ``unknown``
+        (the ledger could not be read to find out).
+
+        Args:
+            transactions: Unsigned transactions from this wallet's account
+            use_tickets: Use Tickets from the pool instead of account sequences
+
+        Returns:
+            One SubmissionResult per transaction, in order (also on
+            SubmissionError, as its ``results``)
+        """
+        if not transactions:
+            return []
+        if use_tickets:
+            if self.tickets is None:
+                raise ValueError("No TicketPool configured")
+            # Outside the lock: topping up the pool submits a TicketCreate batch
+            tickets = await self.tickets.take(self, len(transactions))
+
+        async with self._lock:
+            try:
+                fee = await get_fee(self.client)
+                last_ledger = await get_latest_validated_ledger_sequence(self.client) + LEDGER_OFFSET
+
+                if use_tickets:
+                    fields = [{"sequence": 0, "ticket_sequence": t} for t in tickets]
+                else:
+                    start = await self._sync_sequence()
+                    fields = [{"sequence": start + i} for i in range(len(transactions))]
+
+                signed = []
+                for tx, extra in zip(transactions, fields):
+                    prepared = replace(tx, **extra, fee=fee, last_ledger_sequence=last_ledger)
+                    signed.append(sign(prepared, self.wallet))
+            except Exception:
+                # Nothing was submitted
+                if use_tickets:
+                    self.tickets.release(tickets)
+                raise
+
+            # Per transaction: the submit result
+            if use_tickets:
+                outcomes = list(await asyncio.gather(*(self._submit(tx) for tx in signed)))
+            else:
+                outcomes = []
+                for tx in signed:
+                    outcomes.append(await self._submit(tx))
+                    if not _accepted(outcomes[-1]):
+                        break
+                outcomes += ["notSubmitted"] * (len(signed) - len(outcomes))
+
+            if use_tickets:
+                # Final rejections never used their Ticket, unless the Ticket itself is gone
+                self.tickets.release([tx.ticket_sequence for tx, o in zip(signed, outcomes)
+                                      if not _in_flight(o) and o not in _TICKET_GONE])
+                self.tickets.consumed([tx.ticket_sequence for tx, o in zip(signed, outcomes) if o in _TICKET_GONE])
+            elif all(_accepted(o) for o in outcomes):
+                self._next_sequence = start + len(signed)
+            else:
+                self._next_sequence = None  # Re-read from the ledger next time
+
+        # Accepted and possibly-applied (ter, connection errors) transactions are
+        # followed until they validate or LastLedgerSequence has passed
+        in_flight = [tx for tx, o in zip(signed, outcomes) if _in_flight(o)]
+        validated = await asyncio.gather(*(self._await_validation(tx, last_ledger) for tx in in_flight))
+        if use_tickets:
+            # Expired transactions never used their Ticket; unresolved ones keep theirs
+            self.tickets.consumed([r.sequence for r in validated if r.validated])
+            self.tickets.release([r.sequence for r in validated if r.engine_result == "expired"])
+        elif any(not r.validated for r in validated):
+            # Expired sequences left a gap: re-read the sequence before the next batch
+            async with self._lock:
+                self._next_sequence = None
+
+        pending = iter(validated)
+        results = [
+            next(pending) if _in_flight(outcome)
+            else SubmissionResult(tx.get_hash(), tx.sequence or tx.ticket_sequence or 0, outcome, 0, False)
+            for tx, outcome in zip(signed, outcomes)
+        ]
+        rejected = [f"{tx.transaction_type} seq {r.sequence}: {o}"
+                    for tx, r, o in zip(signed, results, outcomes) if not _in_flight(o) and o != "notSubmitted"]
+        unvalidated = [r for r in results if not r.validated]
+        if unvalidated:
+            reason = rejected[0] if rejected else f"{len(unvalidated)} transaction(s) did not validate"
+            raise SubmissionError(f"Batch submission failed: {reason}", results)
+        return results
+
+    async def _submit(self, tx: Transaction) -> str:
+        """Submit one signed transaction; returns the engine result (or ``error: ...``)"""
+        try:
+            response = await self.client.request(SubmitOnly(tx_blob=encode(tx.to_xrpl())))
+        except Exception as e:
+            # The node may still have received and relayed it
+            return f"error: {e}"
+        return response.result.get("engine_result", response.result.get("error", "unknown"))
+
+    async def _await_validation(self, tx: Transaction, last_ledger: int) -> SubmissionResult:
+        """
+        Follow *tx* until it validates or can no longer be included
+
+        A transaction is only reported ``expired`` once a ledger past its
+        LastLedgerSequence had validated before the lookup that did not find
+        it.  If the ledger cannot be read for VALIDATION_MAX_POLL_ERRORS polls
+        in a row the outcome is reported as ``unknown``.
+        """
+        tx_hash = tx.get_hash()
+        sequence = tx.sequence or tx.ticket_sequence or 0
+        errors = 0
+        while True:
+            try:
+                validated_ledger = await get_latest_validated_ledger_sequence(self.client)
+                response = await self.client.request(Tx(transaction=tx_hash))
+            except Exception as e:
+                errors += 1
+                if errors >= VALIDATION_MAX_POLL_ERRORS:
+                    logger.warning(f"Giving up on {tx_hash} after {errors} failed polls: {e}")
+                    return SubmissionResult(tx_hash, sequence, "unknown", 0, False)
+                await asyncio.sleep(VALIDATION_POLL_SEC)
+                continue
+            errors = 0
+            if response.result.get("validated"):
+                meta = response.result.get("meta", {})
+                return SubmissionResult(tx_hash, sequence, meta.get("TransactionResult", ""), int(tx.fee), True)
+            if validated_ledger > last_ledger:
+                return SubmissionResult(tx_hash, sequence, "expired", 0, False)
+            await asyncio.sleep(VALIDATION_POLL_SEC)
+
+class TicketPool:
+    """
+    Pre-created Tickets of one account, so transactions need not wait for
+    each other's sequence numbers
+
+    Each Ticket holds an owner reserve while unused; the pool is topped up
+    with a single TicketCreate when it runs low.
+    """
+
+    def __init__(self, size: int = 10):
+        self.size = size
+        self._available: List[int] = []
+        self._in_use: set = set()  # Taken but not yet validated
+        self._loaded = False
+        # Serializes take(), so concurrent batches top up the pool only once
+        self._lock = asyncio.Lock()
+
+    async def _load(self, engine: SubmissionEngine) -> None:
+        """Read the account's unused Tickets from the ledger"""
+        tickets: List[int] = []
+        marker: Optional[Any] = None
+        while True:
+            response = await engine.client.request(AccountObjects(
+                account=engine.wallet.address, type="ticket", ledger_index="validated", marker=marker
+            ))
+            tickets.extend(int(o["TicketSequence"]) for o in response.result.get("account_objects", []))
+            marker = response.result.get("marker")
+            if not marker:
+                break
+        self._available = sorted(t for t in tickets if t not in self._in_use)
+        self._loaded = True
+
+    async def take(self, engine: SubmissionEngine, count: int) -> List[int]:
+        """Remove and return *count* Ticket sequences, creating more via *engine* if needed"""
+        async with self._lock:
+            if not self._loaded:
+                await self._load(engine)
+            if len(self._available) < count:
+                await engine.submit_batch([TicketCreate(
+                    account=engine.wallet.address, ticket_count=max(self.size, count) - len(self._available)
+                )])
+                await self._load(engine)
+            taken, self._available = self._available[:count], self._available[count:]
+            self._in_use.update(taken)
+            return taken
+
+    def release(self, tickets: List[int]) -> None:
+        """Return Tickets that were never submitted"""
+        self._in_use.difference_update(tickets)
+        self._available = sorted(set(self._available) | set(tickets))
+
+    def consumed(self, tickets: List[int]) -> None:
+        """Forget Tickets whose transactions reached the ledger"""
+        self._in_use.difference_update(tickets)
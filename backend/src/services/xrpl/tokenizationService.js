@@ -14,8 +14,12 @@ class XRPLClient {
   }
 
   async connect() {
-    if (!this._connected) {
-      await this.client.connect()
+    // Long-lived callers (the bridge worker) reuse the socket; reopen it if the node dropped it
+    if (!this._connected || !this.client.isConnected()) {
+      if (!this._connecting) {
+        this._connecting = this.client.connect().finally(() => { this._connecting = null })
+      }
+      await this._connecting
       this._connected = true
     }
   }
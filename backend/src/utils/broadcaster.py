@@ -0,0 +1,98 @@
+"""
+In-process fan-out of events to many async subscribers
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional, Set
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class Broadcaster:
+    """
+    One fan-out task delivering every published message to all subscribers
+
+    Each subscriber has a small bounded queue.  A subscriber that falls
+    behind loses its oldest queued messages rather than slowing down the
+    publisher or other subscribers; for price updates only the newest value
+    matters anyway.
+    """
+
+    def __init__(self, name: str, queue_size: int = 8):
+        """
+        Initialize the broadcaster (the fan-out task starts with start())
+
+        Args:
+            name: Metrics prefix, e.g. "price_stream"
+            queue_size: Messages buffered per subscriber
+        """
+        self.name = name
+        self.queue_size = queue_size
+        self.last: Optional[Any] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._inbox: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def start(self) -> None:
+        """Start the fan-out task on the running event loop"""
+        if self._task is None or self._task.done():
+            self._inbox = asyncio.Queue()
+            self._task = asyncio.ensure_future(self._fan_out())
+
+    async def stop(self) -> None:
+        """Stop the fan-out task and wake every subscriber with None"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        for queue in list(self._subscribers):
+            self._offer(queue, None)
+
+    def publish(self, message: Any) -> None:
+        """Queue *message* for delivery (non-blocking; call from the event loop)"""
+        self.last = message
+        if self._inbox is not None:
+            self._inbox.put_nowait(message)
+
+    def _offer(self, queue: asyncio.Queue, message: Any) -> None:
+        if queue.full():
+            queue.get_nowait()
+            metrics.incr(f"{self.name}.dropped")
+        queue.put_nowait(message)
+
+    async def _fan_out(self) -> None:
+        while True:
+            message = await self._inbox.get()
+            for queue in list(self._subscribers):
+                self._offer(queue, message)
+            metrics.incr(f"{self.name}.published")
+
+    @asynccontextmanager
+    async def subscribe(self, replay_last: bool = True) -> AsyncIterator[asyncio.Queue]:
+        """
+        Register a subscriber queue for the duration of the context
+
+        Args:
+            replay_last: Pre-load the queue with the most recent message
+
+        Yields:
+            Queue of messages; None means the broadcaster is shutting down
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        if replay_last and self.last is not None:
+            queue.put_nowait(self.last)
+        self._subscribers.add(queue)
+        metrics.incr(f"{self.name}.subscribed")
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
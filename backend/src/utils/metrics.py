@@ -0,0 +1,50 @@
+"""
+Lightweight in-process metrics registry
+"""
+
+import threading
+from typing import Dict, Any
+
+class MetricsRegistry:
+    """Thread-safe counters and summaries, exposed through the API"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._summaries: Dict[str, Dict[str, float]] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """Increment a counter by *value*"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        """Record one observation of *name* (count/sum/min/max)"""
+        with self._lock:
+            summary = self._summaries.get(name)
+            if summary is None:
+                self._summaries[name] = {
+                    "count": 1,
+                    "sum": value,
+                    "min": value,
+                    "max": value
+                }
+                return
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["min"] = min(summary["min"], value)
+            summary["max"] = max(summary["max"], value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a copy of every counter and summary"""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "summaries": {
+                    name: dict(summary, avg=summary["sum"] / summary["count"])
+                    for name, summary in self._summaries.items()
+                }
+            }
+
+# Process-wide registry
+metrics = MetricsRegistry()